@@ -152,6 +152,10 @@ kubectl apply -f 09-ingress.yaml
 echo "Déploiement du HPA..."
 kubectl apply -f 10-backend-hpa.yaml
 
+# Déployer la compaction nocturne
+echo "Déploiement du CronJob de compaction..."
+kubectl apply -f 11-compaction-cronjob.yaml
+
 echo ""
 echo "=================================================="
 echo "Déploiement terminé avec succès"
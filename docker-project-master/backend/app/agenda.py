@@ -0,0 +1,123 @@
+from datetime import datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Select, func, select
+
+from . import models, pagination, serializers, stats
+from .schemas import AgendaBucket
+
+# Toutes les requêtes de l'agenda portent models.AGENDA : elles sont
+# servies par l'index partiel ix_tasks_owner_agenda, dont la taille ne
+# dépend que des tâches à faire datées, pas des tâches terminées ou
+# archivées. Le propriétaire mène l'index : chacun ne lit que les siennes.
+
+# Dans l'ordre de l'index, pour des pages lues par un seul parcours
+KEYS = [
+    pagination.SortKey(models.Task.due_date, lambda row: row.due_date, datetime),
+    pagination.SortKey(models.Task.id, lambda row: row.id),
+]
+
+def bucket_bounds(tz: ZoneInfo, now: datetime, days: int) -> Dict[AgendaBucket, Tuple[Optional[datetime], datetime]]:
+    """
+    Due date range of each agenda bucket, as naive UTC datetimes.
+
+    Args:
+        tz: Time zone of the client, defining today
+        now: Current time, timezone-aware
+        days: Days after today covered by "upcoming"
+
+    Returns:
+        (start, end) of each bucket, end excluded; overdue has no start
+    """
+    current = now.astimezone(timezone.utc).replace(tzinfo=None)
+    _, tomorrow = stats.today_bounds(tz, now)
+    # Minuit local, et non tomorrow + days : les changements d'heure
+    # tombent dans l'intervalle
+    last_day = now.astimezone(tz).date() + timedelta(days=days + 1)
+    horizon = datetime.combine(last_day, time.min, tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+    return {
+        AgendaBucket.OVERDUE: (None, current),
+        AgendaBucket.TODAY: (current, tomorrow),
+        AgendaBucket.UPCOMING: (tomorrow, horizon),
+    }
+
+
+def counts_query(owner_id: int, bounds: Dict[AgendaBucket, Tuple[Optional[datetime], datetime]]) -> Select:
+    """
+    Build the statement counting the tasks of each bucket, by priority.
+
+    Only owner_id, due_date and priority are read, all stored in
+    ix_tasks_owner_agenda.
+
+    Args:
+        owner_id: Owner of the tasks
+        bounds: Ranges returned by bucket_bounds
+
+    Returns:
+        A select returning one row per priority value: priority, then one
+        count per bucket, named after it
+    """
+    due = models.Task.due_date
+    counters = []
+    for bucket, (start, end) in bounds.items():
+        conditions = [due < end] if start is None else [due >= start, due < end]
+        counters.append(func.count().filter(*conditions).label(bucket.value))
+    horizon = max(end for _, end in bounds.values())
+    return (
+        select(models.Task.priority, *counters)
+        .where(models.Task.owner_id == owner_id, models.AGENDA, due < horizon)
+        .group_by(models.Task.priority)
+    )
+
+
+def counts_dict(rows: Sequence) -> dict:
+    """
+    Shape the rows returned by counts_query as a schemas.AgendaSummary dict.
+
+    Every priority is listed, with 0 when it has no task.
+    """
+    summary = {
+        bucket.value: {"total": 0, "by_priority": dict.fromkeys(models.PRIORITIES, 0)}
+        for bucket in AgendaBucket
+    }
+    for row in rows:
+        for bucket in AgendaBucket:
+            count = getattr(row, bucket.value)
+            summary[bucket.value]["total"] += count
+            summary[bucket.value]["by_priority"][row.priority] += count
+    return summary
+
+
+def tasks_query(
+    owner_id: int,
+    start: Optional[datetime],
+    end: datetime,
+    priority: Optional[List[str]],
+    cursor: Optional[str],
+    limit: int,
+) -> Select:
+    """
+    Build the statement reading one page of a bucket, by due date.
+
+    Args:
+        owner_id: Owner of the tasks
+        start: First due date of the bucket (included), None for overdue
+        end: End of the bucket (excluded)
+        priority: Keep only these priorities
+        cursor: Cursor returned with the previous page, if any
+        limit: Page size
+
+    Returns:
+        A select of TASK_COLUMNS, fetching limit + 1 rows
+
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    due = models.Task.due_date
+    query = select(*serializers.TASK_COLUMNS).where(models.Task.owner_id == owner_id, models.AGENDA, due < end)
+    if start is not None:
+        query = query.where(due >= start)
+    if priority:
+        query = query.where(models.Task.priority.in_(priority))
+    return pagination.keyset(query, KEYS, False, cursor, limit)
@@ -0,0 +1,183 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from . import metrics
+
+# Portées dont ResponseCache retient la dernière invalidation
+MAX_INVALIDATED_SCOPES = 10000
+
+
+class TTLCache:
+    """
+    Small in-process cache whose entries expire after a fixed delay.
+
+    Each worker process has its own cache: values may be stale for up
+    to ttl seconds after a write made by another process. Keys are tuples
+    whose first item is the scope of the entry (its owner), so that one
+    scope can be cleared alone.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 128, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the value stored under key, or None if absent or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store value under key for ttl seconds.
+
+        When the cache is full, expired entries are dropped first, then the
+        oldest ones.
+        """
+        if self.ttl <= 0:
+            return
+        now = self._clock()
+        if key not in self._entries and len(self._entries) >= self.maxsize:
+            for stale in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                del self._entries[stale]
+            while len(self._entries) >= self.maxsize:
+                del self._entries[next(iter(self._entries))]
+        self._entries[key] = (now + self.ttl, value)
+
+    def clear(self, scope: Optional[Hashable] = None) -> None:
+        """
+        Drop the entries of one scope, or every entry if scope is None.
+        """
+        if scope is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == scope]:
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized responses, bounded by the total size of the
+    stored bodies and by a TTL.
+
+    Keys are tuples whose first item is the scope of the entry (its
+    owner): invalidating a scope leaves the others cached. A generation
+    number is bumped on every invalidation: a response computed from data
+    read before a write to its scope is not stored after it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        max_bytes: int,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled and ttl > 0 and max_bytes > 0
+        self.generation = 0
+        self.size = 0
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, bytes, Dict[str, str]]]" = OrderedDict()
+        # Clés par portée, et génération de la dernière invalidation de
+        # chaque portée (ou de toutes : _cleared)
+        self._scopes: Dict[Hashable, Set[Hashable]] = {}
+        self._invalidated: Dict[Hashable, int] = {}
+        self._cleared = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        """
+        Return the body and headers stored under key, or None.
+        """
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self._clock():
+            if entry is not None:
+                self._remove(key)
+            metrics.CACHE_MISSES.labels(self.name).inc()
+            return None
+        self._entries.move_to_end(key)
+        metrics.CACHE_HITS.labels(self.name).inc()
+        return entry[1], entry[2]
+
+    def set(self, key: Hashable, body: bytes, headers: Dict[str, str], generation: int) -> None:
+        """
+        Store a response, evicting the least recently used ones to stay
+        within max_bytes.
+
+        Args:
+            key: Normalized request parameters
+            body: Serialized response body
+            headers: Response headers to replay with the body
+            generation: Value of self.generation read before querying the
+                database; the response is dropped if its scope was
+                invalidated since
+        """
+        scope = key[0]
+        if not self.enabled or len(body) > self.max_bytes:
+            return
+        if generation < self._cleared or generation < self._invalidated.get(scope, 0):
+            return
+        if key in self._entries:
+            self._remove(key)
+        while self._entries and self.size + len(body) > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            metrics.CACHE_EVICTIONS.labels(self.name).inc()
+        self._entries[key] = (self._clock() + self.ttl, body, headers)
+        self._scopes.setdefault(scope, set()).add(key)
+        self.size += len(body)
+        metrics.CACHE_BYTES.labels(self.name).set(self.size)
+
+    def invalidate(self, scope: Optional[Hashable] = None) -> None:
+        """
+        Drop the entries of one scope, or every entry if scope is None,
+        and any response of that scope being computed concurrently.
+        """
+        self.generation += 1
+        if scope is None:
+            self._cleared = self.generation
+            self._invalidated.clear()
+            self._scopes.clear()
+            self._entries.clear()
+            self.size = 0
+            metrics.CACHE_BYTES.labels(self.name).set(0)
+            return
+        for key in self._scopes.pop(scope, ()):
+            _, body, _ = self._entries.pop(key)
+            self.size -= len(body)
+        metrics.CACHE_BYTES.labels(self.name).set(self.size)
+        self._invalidated[scope] = self.generation
+        if len(self._invalidated) > MAX_INVALIDATED_SCOPES:
+            # Borne la mémoire : seules les réponses en cours de calcul
+            # sont écartées, les entrées stockées restent valides
+            self._cleared = self.generation
+            self._invalidated.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        _, body, _ = self._entries.pop(key)
+        keys = self._scopes[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._scopes[key[0]]
+        self.size -= len(body)
+        metrics.CACHE_BYTES.labels(self.name).set(self.size)
+
+    def __len__(self) -> int:
+        return len(self._entries)
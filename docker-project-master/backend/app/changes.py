@@ -0,0 +1,214 @@
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import BigInteger, Boolean, Integer, Select, cast, false, func, literal, null, select, text, true, tuple_, union_all
+
+from . import database, models, pagination, serializers
+from .pagination import SortKey
+
+# Flux des modifications pour la synchronisation incrémentale (/changes).
+#
+# updated_at est fixé avant le COMMIT : une transaction lente peut valider
+# une date plus ancienne qu'une écriture déjà lue, et le client la
+# manquerait. Chaque ligne porte donc l'identifiant de la transaction qui
+# l'a écrite (change_id), et le flux s'arrête avant la plus ancienne
+# transaction encore en cours (xmin de l'instantané) : tout ce qui est
+# derrière le curseur est validé, une position n'est jamais dépassée par
+# une écriture plus ancienne.
+
+CURSOR_KEYS = [SortKey(None, lambda row: row.change_id), SortKey(None, lambda row: row.task_id)]
+
+# Horizon : les transactions d'identifiant inférieur sont toutes terminées
+HORIZON = func.txid_snapshot_xmin(func.txid_current_snapshot())
+
+
+def install_change_tracking(conn) -> None:
+    """
+    Add the change_id column and the triggers maintaining it and the
+    tombstones. Existing rows get the id of this transaction.
+
+    Migration 2 (see migrations.py): runs after the tables exist and
+    before the indexes of tables created earlier. Published: the
+    tombstones written since owner_id come from install_owner_tombstones.
+
+    Args:
+        conn: Connection inside a transaction
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('task_change_tracking'))"))
+    conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS change_id bigint"))
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION set_task_change_id() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.change_id := txid_current();
+            RETURN NEW;
+        END $$
+    """))
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION record_task_tombstones() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO task_tombstones (task_id, change_id, deleted_at)
+            SELECT id, txid_current(), timezone('UTC', now()) FROM deleted_tasks
+            ON CONFLICT (task_id) DO UPDATE
+            SET change_id = EXCLUDED.change_id, deleted_at = EXCLUDED.deleted_at;
+            RETURN NULL;
+        END $$
+    """))
+    database.create_trigger_if_not_exists(
+        conn, "tasks", "tasks_set_change_id",
+        "BEFORE INSERT OR UPDATE ON tasks FOR EACH ROW EXECUTE FUNCTION set_task_change_id()",
+    )
+    database.create_trigger_if_not_exists(
+        conn, "tasks", "tasks_record_tombstones",
+        "AFTER DELETE ON tasks REFERENCING OLD TABLE AS deleted_tasks "
+        "FOR EACH STATEMENT EXECUTE FUNCTION record_task_tombstones()",
+    )
+    # Lignes antérieures au suivi : le trigger BEFORE UPDATE pose change_id
+    if conn.scalar(text("SELECT 1 FROM tasks WHERE change_id IS NULL LIMIT 1")):
+        conn.execute(text("UPDATE tasks SET change_id = NULL WHERE change_id IS NULL"))
+
+
+def install_owner_tombstones(conn) -> None:
+    """
+    Replace the tombstone function so that each tombstone keeps the owner
+    of the deleted task. The trigger calling it is left as is.
+
+    Migration 8 (see migrations.py), once task_tombstones has owner_id.
+
+    Args:
+        conn: Connection inside a transaction
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('task_change_tracking'))"))
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION record_task_tombstones() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO task_tombstones (task_id, owner_id, change_id, deleted_at)
+            SELECT id, owner_id, txid_current(), timezone('UTC', now()) FROM deleted_tasks
+            ON CONFLICT (task_id) DO UPDATE
+            SET owner_id = EXCLUDED.owner_id, change_id = EXCLUDED.change_id,
+                deleted_at = EXCLUDED.deleted_at;
+            RETURN NULL;
+        END $$
+    """))
+
+
+def decode_since(since: Optional[str]) -> Tuple[int, int]:
+    """
+    Decode a /changes cursor.
+
+    Args:
+        since: Cursor returned by a previous call, or None to start from
+            the beginning
+
+    Returns:
+        The (change_id, task id) position to resume after
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not since:
+        return 0, 0
+    change_id, task_id = pagination.decode_cursor(since, CURSOR_KEYS)
+    return change_id, task_id
+
+
+def changes_query(owner_id: int, position: Tuple[int, int], limit: int) -> Select:
+    """
+    Select the tasks of owner_id written and deleted after position, in
+    transaction order.
+
+    Rows have change_id, task_id and deleted columns followed by the
+    TASK_COLUMNS (all NULL for deleted tasks). One extra row is fetched to
+    tell whether more changes are pending. If tombstones after position
+    were pruned, the first row is a marker instead (see cursor_expired).
+
+    Args:
+        owner_id: Owner of the tasks
+        position: (change_id, task id) of the last change already received
+        limit: Maximum number of changes to return
+
+    Returns:
+        A UNION ALL of both tables, ordered and limited
+    """
+    task, tombstone = models.Task, models.TaskTombstone
+    after = tuple_(*position)
+
+    written = (
+        select(
+            task.change_id.label("change_id"),
+            task.id.label("task_id"),
+            false().label("deleted"),
+            *serializers.TASK_COLUMNS,
+        )
+        .where(task.owner_id == owner_id, tuple_(task.change_id, task.id) > after, task.change_id < HORIZON)
+        .order_by(task.change_id, task.id)
+        .limit(limit + 1)
+    )
+    deleted = (
+        select(
+            tombstone.change_id,
+            tombstone.task_id,
+            true(),
+            *[cast(null(), column.type).label(column.key) for column in serializers.TASK_COLUMNS],
+        )
+        .where(
+            tombstone.owner_id == owner_id,
+            tuple_(tombstone.change_id, tombstone.task_id) > after,
+            tombstone.change_id < HORIZON,
+        )
+        .order_by(tombstone.change_id, tombstone.task_id)
+        .limit(limit + 1)
+    )
+    branches = [written, deleted]
+    if position[0] > 0:
+        # Traces purgées après la position : une ligne marqueur (deleted
+        # NULL), triée en tête, dans la même requête. Depuis le début, rien
+        # n'est manqué.
+        horizon = models.TaskChangeHorizon
+        branches.append(
+            select(
+                literal(0, BigInteger),
+                literal(0, Integer),
+                cast(null(), Boolean),
+                *[cast(null(), column.type).label(column.key) for column in serializers.TASK_COLUMNS],
+            )
+            .where(horizon.owner_id == owner_id, horizon.change_id >= position[0])
+        )
+    # Chaque branche est limitée par son propre parcours d'index : seules
+    # 2 x (limit + 1) lignes au plus sont fusionnées, quel que soit le retard
+    feed = union_all(*branches).subquery()
+    return select(feed).order_by(feed.c.change_id, feed.c.task_id).limit(limit + 1)
+
+
+def cursor_expired(rows: Sequence[Any]) -> bool:
+    """
+    Whether changes_query found deletions after the cursor already pruned:
+    the client must drop its copy and read /changes from the beginning.
+    """
+    return bool(rows) and rows[0].deleted is None
+
+
+def feed_dict(rows: Sequence[Any], since: Optional[str], limit: int) -> dict:
+    """
+    Shape the rows of changes_query into the /changes response.
+
+    Clients apply "deleted" then "tasks", and pass "cursor" as since on
+    the next call. has_more means another call would return more
+    changes right away.
+    """
+    page = rows[:limit]
+    tasks: List[dict] = []
+    deleted: List[int] = []
+    for row in page:
+        if row.deleted:
+            deleted.append(row.task_id)
+        else:
+            tasks.append(serializers.task_dict(tuple(row)[3:]))
+
+    if page:
+        cursor = pagination.encode_cursor([key.value(page[-1]) for key in CURSOR_KEYS])
+    else:
+        cursor = since or pagination.encode_cursor([0, 0])
+
+    return {"tasks": tasks, "deleted": deleted, "cursor": cursor, "has_more": len(rows) > limit}
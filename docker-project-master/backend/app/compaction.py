@@ -0,0 +1,230 @@
+"""
+Background compaction of the tasks table.
+
+    python -m backend.app.compaction [--dry-run]
+
+Run periodically (CronJob, once a night), outside the API processes:
+
+- archives the tasks completed more than ARCHIVE_COMPLETED_AFTER_DAYS
+  days ago, COMPACTION_BATCH_SIZE at a time, each batch in its own short
+  transaction. Archiving moves a row to the tasks_archived partition
+  (see models.Task): the active partition and its indexes only hold the
+  working set. Clients see these tasks as updated (/changes, /events);
+- deletes the tombstones older than TOMBSTONE_RETENTION_DAYS days, and
+  records per owner the latest one deleted: /changes then answers 410 to
+  cursors before it, whose clients resync from the beginning;
+- vacuums and analyzes the table. Autovacuum never analyzes a partitioned
+  table itself, only its partitions: without this, plans reading both
+  partitions (export, /changes) rely on missing statistics.
+"""
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Dict
+
+from sqlalchemy import delete, false, func, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+
+from . import models, notifications
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+# 0 : aucune tâche n'est archivée automatiquement
+ARCHIVE_COMPLETED_AFTER_DAYS = int(os.getenv("ARCHIVE_COMPLETED_AFTER_DAYS", "0"))
+# Lignes déplacées par transaction : verrous et journal de chaque lot
+# restent courts, les écritures de l'API passent entre deux lots
+COMPACTION_BATCH_SIZE = int(os.getenv("COMPACTION_BATCH_SIZE", "1000"))
+# 0 : les traces de suppression sont gardées indéfiniment
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "0"))
+
+
+def archive_batch_query(cutoff: datetime, limit: int):
+    """
+    Build the statement archiving one batch of tasks completed before cutoff.
+
+    There is no completion date: updated_at, the time of the last write,
+    stands for it.
+
+    Args:
+        cutoff: Tasks last written before this naive UTC datetime are archived
+        limit: Maximum number of tasks archived by the statement
+
+    Returns:
+        An update returning the id and owner of each archived task
+    """
+    task = models.Task
+    # Même prédicat que ix_tasks_archivable, en littéraux : chaque lot ne
+    # lit que les entrées à archiver, dans l'index seul
+    batch = (
+        select(task.owner_id, task.id)
+        .where(models.ARCHIVABLE, task.updated_at < cutoff)
+        .limit(limit)
+    )
+    # (owner_id, id) : le début de la clé primaire
+    return (
+        update(task)
+        .where(task.archived == false(), tuple_(task.owner_id, task.id).in_(batch))
+        .values(archived=True)
+        .returning(task.id, task.owner_id)
+    )
+
+
+def archive_completed(engine: Engine, days: int, batch_size: int, dry_run: bool = False) -> int:
+    """
+    Archive the tasks completed more than days days ago.
+
+    Args:
+        engine: Sync engine
+        days: Age of the last write, in days
+        batch_size: Tasks archived per transaction
+        dry_run: Only count the tasks that would be archived
+
+    Returns:
+        Number of tasks archived (or to archive, with dry_run)
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    task = models.Task
+    if dry_run:
+        with engine.connect() as conn:
+            return conn.scalar(
+                select(func.count()).select_from(task)
+                .where(models.ARCHIVABLE, task.updated_at < cutoff)
+            )
+
+    archived = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(archive_batch_query(cutoff, batch_size)).all()
+            if rows and notifications.NOTIFY_ENABLED:
+                # Une notification par propriétaire du lot, comme l'import :
+                # seuls ses flux /events la reçoivent
+                for owner_id in sorted({row.owner_id for row in rows}):
+                    conn.execute(
+                        text("SELECT pg_notify(:channel, :payload)"),
+                        {"channel": notifications.CHANNEL,
+                         "payload": notifications.notify_payload("update", task.__tablename__, owner_id=owner_id)},
+                    )
+        archived += len(rows)
+        if rows:
+            logger.info("Archived %d tasks (%d so far)", len(rows), archived)
+        if len(rows) < batch_size:
+            return archived
+
+
+def prune_batch_query(cutoff: datetime, limit: int):
+    """
+    Build the statement deleting one batch of tombstones written before cutoff.
+
+    Args:
+        cutoff: Tombstones older than this naive UTC datetime are deleted
+        limit: Maximum number of tombstones deleted by the statement
+
+    Returns:
+        A delete returning the owner and change_id of each tombstone
+    """
+    tombstone = models.TaskTombstone
+    batch = select(tombstone.task_id).where(tombstone.deleted_at < cutoff).limit(limit)
+    return (
+        delete(tombstone)
+        .where(tombstone.task_id.in_(batch))
+        .returning(tombstone.owner_id, tombstone.change_id)
+    )
+
+
+def horizon_query(pruned: Dict[int, int]):
+    """
+    Build the statement moving the horizon of each owner to the latest
+    tombstone pruned, never backwards.
+
+    Args:
+        pruned: Highest change_id pruned, by owner
+    """
+    horizon = models.TaskChangeHorizon
+    now = datetime.utcnow()
+    # Par ordre de propriétaire : deux passes concurrentes verrouillent
+    # les lignes dans le même ordre
+    query = insert(horizon).values([
+        {"owner_id": owner_id, "change_id": change_id, "pruned_at": now}
+        for owner_id, change_id in sorted(pruned.items())
+    ])
+    return query.on_conflict_do_update(
+        index_elements=[horizon.owner_id],
+        set_={
+            "change_id": func.greatest(horizon.change_id, query.excluded.change_id),
+            "pruned_at": query.excluded.pruned_at,
+        },
+    )
+
+
+def prune_tombstones(engine: Engine, days: int, batch_size: int, dry_run: bool = False) -> int:
+    """
+    Delete the tombstones older than days days, and move the horizon of
+    their owners in the same transaction.
+
+    Args:
+        engine: Sync engine
+        days: Age of the tombstones, in days
+        batch_size: Tombstones deleted per transaction
+        dry_run: Only count the tombstones that would be deleted
+
+    Returns:
+        Number of tombstones deleted (or to delete, with dry_run)
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    tombstone = models.TaskTombstone
+    if dry_run:
+        with engine.connect() as conn:
+            return conn.scalar(select(func.count()).select_from(tombstone).where(tombstone.deleted_at < cutoff))
+
+    pruned = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(prune_batch_query(cutoff, batch_size)).all()
+            latest: Dict[int, int] = {}
+            for row in rows:
+                latest[row.owner_id] = max(latest.get(row.owner_id, 0), row.change_id)
+            if latest:
+                conn.execute(horizon_query(latest))
+        pruned += len(rows)
+        if rows:
+            logger.info("Pruned %d tombstones (%d so far)", len(rows), pruned)
+        if len(rows) < batch_size:
+            return pruned
+
+
+def vacuum(engine: Engine) -> None:
+    """
+    VACUUM (ANALYZE) the partitioned table: every partition, and the
+    statistics of the parent table.
+    """
+    # VACUUM refuse de s'exécuter dans une transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"VACUUM (ANALYZE) {models.Task.__tablename__}"))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Archive old completed tasks, prune old tombstones and vacuum the tasks table")
+    parser.add_argument("--dry-run", action="store_true", help="Count the tasks and tombstones without changing anything")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if ARCHIVE_COMPLETED_AFTER_DAYS > 0:
+        count = archive_completed(engine, ARCHIVE_COMPLETED_AFTER_DAYS, COMPACTION_BATCH_SIZE, args.dry_run)
+        verb = "to archive" if args.dry_run else "archived"
+        logger.info("%d tasks completed more than %d days ago %s", count, ARCHIVE_COMPLETED_AFTER_DAYS, verb)
+    if TOMBSTONE_RETENTION_DAYS > 0:
+        count = prune_tombstones(engine, TOMBSTONE_RETENTION_DAYS, COMPACTION_BATCH_SIZE, args.dry_run)
+        verb = "to prune" if args.dry_run else "pruned"
+        logger.info("%d tombstones older than %d days %s", count, TOMBSTONE_RETENTION_DAYS, verb)
+    if not args.dry_run:
+        vacuum(engine)
+        logger.info("Vacuumed %s", models.Task.__tablename__)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import os
+import zlib
+from typing import Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import metrics
+
+# Compression des réponses selon Accept-Encoding (brotli ou gzip), pour
+# les corps d'au moins COMPRESSION_MIN_BYTES. Derrière NGINX, laisser
+# "gzip off" côté Ingress : le backend compresse une fois, y compris les
+# pages servies depuis le cache.
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# En dessous, l'en-tête et le temps de compression coûtent plus qu'ils ne
+# rapportent (une tâche seule, un 404...)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+# Niveaux rapides : ~3x plus lent que gzip 1 pour un gain faible au-delà
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Par ordre de préférence à qualité égale
+ENCODINGS = ("br", "gzip")
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/msgpack", "text/")
+# Chaque événement doit partir immédiatement : jamais de tampon de compression
+EXCLUDED_TYPES = ("text/event-stream",)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the response encoding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Header value, e.g. "gzip, deflate, br;q=0.9"
+
+    Returns:
+        "br", "gzip", or None for an uncompressed response
+    """
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                continue
+        weights[name.strip()] = weight
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class _Compressor:
+    """Streaming compressor for one response"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits=31 : en-tête et somme de contrôle gzip
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        # Vidage à chaque morceau d'une réponse en flux : le client reçoit
+        # les lignes d'un export au fur et à mesure
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    Compress response bodies with brotli or gzip, as the client accepts.
+
+    Plain ASGI middleware, like MetricsMiddleware: a streamed response
+    (/export) is compressed chunk by chunk rather than buffered. A
+    compressed response gets a weak ETag, as it is no longer byte for
+    byte the representation the strong one names; conditional requests
+    compare ETags weakly (conditional.not_modified).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not COMPRESSION_ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                # Retenu jusqu'au premier morceau du corps, qui décide
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                content_type = headers.get("content-type", "")
+                compressible = (
+                    content_type.startswith(COMPRESSIBLE_TYPES)
+                    and not content_type.startswith(EXCLUDED_TYPES)
+                    and "content-encoding" not in headers
+                    and start["status"] not in (204, 206, 304)
+                )
+                if compressible:
+                    headers.add_vary_header("Accept-Encoding")
+                if not compressible or encoding is None or (not more_body and len(body) < COMPRESSION_MIN_BYTES):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                del headers["content-length"]
+                etag = headers.get("etag")
+                if etag is not None and not etag.startswith("W/"):
+                    headers["ETag"] = "W/" + etag
+                await send(start)
+
+            compressed = compressor.compress(body, final=not more_body)
+            metrics.COMPRESSION_BYTES.labels(encoding, "in").inc(len(body))
+            metrics.COMPRESSION_BYTES.labels(encoding, "out").inc(len(compressed))
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,223 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Hashable, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from . import database, models
+
+# Requêtes conditionnelles (ETag / If-None-Match, Last-Modified /
+# If-Modified-Since). Les listes d'un propriétaire sont versionnées par sa
+# ligne de task_list_versions, incrémentée par un trigger à chaque écriture
+# sur ses tâches : une liste inchangée se vérifie par une lecture de clé
+# primaire, et l'écriture d'un utilisateur ne change pas les ETags des
+# autres.
+
+# Ligne unique de task_list_version (migrations 3 et 7)
+VERSION_ROW_ID = 1
+
+# Le navigateur garde la réponse mais la revalide à chaque lecture
+CACHE_CONTROL = "no-cache"
+
+
+def install_version_trigger(conn) -> None:
+    """
+    Create the version row and the trigger incrementing it.
+
+    The trigger runs once per statement writing tasks (including TRUNCATE),
+    in the writer's transaction: the version changes exactly when the
+    write commits, whatever code path made it. Safe to run concurrently
+    from several replicas.
+
+    Args:
+        conn: Connection inside a transaction
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('task_list_version'))"))
+    conn.execute(
+        insert(models.TaskListVersion)
+        .values(id=VERSION_ROW_ID, version=0, changed_at=datetime.utcnow())
+        .on_conflict_do_nothing()
+    )
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION bump_task_list_version() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE task_list_version
+            SET version = version + 1, changed_at = timezone('UTC', now())
+            WHERE id = {VERSION_ROW_ID};
+            RETURN NULL;
+        END $$
+    """))
+    database.create_trigger_if_not_exists(
+        conn, "tasks", "tasks_bump_list_version",
+        "AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON tasks "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_task_list_version()",
+    )
+
+
+def install_owner_version_triggers(conn) -> None:
+    """
+    Replace the single version row with one version per owner.
+
+    Statement triggers increment, in the writer's transaction, the row of
+    each owner whose tasks the statement wrote (a TRUNCATE increments them
+    all). Rows are locked in owner order, so that concurrent writes to
+    several owners cannot deadlock. Existing owners start from the single
+    row's version. Safe to run concurrently from several replicas.
+
+    Args:
+        conn: Connection inside a transaction
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('task_list_version'))"))
+    models.TaskListOwnerVersion.__table__.create(conn, checkfirst=True)
+    conn.execute(text("""
+        INSERT INTO task_list_versions (owner_id, version, changed_at)
+        SELECT owners.owner_id, v.version, v.changed_at
+        FROM (SELECT DISTINCT owner_id FROM tasks) AS owners
+        CROSS JOIN task_list_version AS v
+        ON CONFLICT (owner_id) DO NOTHING
+    """))
+    # Une table de transition ne peut servir qu'à un seul événement : un
+    # trigger par événement, qui nomment tous leur table changed_tasks.
+    # owner_id n'est jamais modifié : NEW TABLE suffit pour UPDATE.
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION bump_owner_list_versions() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO task_list_versions AS v (owner_id, version, changed_at)
+            SELECT owner_id, 1, timezone('UTC', now())
+            FROM (SELECT DISTINCT owner_id FROM changed_tasks) AS owners
+            ORDER BY owner_id
+            ON CONFLICT (owner_id) DO UPDATE
+            SET version = v.version + 1, changed_at = excluded.changed_at;
+            RETURN NULL;
+        END $$
+    """))
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION bump_all_list_versions() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE task_list_versions
+            SET version = version + 1, changed_at = timezone('UTC', now());
+            RETURN NULL;
+        END $$
+    """))
+    for event, transition in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+        database.create_trigger_if_not_exists(
+            conn, "tasks", f"tasks_bump_owner_version_{event.lower()}",
+            f"AFTER {event} ON tasks REFERENCING {transition} TABLE AS changed_tasks "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_owner_list_versions()",
+        )
+    database.create_trigger_if_not_exists(
+        conn, "tasks", "tasks_bump_owner_version_truncate",
+        "AFTER TRUNCATE ON tasks FOR EACH STATEMENT EXECUTE FUNCTION bump_all_list_versions()",
+    )
+    # L'ancienne ligne unique sérialisait toutes les écritures
+    conn.execute(text("DROP TRIGGER IF EXISTS tasks_bump_list_version ON tasks"))
+    conn.execute(text("DROP FUNCTION IF EXISTS bump_task_list_version()"))
+
+
+def version_query(owner_id: int):
+    """
+    Select the list version of an owner and the time of their last write.
+
+    Always returns one row: version 0 and no time for an owner who never
+    wrote. Uncorrelated, so it can also be added as columns to a query on
+    tasks, read in the same snapshot.
+    """
+    version = models.TaskListOwnerVersion
+    current = select(version.version, version.changed_at).where(version.owner_id == owner_id)
+    return select(
+        func.coalesce(current.with_only_columns(version.version).scalar_subquery(), 0).label("version"),
+        current.with_only_columns(version.changed_at).scalar_subquery().label("changed_at"),
+    )
+
+
+def _etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def http_date(value: datetime) -> str:
+    """
+    Format a naive UTC datetime as an HTTP date.
+    """
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def list_validators(key: Hashable, version: int, changed_at: Optional[datetime]) -> Dict[str, str]:
+    """
+    Validator headers of a task list.
+
+    Args:
+        key: Normalized request parameters, so that each page and filter
+            combination has its own ETag
+        version: List version read with the page (or before it)
+        changed_at: Time of the last write, naive UTC
+
+    Returns:
+        ETag, Last-Modified and Cache-Control headers
+    """
+    headers = {"ETag": _etag("tasks", key, version), "Cache-Control": CACHE_CONTROL}
+    if changed_at is not None:
+        headers["Last-Modified"] = http_date(changed_at)
+    return headers
+
+
+def item_validators(task_id: int, updated_at: datetime) -> Dict[str, str]:
+    """
+    Validator headers of a single task.
+    """
+    return {
+        "ETag": _etag("task", task_id, updated_at),
+        "Last-Modified": http_date(updated_at),
+        "Cache-Control": CACHE_CONTROL,
+    }
+
+
+def not_modified(if_none_match: Optional[str], if_modified_since: Optional[str], headers: Dict[str, str]) -> bool:
+    """
+    Whether a conditional GET can be answered with 304 Not Modified.
+
+    As in RFC 9110, If-Modified-Since is ignored when If-None-Match is sent.
+    Last-Modified has a one second resolution, so If-Modified-Since only
+    matches a date at least one second after it.
+
+    Args:
+        if_none_match: Value of the If-None-Match request header
+        if_modified_since: Value of the If-Modified-Since request header
+        headers: Validators of the current representation
+
+    Returns:
+        True if the client copy is still current
+    """
+    if if_none_match:
+        if if_none_match.strip() == "*":
+            return True
+        etag = headers["ETag"]
+        # Comparaison faible : W/"x" désigne la même version que "x"
+        candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+        return etag in candidates
+
+    if if_modified_since and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        # Last-Modified est tronqué à la seconde : une écriture plus tard
+        # dans la même seconde garde la même date. La copie du client n'est
+        # sûrement à jour que si elle date de la seconde suivante.
+        return parsedate_to_datetime(headers["Last-Modified"]) + timedelta(seconds=1) <= since
+
+    return False
+
+
+def validator_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """
+    Subset of the response headers repeated on a 304 response.
+    """
+    return {name: value for name, value in headers.items() if name in ("ETag", "Last-Modified", "Cache-Control")}
@@ -0,0 +1,158 @@
+import asyncio
+import os
+from typing import AsyncIterator, Optional, Set
+
+import orjson
+
+from . import metrics
+
+# Diffusion des écritures aux navigateurs en Server-Sent Events (/events).
+# Les événements viennent de la connexion LISTEN du replica (voir
+# notifications.py) : ils ne partent qu'une fois l'écriture validée.
+
+# Événements en attente par client ; au-delà, le client est jugé trop lent.
+# Un lot maximal (1000 tâches) doit y tenir.
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "2000"))
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "1000"))
+# Sous le proxy-read-timeout de NGINX (60 s par défaut)
+EVENTS_HEARTBEAT_INTERVAL = float(os.getenv("EVENTS_HEARTBEAT_INTERVAL", "15"))
+
+# Délai de reconnexion suggéré à EventSource, en millisecondes
+RETRY_MS = 3000
+
+# Marqueurs placés dans la file d'un client
+RESYNC = object()
+OVERFLOW = object()
+CLOSE = object()
+
+
+class Subscriber:
+    """One open /events stream of an owner and its bounded queue of pending events"""
+
+    def __init__(self, maxsize: int, owner_id: Optional[int] = None):
+        self.owner_id = owner_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def offer(self, item) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Client trop lent : on vide sa file et il devra se resynchroniser
+            # par /changes, plutôt que de retenir la mémoire du replica
+            self.overflowed = True
+            metrics.EVENTS_DROPPED.inc()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+
+class Broadcaster:
+    """
+    Fan out change notifications to every open /events stream of this
+    process. Publishing never blocks: each subscriber has its own bounded
+    queue.
+    """
+
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE, max_subscribers: int = EVENTS_MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.subscribers: Set[Subscriber] = set()
+        self.closed = False
+
+    def subscribe(self, owner_id: Optional[int] = None) -> Optional[Subscriber]:
+        """
+        Register a new stream.
+
+        Args:
+            owner_id: Owner whose changes the stream receives, None for all
+
+        Returns:
+            The subscriber, or None when max_subscribers streams are open
+            or the process is shutting down
+        """
+        if self.closed or len(self.subscribers) >= self.max_subscribers:
+            return None
+        subscriber = Subscriber(self.queue_size, owner_id)
+        self.subscribers.add(subscriber)
+        metrics.EVENTS_SUBSCRIBERS.set(len(self.subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+        metrics.EVENTS_SUBSCRIBERS.set(len(self.subscribers))
+
+    def publish(self, change: dict) -> None:
+        """
+        Queue a change for the subscribers of its owner.
+
+        Args:
+            change: Notification payload (table, op, id, owner). A change
+                without owner (e.g. a batch spanning owners) goes to every
+                subscriber
+        """
+        owner_id = change.get("owner")
+        for subscriber in self.subscribers:
+            if owner_id is None or subscriber.owner_id is None or subscriber.owner_id == owner_id:
+                subscriber.offer(change)
+
+    def resync(self) -> None:
+        """
+        Ask every subscriber to reload its state, after notifications may
+        have been missed.
+        """
+        for subscriber in self.subscribers:
+            subscriber.offer(RESYNC)
+
+    def close(self) -> None:
+        """
+        End every open stream and refuse new ones, at shutdown. Clients
+        reconnect after RETRY_MS, to another replica.
+        """
+        self.closed = True
+        for subscriber in self.subscribers:
+            subscriber.offer(CLOSE)
+
+
+def _message(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def stream(broadcaster: Broadcaster, subscriber: Subscriber) -> AsyncIterator[bytes]:
+    """
+    Body of an /events response.
+
+    Pending changes are sent together as one "change" event holding a
+    list, so a bulk write costs one message per client. A comment line is
+    sent when nothing happened for EVENTS_HEARTBEAT_INTERVAL seconds, to
+    keep proxies from closing the connection.
+    """
+    try:
+        yield f"retry: {RETRY_MS}\n\n".encode()
+        while True:
+            try:
+                item = await asyncio.wait_for(subscriber.queue.get(), EVENTS_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield b": heartbeat\n\n"
+                continue
+
+            items = [item]
+            while not subscriber.queue.empty():
+                items.append(subscriber.queue.get_nowait())
+
+            if CLOSE in items:
+                return
+            if OVERFLOW in items:
+                yield _message("resync", {"reason": "overflow"})
+                return
+            if RESYNC in items:
+                yield _message("resync", {"reason": "reconnect"})
+                continue
+            yield _message("change", [
+                {"table": change.get("table"), "op": change.get("op"), "id": change.get("id")}
+                for change in items
+            ])
+    finally:
+        broadcaster.unsubscribe(subscriber)
@@ -0,0 +1,297 @@
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, Request
+from sqlalchemy import event, func, select, text, true
+from sqlalchemy.orm import Session
+
+from . import database, models
+
+# Identité de la requête : jeton signé (JWT HS256) porté par l'en-tête
+# Authorization: Bearer, émis par le service d'authentification placé
+# devant l'application, qui partage AUTH_SECRET avec l'API (aucun n'est
+# fourni ici ; voir main() pour signer un jeton à la main). Le
+# propriétaire des tâches est le claim "sub" ; rien d'autre envoyé par le
+# client n'est cru. Chaque requête SQL porte un filtre owner_id explicite,
+# servi par les index menés par owner_id.
+AUTH_SECRET = os.getenv("AUTH_SECRET", "")
+# Décalage toléré entre les horloges de l'émetteur et de l'API, sur exp
+AUTH_LEEWAY = float(os.getenv("AUTH_LEEWAY", "30"))
+# Développement seulement (docker-compose.yml) : propriétaire des requêtes
+# sans en-tête Authorization, pour utiliser l'application sans service
+# d'authentification. Non défini (par défaut) : ces requêtes répondent
+# 401. Un jeton présent est toujours vérifié.
+AUTH_DEV_OWNER_ID = int(os.getenv("AUTH_DEV_OWNER_ID") or 0) or None
+# Valeurs d'exemple (documentation, anciens manifestes) : n'importe qui
+# pourrait signer des jetons avec, l'API refuse de démarrer
+_PLACEHOLDER_SECRETS = ("change-me", "changeme")
+
+# Politiques RLS de PostgreSQL en garde-fou : chaque transaction commence
+# par poser son propriétaire, une requête SQL de plus par appel. Elles ne
+# filtrent que pour un rôle qui n'est ni propriétaire des tables ni
+# superutilisateur : l'API se connecte avec API_ROLE (migration 12).
+# false : seulement pour une API connectée en propriétaire, sans RLS.
+DB_ROW_SECURITY = os.getenv("DB_ROW_SECURITY", "true").lower() == "true"
+
+# Rôle de connexion de l'API, soumis aux politiques, sans droit sur le
+# schéma ; créé sans LOGIN, son mot de passe est posé par les migrations
+# (DB_API_PASSWORD, voir migrations.main)
+API_ROLE = "todo_api"
+
+# Paramètre de transaction lu par les politiques
+OWNER_SETTING = "app.owner_id"
+# Après une transaction qui l'a posé, le paramètre vaut '' et non NULL
+CURRENT_OWNER = f"nullif(current_setting('{OWNER_SETTING}', true), '')::integer"
+
+# Tables de la migration 8 ; task_list_versions est ajoutée par la migration 9
+ROW_SECURITY_TABLES = (models.Task.__tablename__, models.TaskTombstone.__tablename__)
+
+# Limite du type integer de owner_id
+_MAX_OWNER_ID = 2**31 - 1
+
+_TOKEN_HEADER = {"alg": "HS256", "typ": "JWT"}
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _signature(signed: str, secret: str) -> bytes:
+    return hmac.new(secret.encode(), signed.encode(), hashlib.sha256).digest()
+
+
+def issue_token(owner_id: int, ttl: float = 3600, secret: Optional[str] = None, now: Optional[float] = None) -> str:
+    """
+    Sign a token identifying owner_id, as the authentication service in front of the app does.
+
+    Args:
+        owner_id: Owner of the tasks, stored in the "sub" claim
+        ttl: Validity of the token, in seconds
+        secret: Signing key, AUTH_SECRET by default
+        now: Current Unix time, for tests
+
+    Returns:
+        A JWT signed with HS256
+    """
+    secret = AUTH_SECRET if secret is None else secret
+    if not secret:
+        raise ValueError("AUTH_SECRET is not set")
+    now = time.time() if now is None else now
+    claims = {"sub": str(owner_id), "iat": int(now), "exp": int(now + ttl)}
+    signed = ".".join(_b64encode(json.dumps(part, separators=(",", ":")).encode()) for part in (_TOKEN_HEADER, claims))
+    return f"{signed}.{_b64encode(_signature(signed, secret))}"
+
+
+def verify_token(token: str, secret: Optional[str] = None, now: Optional[float] = None) -> int:
+    """
+    Check the signature and expiry of a token made by issue_token.
+
+    Args:
+        token: JWT received from the client
+        secret: Signing key, AUTH_SECRET by default
+        now: Current Unix time, for tests
+
+    Returns:
+        The owner id of the "sub" claim
+
+    Raises:
+        ValueError: If the token is malformed, badly signed, expired, or
+            if no secret is configured
+    """
+    secret = AUTH_SECRET if secret is None else secret
+    if not secret:
+        raise ValueError("AUTH_SECRET is not set")
+    try:
+        header, claims, signature = token.split(".")
+        # Seul HS256 est accepté : jamais "none" ni un algorithme choisi par le client
+        if json.loads(_b64decode(header)).get("alg") != _TOKEN_HEADER["alg"]:
+            raise ValueError("Unsupported token algorithm")
+        if not hmac.compare_digest(_b64decode(signature), _signature(f"{header}.{claims}", secret)):
+            raise ValueError("Invalid token signature")
+        payload = json.loads(_b64decode(claims))
+        expires_at = float(payload["exp"])
+        owner_id = int(payload["sub"])
+    except (KeyError, TypeError, AttributeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(str(e) or "Invalid token") from e
+    now = time.time() if now is None else now
+    if expires_at + AUTH_LEEWAY < now:
+        raise ValueError("Token expired")
+    if not 0 < owner_id <= _MAX_OWNER_ID:
+        raise ValueError("Invalid token subject")
+    return owner_id
+
+
+def check_secret(secret: Optional[str] = None) -> None:
+    """
+    Refuse a placeholder signing key, at startup.
+
+    Args:
+        secret: Signing key, AUTH_SECRET by default
+
+    Raises:
+        RuntimeError: If the key is an example value such as "change-me..."
+    """
+    secret = AUTH_SECRET if secret is None else secret
+    if secret.strip().lower().startswith(_PLACEHOLDER_SECRETS):
+        raise RuntimeError("AUTH_SECRET is a placeholder: set a random value (openssl rand -hex 32)")
+
+
+def auth_headers(owner_id: int, ttl: float = 3600) -> dict:
+    """
+    Authorization header of owner_id, for scripts calling the API.
+    """
+    return {"Authorization": f"Bearer {issue_token(owner_id, ttl)}"}
+
+
+async def current_owner(request: Request) -> int:
+    """
+    FastAPI dependency returning the owner id of the request, read from
+    its bearer token, or AUTH_DEV_OWNER_ID for a request without
+    Authorization header when it is set.
+
+    Raises:
+        HTTPException: 401 without a valid token
+    """
+    authorization = request.headers.get("authorization", "")
+    if not authorization and AUTH_DEV_OWNER_ID is not None:
+        return AUTH_DEV_OWNER_ID
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return verify_token(token.strip())
+    except ValueError:
+        raise HTTPException(
+            status_code=401, detail="Invalid token", headers={"WWW-Authenticate": 'Bearer error="invalid_token"'}
+        )
+
+
+def owner_statement(owner_id: int):
+    """
+    Select setting the owner read by the row security policies.
+
+    Local to the transaction: nothing stays on a connection returned to
+    the pool, nor on a server connection shared by PgBouncer.
+    """
+    return select(func.set_config(OWNER_SETTING, str(owner_id), true()))
+
+
+def session_statements(owner_id: int) -> List:
+    """
+    Statements to run first in a transaction of owner_id, outside of a
+    session bound with bind_owner (e.g. database.stream_partitions).
+    """
+    return [owner_statement(owner_id)] if DB_ROW_SECURITY else []
+
+
+def bind_owner(db: database.DatabaseSession, owner_id: int) -> None:
+    """
+    Make every transaction of a session set owner_id first, with
+    DB_ROW_SECURITY.
+    """
+    if DB_ROW_SECURITY:
+        # AsyncSession comme ThreadedSession enveloppent une Session
+        db.sync_session.info["owner_id"] = owner_id
+
+
+@event.listens_for(Session, "after_begin")
+def _set_owner(session, transaction, connection) -> None:
+    owner_id = session.info.get("owner_id")
+    if owner_id is not None:
+        connection.execute(owner_statement(owner_id))
+
+
+def install_row_security(conn, tables: Sequence[str] = ROW_SECURITY_TABLES) -> None:
+    """
+    Enable row level security on the tables holding owner data, with one
+    policy restricting reads and writes to the owner set by the
+    transaction (see owner_statement).
+
+    Not forced: the table owner, which migrations and the compaction job
+    connect as, is not subject to it; the API connects as API_ROLE.
+
+    Args:
+        conn: Connection inside a transaction
+        tables: Tables with an owner_id column
+    """
+    for table in tables:
+        conn.execute(text(f"ALTER TABLE {table} ENABLE ROW LEVEL SECURITY"))
+        # Pas de CREATE POLICY IF NOT EXISTS avant PostgreSQL 15
+        exists = conn.scalar(
+            text("SELECT 1 FROM pg_policies WHERE tablename = :table AND policyname = :name"),
+            {"table": table, "name": f"{table}_owner"},
+        )
+        if not exists:
+            conn.execute(text(
+                f"CREATE POLICY {table}_owner ON {table} "
+                f"USING (owner_id = {CURRENT_OWNER}) WITH CHECK (owner_id = {CURRENT_OWNER})"
+            ))
+
+
+def install_api_role(conn, grants: Dict[str, str]) -> None:
+    """
+    Create API_ROLE if missing and grant it privileges on the tables the
+    API reads and writes, and on the sequence of task ids.
+
+    The role owns nothing and is not a superuser: the row security
+    policies apply to it. It has no privilege on other tables, nor on
+    schema_migrations.
+
+    Args:
+        conn: Connection inside a transaction
+        grants: Privileges by table, e.g. {"tasks": "SELECT, INSERT"}
+    """
+    # Rôle commun à toutes les bases de l'instance : peut déjà exister
+    conn.execute(text(f"""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = '{API_ROLE}') THEN
+                CREATE ROLE {API_ROLE} NOLOGIN;
+            END IF;
+        END $$
+    """))
+    for table, privileges in grants.items():
+        conn.execute(text(f"GRANT {privileges} ON {table} TO {API_ROLE}"))
+    sequence = conn.scalar(text(f"SELECT pg_get_serial_sequence('{models.Task.__tablename__}', 'id')"))
+    conn.execute(text(f"GRANT USAGE, SELECT ON SEQUENCE {sequence} TO {API_ROLE}"))
+
+
+def set_api_password(conn, password: str) -> None:
+    """
+    Let API_ROLE log in with password.
+
+    Args:
+        conn: Connection as a role allowed to alter API_ROLE
+        password: Password of DATABASE_URL in the API's environment
+    """
+    # Pas de paramètre lié dans ALTER ROLE : format() cite le littéral,
+    # dont les % sont doublés pour le pilote
+    statement = conn.scalar(
+        text("SELECT format('ALTER ROLE %I LOGIN PASSWORD %L', CAST(:role AS text), CAST(:password AS text))"),
+        {"role": API_ROLE, "password": password},
+    )
+    conn.exec_driver_sql(statement.replace("%", "%%"))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Print a token for an owner, signed with AUTH_SECRET")
+    parser.add_argument("owner_id", type=int)
+    parser.add_argument("--ttl", type=float, default=3600, help="Validity in seconds")
+    args = parser.parse_args()
+    print(issue_token(args.owner_id, args.ttl))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import orjson
+
+from . import metrics
+
+# Journalisation non bloquante : les requêtes ne font que formater
+# l'enregistrement en JSON et le déposer dans une file ; un thread écrit
+# le fichier (lu par le sidecar) avec rotation. Avec plusieurs workers
+# (server.py), la rotation est faite par le superviseur.
+
+# Vide : sortie standard au lieu d'un fichier
+LOG_FILE = os.getenv("LOG_FILE", "/app/logs/backend.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Niveaux par logger, ex. "backend.app.tracing=WARNING,sqlalchemy.engine=INFO"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# Rotation par taille (Mio), ou par date si LOG_ROTATE_WHEN est défini
+# ("midnight", "h"... voir TimedRotatingFileHandler)
+LOG_ROTATE_MB = float(os.getenv("LOG_ROTATE_MB", "10"))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "")
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+# Au-delà, les enregistrements sont abandonnés plutôt que de bloquer
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Défini par server.py pour ses workers : le fichier est partagé, seul le
+# superviseur le fait tourner (SharedFileRotator)
+SHARED_FILE_ENV = "LOG_FILE_SHARED"
+
+# Attributs propres à LogRecord ; les autres viennent de extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per record: ts, level, logger, message, the fields
+    passed with extra={...}, and exc_info as text.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.LOG_RECORDS_DROPPED.inc()
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """
+    Parse LOG_LEVELS ("name=LEVEL,name=LEVEL").
+    """
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _rotating_handler(delay: bool = False) -> logging.handlers.BaseRotatingHandler:
+    if LOG_ROTATE_WHEN:
+        return logging.handlers.TimedRotatingFileHandler(
+            LOG_FILE, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=delay, utc=True,
+        )
+    return logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=int(LOG_ROTATE_MB * 1024 * 1024), backupCount=LOG_BACKUP_COUNT,
+        encoding="utf-8", delay=delay,
+    )
+
+
+def _output_handler() -> logging.Handler:
+    if not LOG_FILE:
+        return logging.StreamHandler()
+    os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+    if os.getenv(SHARED_FILE_ENV):
+        # Plusieurs workers : chacun écrit en ajout et rouvre le fichier
+        # quand le superviseur l'a renommé. Une rotation par worker
+        # renommerait le fichier sous les autres.
+        return logging.handlers.WatchedFileHandler(LOG_FILE, encoding="utf-8")
+    return _rotating_handler()
+
+
+class SharedFileRotator(threading.Thread):
+    """
+    Rotate LOG_FILE on behalf of the worker processes writing it, by size
+    (LOG_ROTATE_MB) or by date (LOG_ROTATE_WHEN), from the supervisor.
+
+    Workers started after share_log_file() write the file through a
+    WatchedFileHandler, which reopens it once renamed.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        super().__init__(name="log-rotation", daemon=True)
+        self.interval = interval
+        self._handler = _rotating_handler(delay=True)
+        self._stopped = threading.Event()
+
+    def due(self) -> bool:
+        if isinstance(self._handler, logging.handlers.TimedRotatingFileHandler):
+            return time.time() >= self._handler.rolloverAt
+        try:
+            return 0 < self._handler.maxBytes <= os.path.getsize(LOG_FILE)
+        except FileNotFoundError:
+            return False
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                if self.due():
+                    self._handler.doRollover()
+            except OSError:
+                # Réessayé au tour suivant ; les workers écrivent toujours
+                pass
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def share_log_file() -> Optional[SharedFileRotator]:
+    """
+    Prepare LOG_FILE to be written by several worker processes: set
+    SHARED_FILE_ENV for the workers started afterwards and rotate the
+    file from this process.
+
+    Returns:
+        The started rotator, or None when logging to standard output
+    """
+    if not LOG_FILE:
+        return None
+    os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+    os.environ[SHARED_FILE_ENV] = "true"
+    rotator = SharedFileRotator()
+    rotator.start()
+    return rotator
+
+
+def setup_logging() -> None:
+    """
+    Route every log record through a bounded queue to the output handler.
+
+    Replaces the root handlers. uvicorn's access log is turned off: access
+    logs are written, sampled, by monitoring.MetricsMiddleware.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = _output_handler()
+    # Déjà formaté en JSON par le QueueHandler, dans le thread appelant
+    output.setFormatter(logging.Formatter("%(message)s"))
+    handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    handler.setFormatter(JSONFormatter())
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    for name, level in parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+    logging.getLogger("uvicorn.access").disabled = True
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    # Et non à la fin du lifespan : les logs de l'arrêt sont aussi écrits
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Write the queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
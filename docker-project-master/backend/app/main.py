@@ -1,26 +1,114 @@
-#Sidecar pour les logs du backend
 import logging
 import os
+import re
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-os.makedirs("/app/logs", exist_ok=True)  
+# Avant tout le reste : les logs passent par la file de logs.py, écrite
+# dans /app/logs/backend.log (lu par le sidecar)
+from . import logs
+logs.setup_logging()
 
-logging.basicConfig(
-    filename='/app/logs/backend.log',  
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s %(message)s',
-)
-logging.info("Backend démarré")
+from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import Body, FastAPI, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+import orjson
+from sqlalchemy import ARRAY, Float, Integer, any_, bindparam, cast, delete, func, insert, select, update
 from fastapi.middleware.cors import CORSMiddleware
-from . import models, schemas, database
-from .database import engine, SessionLocal
-from .utils import APIResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+from . import models, schemas, agenda, changes, conditional, database, events, identity, metrics, notifications, pagination, serializers, stats, tracing, transfer
+from .cache import ResponseCache, TTLCache
+from .compression import CompressionMiddleware
+from .database import DatabaseSession
+from .monitoring import MetricsMiddleware
+from .profiling import ProfilerMiddleware
+from .utils import APIResponse, ErrorDetail
+
+logger = logging.getLogger(__name__)
+logger.info("Backend démarré")
+
+# "core" : colonnes en SQLAlchemy Core sérialisées directement en JSON
+# "orm"  : instances models.Task validées par response_model (ancien chemin)
+TASK_READ_MODE = os.getenv("TASK_READ_MODE", "core")
+
+BULK_MAX_ITEMS = 1000
+
+# Compteurs du tableau de bord, recalculés au plus toutes les STATS_CACHE_TTL
+# secondes (0 désactive le cache)
+stats_cache = TTLCache(ttl=float(os.getenv("STATS_CACHE_TTL", "5")))
+agenda_cache = TTLCache(ttl=float(os.getenv("STATS_CACHE_TTL", "5")))
+
+# Pages de /get_task déjà sérialisées, par combinaison de paramètres.
+# Uniquement en lecture "core" : le mode "orm" sérialise via response_model.
+task_cache = ResponseCache(
+    "tasks",
+    ttl=float(os.getenv("TASK_CACHE_TTL", "30")),
+    max_bytes=int(float(os.getenv("TASK_CACHE_MAX_MB", "32")) * 1024 * 1024),
+    enabled=os.getenv("TASK_CACHE_ENABLED", "true").lower() == "true" and TASK_READ_MODE == "core",
+)
+
+# Le schéma est géré par les migrations (python -m backend.app.migrations),
+# appliquées avant le démarrage : aucune requête SQL à l'import
+
+def invalidate_caches(owner: Optional[int] = None):
+    # Appelé après chaque écriture validée par ce processus, et à chaque
+    # notification d'une écriture faite par un autre replica. Les clés de
+    # cache commencent par le propriétaire : seules les siennes sont
+    # vidées. Sans propriétaire (notifications perdues), tout est vidé.
+    stats_cache.clear(owner)
+    agenda_cache.clear(owner)
+    task_cache.invalidate(owner)
+
+broadcaster = events.Broadcaster()
+
+tracing.setup_tracing()
+
+def on_change(change: dict):
+    # Les écritures de ce processus ont déjà vidé ses caches
+    if change.get("origin") != notifications.REPLICA_ID:
+        invalidate_caches(change.get("owner"))
+    broadcaster.publish(change)
+
+def on_listen_reconnect():
+    # Des notifications ont pu être perdues pendant la coupure
+    invalidate_caches()
+    broadcaster.resync()
 
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    identity.check_secret()
+    if identity.AUTH_DEV_OWNER_ID is not None:
+        logger.warning(
+            "AUTH_DEV_OWNER_ID is set: requests without a token act as owner %d (development only)",
+            identity.AUTH_DEV_OWNER_ID,
+        )
+    listener = None
+    if notifications.NOTIFY_ENABLED:
+        listener = notifications.ChangeListener(
+            notifications.listen_dsn(notifications.DB_LISTEN_URL),
+            on_change=on_change,
+            on_reconnect=on_listen_reconnect,
+        )
+        listener.start()
+    app.state.change_listener = listener
+    # Rouvert si l'application redémarre dans le même processus (tests)
+    broadcaster.closed = False
+    yield
+    if listener is not None:
+        await listener.stop()
+    # Plus aucune notification à diffuser : les flux /events encore ouverts
+    # se terminent (déjà fait par server.py sous uvicorn, avant l'attente
+    # des connexions)
+    broadcaster.close()
+    # Les requêtes en cours sont terminées (server.py) : les connexions
+    # rendues au pool sont fermées proprement plutôt que coupées
+    await database.dispose_engines()
+    tracing.shutdown_tracing()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,22 +116,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
+# Le dernier ajouté englobe les précédents : les métriques mesurent tout,
+# le span de la requête couvre le profilage éventuel, la compression est
+# comptée dans la durée des requêtes
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(tracing.TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
-database.create_tables_if_not_exist([models.Task])
+def notify(op: str) -> list:
+    # Colonne RETURNING supplémentaire publiant un NOTIFY par ligne écrite,
+    # ignorée par task_dict
+    if not notifications.NOTIFY_ENABLED:
+        return []
+    return [notifications.notify_column(op, models.Task.__table__, models.Task.id, models.Task.owner_id)]
 
 # Dependency
-def get_db():
-    db = SessionLocal()
+async def get_db(owner: int = Depends(identity.current_owner)):
+    db = database.open_session()
+    identity.bind_owner(db, owner)
     try:
         yield db
     except Exception as e:
-        # Log any database-related exceptions
-        print(f"Database session error: {e}")
-        db.rollback()
+        logger.debug("Database session error", extra={"error": repr(e)})
+        await db.rollback()
         raise
     finally:
-        db.close()
+        await db.close()
 
 @app.get("/")
 async def root():
@@ -57,56 +158,273 @@ async def root():
         }
     )
 @app.post("/create_task", response_model=schemas.Task)
-def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
-    db_task = models.Task(**task.dict())
-    db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+async def create_task(
+    task: schemas.TaskCreate,
+    owner: int = Depends(identity.current_owner),
+    db: DatabaseSession = Depends(get_db)
+):
+    result = await db.execute(
+        insert(models.Task)
+        .values(**task.model_dump(), owner_id=owner)
+        .returning(*serializers.TASK_COLUMNS, *notify("insert"))
+    )
+    db_task = serializers.task_dict(result.one())
+    await db.commit()
+    invalidate_caches(owner)
     return db_task
 
+def search_words(q: Optional[str]) -> List[str]:
+    # Seuls les caractères de mots sont gardés : pas d'injection de syntaxe tsquery
+    return re.findall(r"\w+", q.lower()) if q else []
+
+def search_query(q: str):
+    # Chaque mot devient un préfixe ("refac" trouve "refactor"), tous requis
+    words = search_words(q)
+    if not words:
+        return None
+    return func.to_tsquery(models.SEARCH_CONFIG, " & ".join(f"{word}:*" for word in words))
+
 @app.get("/get_task", response_model=list[schemas.Task])
-def read_tasks(
+async def read_tasks(
+    response: Response,
     archived: bool = False,
     starred: bool = None,
-    priority: str = None,
-    db: Session = Depends(get_db)
+    completed: bool = None,
+    priority: Optional[List[schemas.PriorityEnum]] = Query(None),
+    q: Optional[str] = Query(None, max_length=200, description="Recherche dans le titre et la description"),
+    tags: Optional[List[str]] = Query(None, description="Tâches portant tous ces tags"),
+    any_tags: Optional[List[str]] = Query(None, description="Tâches portant au moins un de ces tags"),
+    sort: Optional[schemas.TaskSort] = Query(None, description="Par défaut : relevance avec q, due_date sinon"),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    fields: Optional[str] = Query(None, description="Champs renvoyés, ex. id,title,due_date ; tous par défaut"),
+    format: schemas.TaskFormat = Query(schemas.TaskFormat.JSON, description="columnar : un tableau par champ"),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    owner: int = Depends(identity.current_owner),
+    db: DatabaseSession = Depends(get_db)
 ):
-    query = db.query(models.Task).filter(models.Task.archived == archived)
+    try:
+        fields = serializers.parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if TASK_READ_MODE == "orm" and (fields != serializers.TASK_FIELDS or format != schemas.TaskFormat.JSON):
+        raise HTTPException(status_code=400, detail="fields and format require TASK_READ_MODE=core")
+    media_type = serializers.MEDIA_TYPES[format]
+
+    # Deux requêtes équivalentes (ordre des filtres, casse des tags...)
+    # partagent la même entrée de cache
+    cache_key = (
+        owner, archived, starred, completed,
+        tuple(sorted({p.value for p in priority or ()})),
+        tuple(search_words(q)),
+        tuple(sorted({tag.lower() for tag in tags or ()})),
+        tuple(sorted({tag.lower() for tag in any_tags or ()})),
+        sort, cursor, limit, fields, format,
+    )
+    cached = task_cache.get(cache_key)
+    if cached is not None:
+        body, headers = cached
+        if conditional.not_modified(if_none_match, if_modified_since, headers):
+            return Response(status_code=304, headers=conditional.validator_headers(headers))
+        return Response(content=body, media_type=media_type, headers=headers)
+    generation = task_cache.generation
+
+    if if_none_match or if_modified_since:
+        # Revalidation : une lecture de clé primaire, sans charger les tâches
+        latest = (await db.execute(conditional.version_query(owner))).one()
+        validators = conditional.list_validators(cache_key, latest.version, latest.changed_at)
+        if conditional.not_modified(if_none_match, if_modified_since, validators):
+            return Response(status_code=304, headers=validators)
+
+    columns = [models.Task] if TASK_READ_MODE == "orm" else serializers.TASK_COLUMNS
+
+    rank = None
+    tsquery = search_query(q) if q else None
+    if tsquery is not None:
+        # En double précision : un real relu en texte (psycopg2) ne
+        # redonnerait pas exactement la même valeur dans le curseur
+        rank = cast(func.ts_rank(models.search_vector, tsquery), Float(53))
+        columns = [*columns, rank.label("rank")]
+
+    if sort is None:
+        sort = schemas.TaskSort.RELEVANCE if rank is not None else schemas.TaskSort.DUE_DATE
+    elif sort == schemas.TaskSort.RELEVANCE and rank is None:
+        raise HTTPException(status_code=400, detail="sort=relevance requires a search query")
+
+    query = select(*columns).where(models.Task.owner_id == owner, models.Task.archived == archived)
     
     if starred is not None:
-        query = query.filter(models.Task.starred == starred)
+        query = query.where(models.Task.starred == starred)
+
+    if completed is not None:
+        query = query.where(models.Task.completed == completed)
     
     if priority:
-        query = query.filter(models.Task.priority == priority)
+        query = query.where(models.Task.priority.in_([p.value for p in priority]))
+
+    if tsquery is not None:
+        query = query.where(models.search_vector.bool_op("@@")(tsquery))
+
+    # Les tags sont stockés en minuscules (voir TaskBase.validate_tags)
+    if tags:
+        query = query.where(models.Task.tags.contains([tag.lower() for tag in tags]))
+
+    if any_tags:
+        query = query.where(models.Task.tags.overlap([tag.lower() for tag in any_tags]))
     
-    return query.order_by(models.Task.due_date).all()
+    try:
+        query = pagination.paginate(query, sort, cursor, limit, rank)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # La version de la liste du propriétaire est lue dans la même requête
+    # (même instantané que les tâches), par des sous-requêtes évaluées une
+    # fois. Ces colonnes suivent TASK_COLUMNS et sont ignorées par dump_tasks.
+    latest = conditional.version_query(owner).subquery()
+    query = query.add_columns(
+        select(latest.c.version).scalar_subquery().label("list_version"),
+        select(latest.c.changed_at).scalar_subquery().label("list_changed_at"),
+    )
+
+    rows = (await db.execute(query)).all()
+    if TASK_READ_MODE == "orm":
+        tasks = [row.Task for row in rows]
+        if rank is not None:
+            # Le curseur de la recherche lit le score sur la tâche
+            for row in rows:
+                row.Task.rank = row.rank
+    else:
+        # Le score éventuel est après TASK_COLUMNS, ignoré par dump_tasks
+        tasks = rows
+
+    if rows:
+        current = (rows[0].list_version, rows[0].list_changed_at)
+    else:
+        current = tuple((await db.execute(conditional.version_query(owner))).one())
+
+    # La page suivante se demande avec ?cursor=<X-Next-Cursor>
+    headers = conditional.list_validators(cache_key, *current)
+    next_cursor = pagination.next_cursor(tasks, sort, limit)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+
+    if TASK_READ_MODE == "orm":
+        response.headers.update(headers)
+        return tasks[:limit]
+
+    body = serializers.dump_tasks(tasks[:limit], fields, format)
+    task_cache.set(cache_key, body, headers, generation)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+@app.get("/task/{task_id}", response_model=schemas.Task)
+async def read_task(
+    task_id: int,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    owner: int = Depends(identity.current_owner),
+    db: DatabaseSession = Depends(get_db)
+):
+    # Tâche d'un autre propriétaire : 404, son existence ne se devine pas
+    row = (await db.execute(
+        select(*serializers.TASK_COLUMNS).where(models.Task.owner_id == owner, models.Task.id == task_id)
+    )).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    headers = conditional.item_validators(row.id, row.updated_at)
+    if conditional.not_modified(if_none_match, if_modified_since, headers):
+        return Response(status_code=304, headers=headers)
+    return Response(content=serializers.dump_task(row), media_type="application/json", headers=headers)
+
+@app.get("/changes")
+async def read_changes(
+    since: Optional[str] = Query(None, description="Curseur renvoyé par l'appel précédent ; absent : depuis le début"),
+    limit: int = Query(500, ge=1, le=1000),
+    owner: int = Depends(identity.current_owner),
+    db: DatabaseSession = Depends(get_db)
+):
+    try:
+        position = changes.decode_since(since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows = (await db.execute(changes.changes_query(owner, position, limit))).all()
+    if changes.cursor_expired(rows):
+        raise HTTPException(status_code=410, detail="Cursor expired: read /changes again without since")
+    with metrics.SERIALIZATION_SECONDS.labels("changes").time(), tracing.span("serialize", kind="changes"):
+        body = orjson.dumps(changes.feed_dict(rows, since, limit))
+    return Response(content=body, media_type="application/json")
+
+@app.get("/events")
+async def stream_events(owner: int = Depends(identity.current_owner)):
+    # Pas de session : le flux ne touche pas à la base
+    if not notifications.NOTIFY_ENABLED:
+        raise HTTPException(status_code=503, detail="Change notifications are disabled")
+    subscriber = broadcaster.subscribe(owner)
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many open event streams")
+    return StreamingResponse(
+        events.stream(broadcaster, subscriber),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Désactive la mise en tampon de NGINX pour cette réponse
+            "X-Accel-Buffering": "no",
+        },
+    )
 
 @app.put("/task/{task_id}")
-def update_task(task_id: int, task: schemas.TaskUpdate, db: Session = Depends(get_db)):
-    db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    if not db_task:
+async def update_task(
+    task_id: int,
+    task: schemas.TaskUpdate,
+    owner: int = Depends(identity.current_owner),
+    db: DatabaseSession = Depends(get_db)
+):
+    update_data = task.model_dump(exclude_unset=True)
+    # Noms des champs seulement : le contenu des tâches reste hors des logs
+    logger.debug("Updating task", extra={"task_id": task_id, "fields": sorted(update_data)})
+    if not update_data:
+        # Rien à écrire : ni commit, ni invalidation des caches du propriétaire
+        row = (await db.execute(
+            select(*serializers.TASK_COLUMNS).where(models.Task.owner_id == owner, models.Task.id == task_id)
+        )).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Task not found")
+        return serializers.task_dict(row)
+
+    # Une seule requête : la ligne renvoyée remplace le SELECT préalable et le refresh
+    query = (
+        update(models.Task)
+        .where(models.Task.owner_id == owner, models.Task.id == task_id)
+        .values(**update_data)
+        .returning(*serializers.TASK_COLUMNS, *notify("update"))
+    )
+    row = (await db.execute(query)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Task not found")
-    
-    # Log pour débogage
-    print(f"Updating task {task_id} with:", task.dict())
-    
-    update_data = task.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_task, field, value)
-    
-    db.commit()
-    db.refresh(db_task)
-    
-    return db_task
+
+    await db.commit()
+    invalidate_caches(owner)
+
+    return serializers.task_dict(row)
 
 @app.delete("/task/{task_id}", response_model=APIResponse)
-def delete_task(task_id: int, db: Session = Depends(get_db)):
-    db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    if not db_task:
+async def delete_task(
+    task_id: int,
+    owner: int = Depends(identity.current_owner),
+    db: DatabaseSession = Depends(get_db)
+):
+    deleted_id = await db.scalar(
+        delete(models.Task)
+        .where(models.Task.owner_id == owner, models.Task.id == task_id)
+        .returning(models.Task.id, *notify("delete"))
+    )
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    db.delete(db_task)
-    db.commit()
+    await db.commit()
+    invalidate_caches(owner)
     
     return APIResponse(
         success=True,
@@ -114,6 +432,218 @@ def delete_task(task_id: int, db: Session = Depends(get_db)):
         data={"deleted_task_id": task_id}
     )
 
+def ids_param(ids: List[int]):
+    # Un seul paramètre tableau : WHERE id = ANY(:ids)
+    return any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+
+def not_found_errors(ids: List[int]) -> List[ErrorDetail]:
+    return [
+        ErrorDetail(error_code="not_found", detail="Task not found", error_details={"id": task_id})
+        for task_id in ids
+    ]
+
+def bulk_response(action: str, requested: int, data: Dict[str, Any], errors: List[ErrorDetail]) -> APIResponse:
+    succeeded = requested - len(errors)
+    return APIResponse(
+        success=not errors,
+        message=f"{succeeded}/{requested} tasks {action}",
+        data={**data, "errors": errors},
+        meta={"requested": requested, "succeeded": succeeded, "failed": len(errors)},
+    )
+
+@app.post("/bulk/create_task", response_model=APIResponse)
+async def bulk_create_tasks(
+    items: List[Dict[str, Any]] = Body(..., max_length=BULK_MAX_ITEMS),
+    owner: int = Depends(identity.current_owner),
+    db: DatabaseSession = Depends(get_db)
+):
+    # Chaque élément est validé séparément : un élément invalide est
+    # signalé sans faire échouer le lot
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            rows.append({**schemas.TaskCreate.model_validate(item).model_dump(), "owner_id": owner})
+        except ValidationError as e:
+            errors.append(ErrorDetail(
+                error_code="validation_error",
+                detail="Invalid task",
+                error_details={"index": index, "errors": e.errors(include_url=False, include_context=False)},
+            ))
+
+    created = []
+    if rows:
+        result = await db.execute(
+            insert(models.Task)
+            .values(rows)
+            .returning(*serializers.TASK_COLUMNS, *notify("insert"))
+        )
+        created = [serializers.task_dict(row) for row in result]
+        await db.commit()
+        invalidate_caches(owner)
+
+    return bulk_response("created", len(items), {"created": created}, errors)
+
+@app.put("/bulk/update_task", response_model=APIResponse)
+async def bulk_update_tasks(
+    bulk: schemas.BulkTaskUpdate,
+    owner: int = Depends(identity.current_owner),
+    db: DatabaseSession = Depends(get_db)
+):
+    changes = bulk.changes.model_dump(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="No changes to apply")
+
+    ids = list(dict.fromkeys(bulk.ids))
+    result = await db.execute(
+        update(models.Task)
+        .where(models.Task.owner_id == owner, models.Task.id == ids_param(ids))
+        .values(**changes)
+        .returning(*serializers.TASK_COLUMNS, *notify("update"))
+    )
+    updated = [serializers.task_dict(row) for row in result]
+    await db.commit()
+    invalidate_caches(owner)
+
+    found = {task["id"] for task in updated}
+    errors = not_found_errors([task_id for task_id in ids if task_id not in found])
+    return bulk_response("updated", len(ids), {"updated": updated}, errors)
+
+@app.post("/bulk/delete_task", response_model=APIResponse)
+async def bulk_delete_tasks(
+    bulk: schemas.BulkTaskIds,
+    owner: int = Depends(identity.current_owner),
+    db: DatabaseSession = Depends(get_db)
+):
+    ids = list(dict.fromkeys(bulk.ids))
+    result = await db.execute(
+        delete(models.Task)
+        .where(models.Task.owner_id == owner, models.Task.id == ids_param(ids))
+        .returning(models.Task.id, *notify("delete"))
+    )
+    deleted = set(result.scalars().all())
+    await db.commit()
+    invalidate_caches(owner)
+
+    errors = not_found_errors([task_id for task_id in ids if task_id not in deleted])
+    return bulk_response("deleted", len(ids), {"deleted_task_ids": sorted(deleted)}, errors)
+
+@app.get("/export")
+async def export_tasks(
+    file_format: schemas.TransferFormat = Query(schemas.TransferFormat.NDJSON, alias="format"),
+    archived: Optional[bool] = Query(None, description="Absent : toutes les tâches"),
+    owner: int = Depends(identity.current_owner),
+):
+    # Curseur côté serveur : les tâches sont envoyées au fil de la lecture
+    filename = f"tasks-{datetime.utcnow():%Y%m%d-%H%M%S}.{file_format.value}"
+    return StreamingResponse(
+        transfer.export_stream(transfer.export_query(owner, archived), file_format, identity.session_statements(owner)),
+        media_type=transfer.MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.post("/import", response_model=APIResponse)
+async def import_tasks(
+    request: Request,
+    file_format: Optional[schemas.TransferFormat] = Query(None, alias="format", description="Par défaut : d'après le Content-Type"),
+    owner: int = Depends(identity.current_owner),
+):
+    if file_format is None:
+        content_type = request.headers.get("content-type", "")
+        file_format = schemas.TransferFormat.CSV if content_type.startswith("text/csv") else schemas.TransferFormat.NDJSON
+
+    # Le corps est lu au fil de l'envoi, jamais en entier en mémoire
+    report = transfer.ImportReport()
+    try:
+        await transfer.import_tasks(request.stream(), file_format, report, owner)
+    finally:
+        # Les lots déjà chargés restent, même si l'import s'est interrompu
+        if report.imported:
+            invalidate_caches(owner)
+    return report.response()
+
+def time_zone(tz: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown time zone: {tz}")
+
+@app.get("/stats", response_model=schemas.TaskStats)
+async def read_stats(
+    archived: bool = False,
+    tz: str = Query("UTC", max_length=64, description="Fuseau horaire définissant « aujourd'hui », ex. Europe/Paris"),
+    owner: int = Depends(identity.current_owner),
+    db: DatabaseSession = Depends(get_db)
+):
+    now = datetime.now(timezone.utc)
+    start, end = stats.today_bounds(time_zone(tz), now)
+    key = (owner, archived, start)
+    cached = stats_cache.get(key)
+    if cached is not None:
+        return cached
+
+    row = (await db.execute(
+        stats.stats_query(owner, archived, now.replace(tzinfo=None), start, end)
+    )).one()
+    result = stats.stats_dict(row)
+    stats_cache.set(key, result)
+    return result
+
+@app.get("/agenda", response_model=schemas.AgendaSummary)
+async def read_agenda(
+    tz: str = Query("UTC", max_length=64, description="Fuseau horaire définissant « aujourd'hui », ex. Europe/Paris"),
+    days: int = Query(7, ge=1, le=31, description="Jours suivant aujourd'hui comptés dans upcoming"),
+    owner: int = Depends(identity.current_owner),
+    db: DatabaseSession = Depends(get_db)
+):
+    now = datetime.now(timezone.utc)
+    bounds = agenda.bucket_bounds(time_zone(tz), now, days)
+    # Comme /stats : les compteurs peuvent retarder de STATS_CACHE_TTL sur
+    # l'heure courante (une tâche qui passe en retard), jamais sur une écriture
+    key = (owner, bounds[schemas.AgendaBucket.TODAY][1], days)
+    cached = agenda_cache.get(key)
+    if cached is not None:
+        return cached
+
+    rows = (await db.execute(agenda.counts_query(owner, bounds))).all()
+    result = agenda.counts_dict(rows)
+    agenda_cache.set(key, result)
+    return result
+
+@app.get("/agenda/{bucket}", response_model=list[schemas.Task])
+async def read_agenda_tasks(
+    bucket: schemas.AgendaBucket,
+    tz: str = Query("UTC", max_length=64, description="Fuseau horaire définissant « aujourd'hui », ex. Europe/Paris"),
+    days: int = Query(7, ge=1, le=31, description="Jours suivant aujourd'hui compris dans upcoming"),
+    priority: Optional[List[schemas.PriorityEnum]] = Query(None),
+    fields: Optional[str] = Query(None, description="Champs renvoyés, ex. id,title,due_date ; tous par défaut"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    owner: int = Depends(identity.current_owner),
+    db: DatabaseSession = Depends(get_db)
+):
+    try:
+        fields = serializers.parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    start, end = agenda.bucket_bounds(time_zone(tz), datetime.now(timezone.utc), days)[bucket]
+    try:
+        query = agenda.tasks_query(owner, start, end, [p.value for p in priority or ()], cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Tâches triées par échéance ; la suite avec ?cursor=<X-Next-Cursor>
+    rows = (await db.execute(query)).all()
+    headers = {}
+    next_cursor = pagination.keyset_cursor(rows, agenda.KEYS, limit)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=serializers.dump_tasks(rows[:limit], fields), media_type="application/json", headers=headers)
+
 @app.get("/health")
 async def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    database.update_pool_metrics()
+    return Response(content=metrics.exposition(), media_type=CONTENT_TYPE_LATEST)
\ No newline at end of file
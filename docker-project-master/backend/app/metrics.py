@@ -0,0 +1,147 @@
+import os
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+# Les métriques sont exposées par GET /metrics (format Prometheus). Avec
+# plusieurs workers (server.py), chacun écrit les siennes dans
+# PROMETHEUS_MULTIPROC_DIR ; les jauges sont alors additionnées sur les
+# workers vivants (multiprocess_mode).
+
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured number of persistent connections in the pool",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections opened above the pool size (negative while the pool is not full)",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT seconds",
+    ["engine"],
+)
+
+CACHE_HITS = Counter(
+    "cache_hits_total",
+    "Responses served from an in-process cache",
+    ["cache"],
+)
+CACHE_MISSES = Counter(
+    "cache_misses_total",
+    "Lookups that had to query the database",
+    ["cache"],
+)
+CACHE_EVICTIONS = Counter(
+    "cache_evictions_total",
+    "Entries dropped to stay within the cache memory budget",
+    ["cache"],
+)
+CACHE_BYTES = Gauge(
+    "cache_bytes",
+    "Size of the response bodies held by the cache",
+    ["cache"],
+    multiprocess_mode="livesum",
+)
+
+EVENTS_SUBSCRIBERS = Gauge(
+    "events_subscribers",
+    "Open /events streams",
+    multiprocess_mode="livesum",
+)
+EVENTS_DROPPED = Counter(
+    "events_dropped_total",
+    "Streams closed because the client did not keep up",
+)
+
+EXPORT_ROWS = Counter(
+    "export_rows_total",
+    "Tasks streamed by /export",
+)
+IMPORT_ROWS = Counter(
+    "import_rows_total",
+    "Rows read by /import, by outcome",
+    ["result"],
+)
+
+# Secondes ; de la réponse servie depuis un cache aux exports complets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests handled, by route template and status code",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request until its response is fully sent",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests being handled (long-lived /events streams excluded)",
+    multiprocess_mode="livesum",
+)
+
+DB_QUERIES = Counter(
+    "db_queries_total",
+    "SQL statements executed, by first keyword",
+    ["engine", "operation"],
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Time spent executing a SQL statement, as seen by the driver",
+    ["engine", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_ERRORS = Counter(
+    "db_query_errors_total",
+    "SQL statements that raised an error",
+    ["engine", "operation"],
+)
+
+SERIALIZATION_SECONDS = Histogram(
+    "serialization_duration_seconds",
+    "Time spent encoding response bodies",
+    ["kind"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+COMPRESSION_BYTES = Counter(
+    "compression_bytes_total",
+    "Response body bytes before (in) and after (out) compression",
+    ["encoding", "direction"],
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the logging queue was full",
+)
+
+
+def exposition() -> bytes:
+    """
+    Current metrics in the Prometheus text format, summed over the worker
+    processes when there are several.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
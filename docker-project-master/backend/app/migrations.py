@@ -0,0 +1,333 @@
+"""
+Versioned schema migrations.
+
+    python -m backend.app.migrations [--status]
+
+Run once before the API starts (initContainer, "migrate" compose
+service): the API process itself never reads nor changes the schema, so
+a new replica serves traffic without waiting on the catalog. Applied
+versions are recorded in schema_migrations; concurrent runs wait for each
+other on an advisory lock.
+
+A migration runs in its own transaction together with the row recording
+it. The first ones are idempotent, so that databases created before
+this table existed (tables made at import time) are adopted as is.
+
+Migrations connect as the owner of the tables. The API connects as
+identity.API_ROLE, subject to row level security, which is given the
+password DB_API_PASSWORD after the migrations.
+"""
+import argparse
+import logging
+import os
+import sys
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Index, Integer, MetaData, String, Table, and_, false, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateTable
+
+from . import changes, conditional, identity, models
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+# Mot de passe de connexion de identity.API_ROLE, posé à chaque exécution
+# (changement de mot de passe compris) ; vide : le rôle reste sans LOGIN
+DB_API_PASSWORD = os.getenv("DB_API_PASSWORD", "")
+
+# Hors de models.Base : ne fait pas partie du schéma applicatif
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False, server_default=func.timezone("UTC", func.now())),
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+def _create_tables(conn: Connection) -> None:
+    # checkfirst : les tables déjà présentes sont laissées telles quelles
+    models.Base.metadata.create_all(conn)
+
+
+# Tables des tâches telles que les laissent les migrations 1 à 7, avant
+# owner_id. Ces migrations sont publiées : elles construisent ce schéma
+# figé, et non le modèle courant qui a changé depuis (migration 8).
+_schema_v7 = MetaData()
+_tasks_v7 = Table(
+    "tasks",
+    _schema_v7,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("title", String, index=True),
+    Column("description", String, nullable=True),
+    Column("priority", models.priority_type, nullable=False, server_default="medium"),
+    Column("tags", ARRAY(String)),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Column("due_date", DateTime, nullable=True),
+    Column("estimated_time", Integer, nullable=True),
+    Column("starred", Boolean),
+    Column("archived", Boolean, primary_key=True, server_default=false()),
+    Column("completed", Boolean),
+    Column("change_id", BigInteger, nullable=True),
+    postgresql_partition_by="LIST (archived)",
+)
+_tombstones_v7 = Table(
+    "task_tombstones",
+    _schema_v7,
+    Column("task_id", Integer, primary_key=True),
+    Column("change_id", BigInteger, nullable=False),
+    Column("deleted_at", DateTime, nullable=False),
+)
+_due_date_key_v7 = func.coalesce(_tasks_v7.c.due_date, models.INFINITY)
+Index("ix_tasks_due_date_id", _due_date_key_v7, _tasks_v7.c.id)
+Index("ix_tasks_priority", _tasks_v7.c.priority, _due_date_key_v7, _tasks_v7.c.id)
+Index("ix_tasks_completed_priority", _tasks_v7.c.completed, _tasks_v7.c.priority, _due_date_key_v7, _tasks_v7.c.id)
+Index("ix_tasks_starred", _tasks_v7.c.starred, _due_date_key_v7, _tasks_v7.c.id)
+Index("ix_tasks_created_at_id", _tasks_v7.c.created_at, _tasks_v7.c.id)
+Index("ix_tasks_updated_at_id", _tasks_v7.c.updated_at, _tasks_v7.c.id)
+Index(
+    "ix_tasks_agenda", _tasks_v7.c.due_date, _tasks_v7.c.id,
+    postgresql_include=["priority"],
+    postgresql_where=and_(
+        _tasks_v7.c.archived == false(), _tasks_v7.c.completed.is_not(True), _tasks_v7.c.due_date.is_not(None)
+    ),
+)
+Index(
+    "ix_tasks_search",
+    func.to_tsvector(
+        models.SEARCH_CONFIG,
+        func.coalesce(_tasks_v7.c.title, text("''")).op("||")(text("' '"))
+        .op("||")(func.coalesce(_tasks_v7.c.description, text("''"))),
+    ),
+    postgresql_using="gin",
+)
+Index("ix_tasks_tags", _tasks_v7.c.tags, postgresql_using="gin")
+Index("ix_tasks_change_id_id", _tasks_v7.c.change_id, _tasks_v7.c.id)
+Index("ix_task_tombstones_change_id", _tombstones_v7.c.change_id, _tombstones_v7.c.task_id)
+
+
+def _create_indexes(conn: Connection) -> None:
+    # Index ajoutés au schéma après la création de tables existantes
+    for table in _schema_v7.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _priority_enum(conn: Connection) -> None:
+    # Colonne texte des bases antérieures ; une base créée depuis a déjà le type
+    column_type = conn.scalar(text(
+        "SELECT udt_name FROM information_schema.columns WHERE table_name = 'tasks' AND column_name = 'priority'"
+    ))
+    if column_type == models.priority_type.name:
+        return
+    models.priority_type.create(conn, checkfirst=True)
+    # Index sur l'ancienne expression de rang (array_position sur le texte)
+    conn.execute(text("DROP INDEX IF EXISTS ix_tasks_archived_priority"))
+    names = ", ".join(f"'{name}'" for name in models.PRIORITIES)
+    conn.execute(text("ALTER TABLE tasks ALTER COLUMN priority DROP DEFAULT"))
+    # Réécrit la table et ses index ; "normal" (l'ancien défaut), les
+    # valeurs inconnues et NULL deviennent medium, comme l'ancien tri
+    conn.execute(text(f"""
+        ALTER TABLE tasks
+            ALTER COLUMN priority TYPE {models.priority_type.name}
+                USING (CASE WHEN priority IN ({names}) THEN priority ELSE 'medium' END)::{models.priority_type.name},
+            ALTER COLUMN priority SET DEFAULT 'medium',
+            ALTER COLUMN priority SET NOT NULL
+    """))
+    _create_indexes(conn)
+
+
+def _partition_tasks(conn: Connection) -> None:
+    # Une base créée depuis a déjà la table partitionnée (migration 1)
+    if conn.scalar(text("SELECT relkind FROM pg_class WHERE oid = 'tasks'::regclass")) == "p":
+        return
+    old = "tasks_unpartitioned"
+    conn.execute(text(f"ALTER TABLE tasks RENAME TO {old}"))
+    # Libère les noms repris par la nouvelle table ; la séquence reste
+    # celle des identifiants existants
+    conn.execute(text(f"ALTER TABLE {old} DROP CONSTRAINT tasks_pkey"))
+    for name in conn.scalars(text(f"SELECT indexname FROM pg_indexes WHERE tablename = '{old}'")):
+        conn.execute(text(f'DROP INDEX "{name}"'))
+    conn.execute(text("ALTER SEQUENCE tasks_id_seq RENAME TO tasks_unpartitioned_id_seq"))
+
+    # Table et partitions sans index ni triggers : les lignes sont copiées
+    # telles quelles (change_id compris, les curseurs /changes restent
+    # valides) et les index construits une fois, après la copie
+    table = _tasks_v7
+    conn.execute(CreateTable(table))
+    for ddl in models.PARTITIONS_DDL:
+        conn.execute(ddl)
+    columns = ", ".join(column.name for column in table.columns)
+    selected = ", ".join(
+        "coalesce(archived, false)" if column.name == "archived" else column.name for column in table.columns
+    )
+    conn.execute(text(f"INSERT INTO tasks ({columns}) SELECT {selected} FROM {old}"))
+    conn.execute(text(
+        "SELECT setval('tasks_id_seq', last_value, is_called) FROM tasks_unpartitioned_id_seq"
+    ))
+    # Emporte ses triggers et son ancienne séquence
+    conn.execute(text(f"DROP TABLE {old}"))
+
+    _create_indexes(conn)
+    changes.install_change_tracking(conn)
+    conditional.install_version_trigger(conn)
+    conn.execute(text("ANALYZE tasks"))
+
+
+# Index remplacés par leur version menée par owner_id (migration 8) ;
+# les index GIN et celui du titre restent
+_UNOWNED_INDEXES = (
+    "ix_tasks_due_date_id", "ix_tasks_priority", "ix_tasks_completed_priority", "ix_tasks_starred",
+    "ix_tasks_created_at_id", "ix_tasks_updated_at_id", "ix_tasks_agenda", "ix_tasks_change_id_id",
+    "ix_task_tombstones_change_id",
+)
+
+
+def _create_model_indexes(conn: Connection) -> None:
+    # Index du modèle courant, une fois toutes ses colonnes présentes
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _owner_tasks(conn: Connection) -> None:
+    # Tâches et traces existantes au propriétaire de la liste commune.
+    # Défaut constant puis retiré : pas de réécriture ni de trigger, les
+    # lignes lisent la valeur du catalogue.
+    for table in (models.Task.__tablename__, models.TaskTombstone.__tablename__):
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS owner_id integer NOT NULL DEFAULT {models.LEGACY_OWNER_ID}"
+        ))
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN owner_id DROP DEFAULT"))
+    for name in _UNOWNED_INDEXES:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    primary_key = conn.scalar(text(
+        "SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conname = 'tasks_pkey'"
+    ))
+    if primary_key != "PRIMARY KEY (owner_id, id, archived)":
+        conn.execute(text("""
+            ALTER TABLE tasks
+                DROP CONSTRAINT tasks_pkey,
+                ADD CONSTRAINT tasks_pkey PRIMARY KEY (owner_id, id, archived)
+        """))
+    _create_model_indexes(conn)
+    # Les traces portent désormais le propriétaire de la tâche supprimée
+    changes.install_owner_tombstones(conn)
+    identity.install_row_security(conn)
+    conn.execute(text("ANALYZE tasks"))
+
+
+def _owner_list_versions(conn: Connection) -> None:
+    conditional.install_owner_version_triggers(conn)
+    identity.install_row_security(conn, [models.TaskListOwnerVersion.__tablename__])
+
+
+def _change_horizons(conn: Connection) -> None:
+    models.TaskChangeHorizon.__table__.create(conn, checkfirst=True)
+    _create_model_indexes(conn)
+    identity.install_row_security(conn, [models.TaskChangeHorizon.__tablename__])
+
+
+def _api_role(conn: Connection) -> None:
+    # Horizons : écrits par le travail de compaction seulement
+    identity.install_api_role(conn, {
+        models.Task.__tablename__: "SELECT, INSERT, UPDATE, DELETE",
+        models.TaskTombstone.__tablename__: "SELECT, INSERT, UPDATE",
+        models.TaskListOwnerVersion.__tablename__: "SELECT, INSERT, UPDATE",
+        models.TaskChangeHorizon.__tablename__: "SELECT",
+    })
+
+
+# Par ordre d'application ; ne jamais modifier une migration publiée,
+# en ajouter une nouvelle
+MIGRATIONS: List[Migration] = [
+    Migration(1, "create tables", _create_tables),
+    Migration(2, "track changes and tombstones", changes.install_change_tracking),
+    Migration(3, "count list versions", conditional.install_version_trigger),
+    Migration(4, "create missing indexes", _create_indexes),
+    Migration(5, "index the agenda", _create_indexes),
+    Migration(6, "store priority as an enum", _priority_enum),
+    Migration(7, "partition tasks by archived", _partition_tasks),
+    Migration(8, "own tasks and enable row level security", _owner_tasks),
+    Migration(9, "count list versions per owner", _owner_list_versions),
+    Migration(10, "index archivable tasks", _create_model_indexes),
+    Migration(11, "prune tombstones behind a horizon", _change_horizons),
+    Migration(12, "grant the API a role subject to row level security", _api_role),
+]
+
+
+def applied_versions(conn: Connection) -> List[int]:
+    return list(conn.scalars(select(schema_migrations.c.version).order_by(schema_migrations.c.version)))
+
+
+def migrate(engine: Engine) -> List[int]:
+    """
+    Apply the pending migrations.
+
+    Args:
+        engine: Sync engine of the database to migrate
+
+    Returns:
+        Versions applied by this call
+    """
+    applied: List[int] = []
+    with engine.connect() as conn:
+        # Verrou de session : un seul processus migre à la fois, les autres
+        # attendent puis ne trouvent plus rien à appliquer
+        conn.execute(text("SELECT pg_advisory_lock(hashtext('schema_migrations'))"))
+        try:
+            schema_migrations.create(conn, checkfirst=True)
+            conn.commit()
+            done = set(applied_versions(conn))
+            conn.commit()
+            for migration in MIGRATIONS:
+                if migration.version in done:
+                    continue
+                logger.info("Applying migration %d: %s", migration.version, migration.name)
+                with conn.begin():
+                    migration.apply(conn)
+                    conn.execute(schema_migrations.insert().values(version=migration.version, name=migration.name))
+                applied.append(migration.version)
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(hashtext('schema_migrations'))"))
+            conn.commit()
+    return applied
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Apply the pending schema migrations")
+    parser.add_argument("--status", action="store_true", help="List pending migrations without applying them")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.status:
+        with engine.connect() as conn:
+            done = set(applied_versions(conn)) if conn.dialect.has_table(conn, "schema_migrations") else set()
+        for migration in MIGRATIONS:
+            state = "applied" if migration.version in done else "pending"
+            print(f"{migration.version:>4}  {state:<8} {migration.name}")
+        return 0
+
+    applied = migrate(engine)
+    logger.info("Schema up to date (%d migrations applied)", len(applied))
+    if DB_API_PASSWORD:
+        with engine.begin() as conn:
+            identity.set_api_password(conn, DB_API_PASSWORD)
+        logger.info("Role %s can log in", identity.API_ROLE)
+    else:
+        logger.warning("DB_API_PASSWORD is not set: role %s cannot log in", identity.API_ROLE)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,181 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ARRAY, JSON
+from sqlalchemy import BigInteger, Column, DDL, Enum, Integer, String, Boolean, DateTime, JSON, Index, PrimaryKeyConstraint, and_, event, false, func, literal_column, text, true
+from sqlalchemy.dialects.postgresql import ARRAY  # opérateurs @> et && sur les tags
 from .database import Base
 
+# Urgent d'abord : l'ordre des valeurs du type enum est l'ordre de tri
+PRIORITIES = ("urgent", "high", "medium", "low")
+PRIORITY_RANKS = {name: rank for rank, name in enumerate(PRIORITIES, start=1)}
+# Type PostgreSQL task_priority : 4 octets par ligne au lieu du texte,
+# trié et indexé dans l'ordre de PRIORITIES
+priority_type = Enum(*PRIORITIES, name="task_priority")
+
+# Propriétaire des tâches créées avant owner_id (la liste commune d'alors)
+LEGACY_OWNER_ID = 1
+
+# Partitions de tasks, par valeur de archived
+ACTIVE_PARTITION = "tasks_active"
+ARCHIVE_PARTITION = "tasks_archived"
+
+
 class Task(Base):
+    """
+    Task, stored in a table partitioned by LIST (archived).
+
+    Active tasks live in tasks_active and archived ones in tasks_archived,
+    each with its own copy of the indexes below: the archive never grows
+    the indexes read and maintained for the active list. Archiving a task
+    moves its row from one partition to the other (see compaction.py).
+
+    Every task belongs to an owner (see identity.py), and every index
+    but the full text and tag ones leads with owner_id: a request reads
+    the entries of its owner only. The primary key has to include the
+    partition keys: (owner_id, id, archived) already allows partitioning
+    by hash of owner_id later. id stays unique through its sequence.
+    """
     __tablename__ = "tasks"
+    __table_args__ = (
+        PrimaryKeyConstraint("owner_id", "id", "archived", name="tasks_pkey"),
+        {"postgresql_partition_by": "LIST (archived)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, autoincrement=True)
+    owner_id = Column(Integer, nullable=False)
     title = Column(String, index=True)
     description = Column(String, nullable=True)
-    priority = Column(String, default="normal")  # urgent/high/normal/low
+    priority = Column(priority_type, nullable=False, default="medium", server_default="medium")
     tags = Column(ARRAY(String), default=[])  # PostgreSQL array type
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     due_date = Column(DateTime, nullable=True)
     estimated_time = Column(Integer, nullable=True)  # en minutes
     starred = Column(Boolean, default=False)
-    archived = Column(Boolean, default=False)
-    completed = Column(Boolean, default=False)
\ No newline at end of file
+    archived = Column(Boolean, nullable=False, default=False, server_default=false())
+    completed = Column(Boolean, default=False)
+    # Transaction de la dernière écriture, posée par un trigger (voir changes.py)
+    change_id = Column(BigInteger, nullable=True)
+
+
+# Créées avec la table (migration 1) ; les bases antérieures sont
+# converties par la migration 7
+PARTITIONS_DDL = [
+    DDL(f"CREATE TABLE {ACTIVE_PARTITION} PARTITION OF tasks FOR VALUES IN (false)"),
+    DDL(f"CREATE TABLE {ARCHIVE_PARTITION} PARTITION OF tasks FOR VALUES IN (true)"),
+]
+for ddl in PARTITIONS_DDL:
+    event.listen(Task.__table__, "after_create", ddl)
+
+
+class TaskTombstone(Base):
+    """
+    Trace of a deleted task, so that /changes can report deletions.
+    Rows are written by a trigger on tasks (see changes.py).
+    """
+    __tablename__ = "task_tombstones"
+
+    task_id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, nullable=False)
+    change_id = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime, nullable=False)
+
+
+class TaskChangeHorizon(Base):
+    """
+    Latest tombstone of an owner pruned by the compaction job (see
+    compaction.prune_tombstones). /changes cursors at or before it may
+    have missed deletions: the client must resync from the beginning.
+    """
+    __tablename__ = "task_change_horizons"
+
+    owner_id = Column(Integer, primary_key=True)
+    change_id = Column(BigInteger, nullable=False)
+    pruned_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class TaskListVersion(Base):
+    """
+    Single row counting the writes made on tasks.
+
+    Written by the trigger of migrations 3 and 7 until migration 9, which
+    replaced it with TaskListOwnerVersion; no longer read.
+    """
+    __tablename__ = "task_list_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class TaskListOwnerVersion(Base):
+    """
+    Count of the writes made on the tasks of one owner.
+
+    Triggers increment it on every write (see
+    conditional.install_owner_version_triggers), so list ETags can be
+    checked with a primary key lookup instead of scanning the tasks they
+    describe. A write only changes the version of its owner.
+    """
+    __tablename__ = "task_list_versions"
+
+    owner_id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+# Clés de tri utilisées par la pagination (voir pagination.py).
+# Les constantes sont écrites en littéraux SQL pour que les requêtes
+# correspondent exactement aux expressions des index ci-dessous.
+
+# Les tâches sans échéance passent en dernier
+INFINITY = literal_column("'infinity'::timestamp")
+due_date_key = func.coalesce(Task.due_date, INFINITY)
+
+# Recherche plein texte sur le titre et la description. Configuration
+# 'simple' (pas de racinisation) : les tâches mélangent français et anglais.
+# Constantes en text() et non literal_column() : l'index se rattache à la
+# table par la première colonne trouvée dans l'expression.
+SEARCH_CONFIG = text("'simple'::regconfig")
+search_vector = func.to_tsvector(
+    SEARCH_CONFIG,
+    func.coalesce(Task.title, text("''")).op("||")(text("' '")).op("||")(func.coalesce(Task.description, text("''"))),
+)
+
+# Index partitionnés : chaque partition a le sien, archived y est
+# constant et n'a donc pas à mener l'index. Les requêtes filtrées sur
+# archived ne lisent qu'une partition (élagage, y compris à l'exécution
+# d'une requête préparée). owner_id mène chaque index : une page ne
+# parcourt que les entrées de son propriétaire.
+Index("ix_tasks_owner_due_date_id", Task.owner_id, due_date_key, Task.id)
+Index("ix_tasks_owner_priority", Task.owner_id, Task.priority, due_date_key, Task.id)
+# Tri par priorité des tâches à faire (completed=false), la vue par défaut
+Index("ix_tasks_owner_completed_priority", Task.owner_id, Task.completed, Task.priority, due_date_key, Task.id)
+Index("ix_tasks_owner_starred", Task.owner_id, Task.starred, due_date_key, Task.id)
+Index("ix_tasks_owner_created_at_id", Task.owner_id, Task.created_at, Task.id)
+Index("ix_tasks_owner_updated_at_id", Task.owner_id, Task.updated_at, Task.id)
+# Agenda (voir agenda.py) : tâches à faire ayant une échéance. Index
+# partiel, limité à ces tâches ; les requêtes reprennent le même prédicat,
+# en littéraux, pour que Postgres sache l'utiliser quels que soient les
+# paramètres. La priorité est incluse : les compteurs de l'agenda se
+# lisent dans l'index seul (Index Only Scan).
+AGENDA = and_(Task.archived == false(), Task.completed.is_not(True), Task.due_date.is_not(None))
+Index(
+    "ix_tasks_owner_agenda", Task.owner_id, Task.due_date, Task.id,
+    postgresql_include=["priority"], postgresql_where=AGENDA,
+)
+# Compaction (voir compaction.py) : tâches terminées non archivées, par
+# date de dernière écriture. Le job parcourt tous les propriétaires à la
+# fois : owner_id ne mène donc pas cet index. Vide dans tasks_archived.
+ARCHIVABLE = and_(Task.archived == false(), Task.completed == true())
+Index(
+    "ix_tasks_archivable", Task.updated_at,
+    postgresql_include=["owner_id", "id"], postgresql_where=ARCHIVABLE,
+)
+# Combinés à un index owner_id par un BitmapAnd quand la recherche est
+# plus sélective que le propriétaire
+Index("ix_tasks_search", search_vector, postgresql_using="gin")
+Index("ix_tasks_tags", Task.tags, postgresql_using="gin")
+# Flux /changes : parcours dans l'ordre des transactions
+Index("ix_tasks_owner_change_id_id", Task.owner_id, Task.change_id, Task.id)
+Index("ix_task_tombstones_owner_change_id", TaskTombstone.owner_id, TaskTombstone.change_id, TaskTombstone.task_id)
+# Purge des traces (voir compaction.py), tous propriétaires confondus
+Index("ix_task_tombstones_deleted_at", TaskTombstone.deleted_at)
@@ -0,0 +1,69 @@
+import logging
+import os
+import random
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import metrics
+
+# Requêtes hors des métriques HTTP : flux ouverts pendant des heures, et
+# les collectes de Prometheus elles-mêmes
+UNTRACKED_PATHS = {"/events", "/metrics"}
+
+# Remplace le log d'accès de uvicorn (désactivé par logs.setup_logging) :
+# une requête sur ACCESS_LOG_SAMPLE_RATE est journalisée, les erreurs 5xx
+# toujours. 0 : erreurs uniquement.
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "0.1"))
+
+access_logger = logging.getLogger("backend.access")
+
+
+class MetricsMiddleware:
+    """
+    Record the latency, status and concurrency of HTTP requests, and write
+    a sample of them to the access log.
+
+    Plain ASGI middleware rather than BaseHTTPMiddleware, so that
+    streaming responses are passed through untouched. Requests are
+    labelled with their route template ("/task/{task_id}"), never the raw
+    path, to keep the number of series bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in UNTRACKED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.HTTP_IN_FLIGHT.dec()
+            # Renseigné par le routeur de FastAPI une fois la route trouvée
+            route = scope.get("route")
+            template = getattr(route, "path_format", "unmatched")
+            method = scope["method"]
+            elapsed = time.perf_counter() - start
+            metrics.HTTP_REQUESTS.labels(method, template, str(status)).inc()
+            metrics.HTTP_REQUEST_SECONDS.labels(method, template).observe(elapsed)
+            if status >= 500 or random.random() < ACCESS_LOG_SAMPLE_RATE:
+                access_logger.info("%s %s %d", method, scope["path"], status, extra={
+                    "method": method,
+                    "path": scope["path"],
+                    "route": template,
+                    "status": status,
+                    "duration_ms": round(elapsed * 1000, 2),
+                })
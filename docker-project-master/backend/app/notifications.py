@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from typing import Callable, Optional
+
+import asyncpg
+from sqlalchemy import String, Text, cast, func, literal
+from sqlalchemy.engine import make_url
+
+from . import database
+
+logger = logging.getLogger(__name__)
+
+# Chaque écriture sur tasks publie, dans sa propre transaction, un
+# NOTIFY par ligne touchée. Chaque replica écoute le canal et invalide
+# ses caches locaux : aucun service en plus de PostgreSQL.
+CHANNEL = "task_changes"
+
+NOTIFY_ENABLED = os.getenv("NOTIFY_ENABLED", "true").lower() == "true"
+
+# LISTEN a besoin d'une connexion de session : derrière PgBouncer en mode
+# transaction, pointer DB_LISTEN_URL directement sur PostgreSQL
+DB_LISTEN_URL = os.getenv("DB_LISTEN_URL", database.DATABASE_URL)
+
+# Vérification périodique de la connexion d'écoute (une coupure TCP
+# silencieuse ne serait sinon jamais détectée)
+LISTEN_HEALTHCHECK_INTERVAL = float(os.getenv("LISTEN_HEALTHCHECK_INTERVAL", "30"))
+LISTEN_RECONNECT_MAX_DELAY = 30.0
+
+# Identifie ce processus dans les notifications
+REPLICA_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def notify_column(op: str, table, id_column, owner_column):
+    """
+    Build a RETURNING column that queues a notification for each row.
+
+    Notifications are only delivered when the transaction commits, so a
+    rolled back write never invalidates anything.
+
+    Args:
+        op: "insert", "update" or "delete"
+        table: Table being written
+        id_column: Primary key column of the table
+        owner_column: Owner of the row, only its /events streams get it
+
+    Returns:
+        A labelled pg_notify(...) expression, to append to RETURNING
+    """
+    payload = func.json_build_object(
+        literal("table", String), literal(table.name, String),
+        literal("op", String), literal(op, String),
+        literal("id", String), id_column,
+        literal("owner", String), owner_column,
+        literal("origin", String), literal(REPLICA_ID, String),
+    )
+    return func.pg_notify(literal(CHANNEL, String), cast(payload, Text)).label("notified")
+
+
+def notify_payload(op: str, table_name: str, id: Optional[int] = None, owner_id: Optional[int] = None) -> str:
+    """
+    Payload of a notification sent outside of RETURNING, e.g. once for a
+    whole COPY. Same keys as notify_column; id is None when many rows
+    were written.
+    """
+    return json.dumps({"table": table_name, "op": op, "id": id, "owner": owner_id, "origin": REPLICA_ID})
+
+def listen_dsn(url: str) -> str:
+    """
+    Rewrite a SQLAlchemy URL into a DSN asyncpg accepts.
+    """
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class ChangeListener:
+    """
+    Background task holding a LISTEN connection and calling on_change for
+    every notification, including those sent by this process (compare
+    their "origin" with REPLICA_ID).
+
+    The connection is reopened with exponential backoff when it drops.
+    Notifications sent while disconnected are lost, so on_reconnect is
+    called once listening again: local state must then be rebuilt.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        on_change: Callable[[dict], None],
+        on_reconnect: Callable[[], None],
+        channel: str = CHANNEL,
+    ):
+        self.dsn = dsn
+        self.on_change = on_change
+        self.on_reconnect = on_reconnect
+        self.channel = channel
+        self.connected = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _notified(self, connection, pid, channel, payload: str) -> None:
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed notification on %s: %r", channel, payload)
+            return
+        self.on_change(change)
+
+    async def _listen_once(self) -> None:
+        connection = await asyncpg.connect(
+            self.dsn, server_settings={"application_name": "task-change-listener"}
+        )
+        lost = asyncio.Event()
+        connection.add_termination_listener(lambda _: lost.set())
+        try:
+            await connection.add_listener(self.channel, self._notified)
+            self.connected.set()
+            self.on_reconnect()
+            logger.info("Listening for %s notifications", self.channel)
+            while not lost.is_set():
+                try:
+                    await asyncio.wait_for(lost.wait(), LISTEN_HEALTHCHECK_INTERVAL)
+                except asyncio.TimeoutError:
+                    await asyncio.wait_for(connection.execute("SELECT 1"), LISTEN_HEALTHCHECK_INTERVAL)
+        finally:
+            self.connected.clear()
+            if not connection.is_closed():
+                await connection.close(timeout=5)
+
+    async def _run(self) -> None:
+        delay = 1.0
+        while True:
+            try:
+                await self._listen_once()
+                delay = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Change listener disconnected (%s), retrying in %.0fs", e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, LISTEN_RECONNECT_MAX_DELAY)
+                continue
+            logger.warning("Change listener connection closed, reconnecting")
@@ -0,0 +1,203 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, tuple_
+
+from . import models
+from .schemas import TaskSort, naive_utc
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """One column of a keyset sort order"""
+    expression: Any
+    value: Callable[[Any], Any]
+    type: type = int
+    # Valeur lue dans le curseur -> valeur comparée à expression
+    bind: Callable[[Any], Any] = lambda value: value
+
+
+def _due_date_bind(value: Optional[datetime]) -> Any:
+    # Une échéance absente est triée comme 'infinity' (voir models.due_date_key)
+    return models.INFINITY if value is None else value
+
+
+def _priority_bind(rank: int) -> str:
+    # Le curseur porte le rang, comme avant le type enum
+    if not 1 <= rank <= len(models.PRIORITIES):
+        raise ValueError("Invalid cursor")
+    return models.PRIORITIES[rank - 1]
+
+
+# Toutes les clés d'un même mode vont dans le même sens, ce qui permet
+# d'exprimer le curseur par une seule comparaison de lignes
+# (a, b, id) > (:a, :b, :id) que Postgres résout par un parcours d'index.
+SORT_MODES = {
+    TaskSort.DUE_DATE: (False, [
+        SortKey(models.due_date_key, lambda row: row.due_date, datetime, _due_date_bind),
+        SortKey(models.Task.id, lambda row: row.id),
+    ]),
+    TaskSort.PRIORITY: (False, [
+        SortKey(models.Task.priority, lambda row: models.PRIORITY_RANKS[row.priority], int, _priority_bind),
+        SortKey(models.due_date_key, lambda row: row.due_date, datetime, _due_date_bind),
+        SortKey(models.Task.id, lambda row: row.id),
+    ]),
+    TaskSort.CREATED: (True, [
+        SortKey(models.Task.created_at, lambda row: row.created_at, datetime),
+        SortKey(models.Task.id, lambda row: row.id),
+    ]),
+    TaskSort.UPDATED: (True, [
+        SortKey(models.Task.updated_at, lambda row: row.updated_at, datetime),
+        SortKey(models.Task.id, lambda row: row.id),
+    ]),
+}
+
+
+def sort_keys(sort: TaskSort, rank: Any = None) -> Tuple[bool, List[SortKey]]:
+    """
+    Direction and keys of a sort mode.
+
+    Args:
+        sort: Sort mode
+        rank: Search rank expression, required to paginate by relevance.
+            Rows must expose it as a "rank" attribute.
+
+    Returns:
+        Whether the keys are descending, and the keys
+    """
+    if sort == TaskSort.RELEVANCE:
+        return True, [
+            SortKey(rank, lambda row: row.rank, float),
+            SortKey(models.Task.id, lambda row: row.id),
+        ]
+    return SORT_MODES[sort]
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode the sort key values of the last row of a page into an opaque cursor.
+
+    Args:
+        values: Sort key values, in the order of the sort mode
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: List[SortKey]) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor for the given sort keys.
+
+    Args:
+        cursor: Cursor string received from the client
+        keys: Sort keys of the requested sort mode
+
+    Returns:
+        Sort key values
+
+    Raises:
+        ValueError: If the cursor is malformed or does not match the sort mode
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if not isinstance(payload, list) or len(payload) != len(keys):
+        raise ValueError("Cursor does not match sort mode")
+
+    values = []
+    for key, value in zip(keys, payload):
+        if key.type is datetime and value is not None:
+            try:
+                # Comparée à une colonne timestamp sans fuseau
+                value = naive_utc(datetime.fromisoformat(value))
+            except TypeError as e:
+                raise ValueError("Invalid cursor") from e
+        elif key.type is int and not isinstance(value, int):
+            raise ValueError("Invalid cursor")
+        elif key.type is float and not isinstance(value, (int, float)):
+            raise ValueError("Invalid cursor")
+        values.append(value)
+    return values
+
+
+def paginate(query: Select, sort: TaskSort, cursor: Optional[str], limit: int, rank: Any = None) -> Select:
+    """
+    Apply keyset ordering, the cursor predicate and the page size to a query.
+
+    One extra row is fetched so the caller can tell whether a next page exists.
+
+    Args:
+        query: Filtered select on the tasks table
+        sort: Sort mode
+        cursor: Cursor returned with the previous page, if any
+        limit: Page size
+        rank: Search rank expression, for sort=relevance
+
+    Returns:
+        The paginated query
+    """
+    descending, keys = sort_keys(sort, rank)
+    return keyset(query, keys, descending, cursor, limit)
+
+
+def keyset(query: Select, keys: List[SortKey], descending: bool, cursor: Optional[str], limit: int) -> Select:
+    """
+    Paginate query on explicit sort keys (see paginate).
+
+    Args:
+        query: Filtered select on the tasks table
+        keys: Sort keys, the last one unique
+        descending: Direction of every key
+        cursor: Cursor returned with the previous page, if any
+        limit: Page size
+
+    Returns:
+        The paginated query, fetching limit + 1 rows
+    """
+    expressions = [key.expression for key in keys]
+
+    if cursor:
+        values = [key.bind(v) for key, v in zip(keys, decode_cursor(cursor, keys))]
+        row = tuple_(*expressions)
+        # Typées comme leurs colonnes : la priorité se compare en enum
+        bound = tuple_(*values, types=[e.type for e in expressions])
+        query = query.where(row < bound if descending else row > bound)
+
+    order = [e.desc() if descending else e.asc() for e in expressions]
+    return query.order_by(*order).limit(limit + 1)
+
+
+def next_cursor(rows: Sequence[Any], sort: TaskSort, limit: int) -> Optional[str]:
+    """
+    Build the cursor of the page following rows, fetched with paginate.
+
+    Args:
+        rows: Rows returned by the paginated query (limit + 1 at most)
+        sort: Sort mode
+        limit: Page size
+
+    Returns:
+        The next cursor, or None on the last page
+    """
+    _, keys = sort_keys(sort)
+    return keyset_cursor(rows, keys, limit)
+
+
+def keyset_cursor(rows: Sequence[Any], keys: List[SortKey], limit: int) -> Optional[str]:
+    """
+    Cursor of the page following rows, fetched with keyset.
+    """
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor([key.value(last) for key in keys])
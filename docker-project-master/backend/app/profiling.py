@@ -0,0 +1,73 @@
+import asyncio
+import hmac
+import logging
+import os
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .tracing import UNTRACED_PATHS
+
+logger = logging.getLogger(__name__)
+
+# Profilage à la demande : une requête portant l'en-tête X-Profile avec
+# cette valeur est profilée (pyinstrument, par échantillonnage) et sa
+# réponse remplacée par le rapport HTML. Non défini : jamais de profilage.
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+# Intervalle d'échantillonnage, en secondes
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.001"))
+
+PROFILE_HEADER = b"x-profile"
+
+
+class ProfilerMiddleware:
+    """
+    Profile the requests that ask for it with the X-Profile header.
+
+    Only one request is profiled at a time per process; the others wait.
+    The original status code is returned in X-Profiled-Status.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._lock = asyncio.Lock()
+
+    def _requested(self, scope: Scope) -> bool:
+        if PROFILING_TOKEN is None or scope["type"] != "http" or scope["path"] in UNTRACED_PATHS:
+            return False
+        token = dict(scope["headers"]).get(PROFILE_HEADER)
+        return token is not None and hmac.compare_digest(token, PROFILING_TOKEN.encode())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+
+        status = 500
+
+        async def discard(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        async with self._lock:
+            profiler = Profiler(interval=PROFILING_INTERVAL, async_mode="enabled")
+            profiler.start()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.stop()
+
+        logger.info("Profiled %s %s (%d)", scope["method"], scope["path"], status)
+        body = profiler.output_html().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/html; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-profiled-status", str(status).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
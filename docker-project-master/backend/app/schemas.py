@@ -1,14 +1,44 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional
+from typing import Dict, List, Optional
 from enum import Enum
 
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Convert an aware datetime to naive UTC, the form stored in the
+    timestamp columns. Naive values are taken as UTC already.
+    """
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 class PriorityEnum(str, Enum):
     URGENT = "urgent"
     HIGH = "high"
     MEDIUM = "medium"
     LOW = "low"
 
+class TransferFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+class TaskSort(str, Enum):
+    DUE_DATE = "due_date"
+    PRIORITY = "priority"
+    CREATED = "created"
+    UPDATED = "updated"
+    RELEVANCE = "relevance"
+
+class AgendaBucket(str, Enum):
+    OVERDUE = "overdue"    # Échéance passée
+    TODAY = "today"        # D'ici la fin de la journée
+    UPCOMING = "upcoming"  # Les jours suivants, jusqu'à l'horizon
+
+class TaskFormat(str, Enum):
+    JSON = "json"          # Tableau d'objets
+    COLUMNAR = "columnar"  # Objet JSON d'un tableau par champ
+    MSGPACK = "msgpack"    # Tableau d'objets, en MessagePack
+
 class TaskBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=100, examples=["Refactor UI"])
     description: Optional[str] = Field(
@@ -26,7 +56,7 @@ class TaskBase(BaseModel):
     due_date: Optional[datetime] = Field(
         None,
         examples=["2024-01-22T17:00:00"],
-        description="Date limite de réalisation"
+        description="Date limite de réalisation, en UTC si elle n'a pas de fuseau"
     )
     estimated_time: Optional[int] = Field(
         None,
@@ -50,13 +80,22 @@ class TaskBase(BaseModel):
             raise ValueError("Maximum 5 tags autorisés")
         return [tag.lower() for tag in v]
 
+    # Colonnes timestamp sans fuseau : asyncpg refuse une date avec fuseau
+    # ("2024-01-22T17:00:00Z", ce qu'envoie le navigateur)
+    @field_validator('due_date')
+    def validate_due_date(cls, v):
+        return naive_utc(v)
+
 class TaskCreate(TaskBase):
     pass
 
+class TaskImport(TaskCreate):
+    completed: bool = Field(default=False, description="Tâche terminée")
+
 class TaskUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
-    priority: Optional[str] = None
+    priority: Optional[PriorityEnum] = None
     completed: Optional[bool] = None
     starred: Optional[bool] = None
     archived: Optional[bool] = None
@@ -64,6 +103,24 @@ class TaskUpdate(BaseModel):
     estimated_time: Optional[int] = None
     tags: Optional[List[str]] = None
 
+    @field_validator('priority')
+    def validate_priority(cls, v):
+        # Colonne NOT NULL : "priority": null est refusé, l'omettre la conserve
+        if v is None:
+            raise ValueError("priority cannot be null")
+        return v
+
+    @field_validator('due_date')
+    def validate_due_date(cls, v):
+        return naive_utc(v)
+
+class BulkTaskUpdate(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000, description="Tâches à modifier")
+    changes: TaskUpdate = Field(..., description="Champs appliqués à toutes les tâches")
+
+class BulkTaskIds(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000, description="Tâches à supprimer")
+
 class Task(TaskBase):
     id: int
     created_at: datetime
@@ -71,4 +128,21 @@ class Task(TaskBase):
     completed: bool = False
 
     class Config:
-        from_attributes = True  # Anciennement orm_mode=True dans Pydantic v1
\ No newline at end of file
+        from_attributes = True  # Anciennement orm_mode=True dans Pydantic v1
+
+class TaskStats(BaseModel):
+    active: int = Field(..., description="Tâches ni terminées ni archivées")
+    completed: int = Field(..., description="Tâches terminées")
+    due_today: int = Field(..., description="Tâches actives à échéance aujourd'hui")
+    overdue: int = Field(..., description="Tâches actives dont l'échéance est passée")
+    by_priority: Dict[str, int] = Field(..., description="Tâches actives par priorité")
+    by_tag: Dict[str, int] = Field(..., description="Tâches actives par tag")
+
+class AgendaCount(BaseModel):
+    total: int = Field(..., description="Tâches de la période")
+    by_priority: Dict[str, int] = Field(..., description="Tâches de la période par priorité")
+
+class AgendaSummary(BaseModel):
+    overdue: AgendaCount = Field(..., description="Tâches actives dont l'échéance est passée")
+    today: AgendaCount = Field(..., description="Tâches actives à échéance d'ici la fin de la journée")
+    upcoming: AgendaCount = Field(..., description="Tâches actives à échéance dans les jours suivants")
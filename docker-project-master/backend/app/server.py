@@ -0,0 +1,184 @@
+"""
+Production server.
+
+    python -m backend.app.server
+
+Runs the API under uvicorn with WEB_CONCURRENCY worker processes sharing
+one listening socket; by default one per CPU of the container's cgroup
+quota, so a pod limited to 2 CPUs runs 2 workers. Each worker has its own
+connection pools, caches and LISTEN connection: a pod opens
+WEB_CONCURRENCY x (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections at most.
+
+On SIGTERM, workers stop accepting connections, close the /events
+streams, finish the requests in flight (up to SERVER_GRACEFUL_TIMEOUT
+seconds) and then close their database connections. With
+SERVER_MAX_REQUESTS, a worker is replaced by a fresh process after that
+many requests, to bound memory growth.
+"""
+import logging
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import List, Optional
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+# Configuré par uvicorn, contrairement aux logs de l'application qui ne
+# le sont qu'à l'import de main dans chaque worker
+logger = logging.getLogger("uvicorn.error")
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+# Non défini : d'après le quota CPU du cgroup (limits.cpu du pod)
+WEB_CONCURRENCY = os.getenv("WEB_CONCURRENCY")
+# "asyncio" et "h11" : implémentations en Python pur de uvicorn
+SERVER_LOOP = os.getenv("SERVER_LOOP", "uvloop")
+SERVER_HTTP = os.getenv("SERVER_HTTP", "httptools")
+# Au-delà du keepalive des connexions amont de NGINX (60 s) : c'est le
+# proxy qui ferme une connexion inactive, jamais le serveur pendant que
+# le proxy la réutilise
+SERVER_KEEPALIVE = int(os.getenv("SERVER_KEEPALIVE", "75"))
+# Connexions acceptées par le noyau en attendant un worker
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+# Sous terminationGracePeriodSeconds (30 s), moins le preStop
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "20"))
+# 0 : jamais de remplacement. Le seuil de chaque worker est tiré entre
+# N et N + jitter, pour qu'ils ne redémarrent pas tous ensemble.
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "0"))
+SERVER_MAX_REQUESTS_JITTER = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", str(SERVER_MAX_REQUESTS // 10)))
+# Une fois le seuil atteint, le worker répond encore pendant ce délai avec
+# "Connection: close" : les clients ferment leurs connexions d'eux-mêmes
+# au lieu d'envoyer une requête sur une connexion que le worker coupe
+RECYCLE_DRAIN_SECONDS = 1.0
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """
+    CPU quota of the current cgroup, in CPUs.
+
+    Returns:
+        The quota (0.5 for a 500m limit), or None when there is none
+    """
+    try:
+        # cgroup v2 : "<quota> <période>" ou "max <période>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1 : quota à -1 sans limite
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def worker_count() -> int:
+    """
+    WEB_CONCURRENCY, or the usable CPUs rounded to the nearest integer.
+    """
+    if WEB_CONCURRENCY:
+        return max(1, int(WEB_CONCURRENCY))
+    cpus: float = len(os.sched_getaffinity(0))
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, limit)
+    return max(1, math.floor(cpus + 0.5))
+
+
+class Server(uvicorn.Server):
+    """
+    uvicorn server closing the /events streams at shutdown, and drawing
+    its own request limit in each worker.
+    """
+
+    def __init__(self, config: uvicorn.Config):
+        super().__init__(config)
+        self._recycle_at: Optional[float] = None
+
+    async def on_tick(self, counter: int) -> bool:
+        if self._recycle_at is None:
+            should_exit = await super().on_tick(counter)
+            if not should_exit or self.should_exit:
+                return should_exit
+            # Seuil de requêtes atteint (et non un signal) ; l'en-tête
+            # n'est plus remplacé tant que super().on_tick n'est plus appelé
+            self._recycle_at = time.monotonic() + RECYCLE_DRAIN_SECONDS
+            self.server_state.default_headers = self.server_state.default_headers + [(b"connection", b"close")]
+        return self.should_exit or time.monotonic() >= self._recycle_at
+
+    def run(self, sockets: Optional[List] = None) -> None:
+        # Exécuté dans le processus du worker
+        if self.config.limit_max_requests:
+            self.config.limit_max_requests += random.randint(0, SERVER_MAX_REQUESTS_JITTER)
+        super().run(sockets=sockets)
+
+    async def shutdown(self, sockets: Optional[List] = None) -> None:
+        # Les flux /events ne se terminent jamais d'eux-mêmes : sans cela,
+        # l'attente des connexions irait jusqu'à SERVER_GRACEFUL_TIMEOUT.
+        # Les navigateurs se reconnectent à un autre pod.
+        from .main import broadcaster
+        broadcaster.close()
+        await super().shutdown(sockets=sockets)
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            from prometheus_client import multiprocess
+            # Retire les jauges de ce worker des sommes exposées par /metrics
+            multiprocess.mark_process_dead(os.getpid())
+
+
+def main() -> None:
+    workers = worker_count()
+    supervised = workers > 1 or SERVER_MAX_REQUESTS > 0
+    if supervised and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        # Métriques de chaque worker dans des fichiers, additionnées par
+        # /metrics ; hérité par les workers, à définir avant leur import
+        directory = os.path.join(tempfile.gettempdir(), "prometheus-multiproc")
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+
+    config = uvicorn.Config(
+        "backend.app.main:app",
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        workers=workers,
+        loop=SERVER_LOOP,
+        http=SERVER_HTTP,
+        backlog=SERVER_BACKLOG,
+        timeout_keep_alive=SERVER_KEEPALIVE,
+        timeout_graceful_shutdown=SERVER_GRACEFUL_TIMEOUT,
+        limit_max_requests=SERVER_MAX_REQUESTS or None,
+        # Log d'accès échantillonné par monitoring.MetricsMiddleware
+        access_log=False,
+    )
+    logger.info(
+        "%d worker(s), loop %s, http %s, max requests %s",
+        workers, SERVER_LOOP, SERVER_HTTP, SERVER_MAX_REQUESTS or "unlimited",
+    )
+    server = Server(config)
+    if not supervised:
+        server.run()
+        return
+    # Un seul fichier de logs pour tous les workers, qui ne le font pas
+    # tourner eux-mêmes ; importé après PROMETHEUS_MULTIPROC_DIR
+    from . import logs
+    rotator = logs.share_log_file()
+    # Un seul worker avec SERVER_MAX_REQUESTS passe aussi par le
+    # superviseur : il le relance, et le socket reste ouvert entre-temps
+    try:
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    finally:
+        if rotator is not None:
+            rotator.stop()
+
+
+if __name__ == "__main__":
+    main()
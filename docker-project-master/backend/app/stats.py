@@ -0,0 +1,103 @@
+from datetime import datetime, time, timedelta, timezone
+from typing import Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import JSON, Select, func, select, text, true
+
+from . import models
+
+# Une tâche active n'est ni terminée ni archivée (le filtre archived est
+# appliqué à toute la requête). completed peut être NULL sur d'anciennes lignes.
+ACTIVE = models.Task.completed.is_not(True)
+COMPLETED = models.Task.completed.is_(True)
+
+
+def today_bounds(tz: ZoneInfo, now: datetime) -> Tuple[datetime, datetime]:
+    """
+    Start and end of the current day in a time zone, as naive UTC datetimes.
+
+    Dates are stored as naive UTC timestamps, so the local midnights are
+    converted before being compared with due_date.
+
+    Args:
+        tz: Time zone of the client
+        now: Current time, timezone-aware
+
+    Returns:
+        The local midnight of today and of tomorrow, in UTC
+    """
+    today = now.astimezone(tz).date()
+    start = datetime.combine(today, time.min, tzinfo=tz)
+    end = datetime.combine(today + timedelta(days=1), time.min, tzinfo=tz)
+    return (
+        start.astimezone(timezone.utc).replace(tzinfo=None),
+        end.astimezone(timezone.utc).replace(tzinfo=None),
+    )
+
+
+def stats_query(owner_id: int, archived: bool, now: datetime, start: datetime, end: datetime) -> Select:
+    """
+    Build the single statement computing the dashboard counters.
+
+    Every counter is a COUNT(*) FILTER (WHERE ...) over one scan of the
+    tasks table. The per-tag breakdown needs the tags unnested, so it is a
+    scalar subquery of the same statement.
+
+    Args:
+        owner_id: Owner of the tasks counted
+        archived: Count archived tasks instead of current ones
+        now: Current time, naive UTC; active tasks due before are overdue
+        start: Start of today, naive UTC
+        end: Start of tomorrow, naive UTC
+
+    Returns:
+        A select returning one row: active, completed, due_today, overdue,
+        one priority_<name> column per priority, and tags
+    """
+    due = models.Task.due_date
+    counters = [
+        func.count().filter(ACTIVE).label("active"),
+        func.count().filter(COMPLETED).label("completed"),
+        func.count().filter(ACTIVE, due >= start, due < end).label("due_today"),
+        func.count().filter(ACTIVE, due < now).label("overdue"),
+    ]
+    counters += [
+        func.count().filter(ACTIVE, models.Task.priority == name).label(f"priority_{name}")
+        for name in models.PRIORITIES
+    ]
+
+    unnested = func.unnest(models.Task.tags).table_valued("tag").render_derived().lateral()
+    tag = unnested.c.tag
+    per_tag = (
+        select(tag, func.count().label("count"))
+        .select_from(models.Task)
+        .join(unnested, true())
+        .where(models.Task.owner_id == owner_id, models.Task.archived == archived, ACTIVE)
+        .group_by(tag)
+        .order_by(func.count().desc(), tag)
+        .subquery()
+    )
+    # Typé JSON pour que psycopg2 comme asyncpg renvoient un dict
+    tags = select(func.coalesce(
+        func.json_object_agg(per_tag.c.tag, per_tag.c.count),
+        text("'{}'::json"),
+        type_=JSON,
+    )).scalar_subquery()
+
+    return select(*counters, tags.label("tags")).where(
+        models.Task.owner_id == owner_id, models.Task.archived == archived
+    )
+
+
+def stats_dict(row) -> dict:
+    """
+    Shape the row returned by stats_query as a schemas.TaskStats dict.
+    """
+    return {
+        "active": row.active,
+        "completed": row.completed,
+        "due_today": row.due_today,
+        "overdue": row.overdue,
+        "by_priority": {name: getattr(row, f"priority_{name}") for name in models.PRIORITIES},
+        "by_tag": row.tags or {},
+    }
@@ -0,0 +1,212 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from opentelemetry import propagate, trace
+from opentelemetry.trace import SpanKind, StatusCode
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Traces OpenTelemetry : un span par requête HTTP, avec en enfants
+# l'attente du pool, chaque requête SQL et la sérialisation.
+# Désactivé par défaut : aucun coût tant que TRACING_ENABLED est faux.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+# "otlp" : collecteur OpenTelemetry en HTTP (OTEL_EXPORTER_OTLP_ENDPOINT,
+# http://localhost:4318 par défaut) ; "console" : spans écrits sur stdout
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "otlp")
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "smart-todo-backend")
+
+# Requêtes SQL plus lentes que ce seuil (ms) journalisées avec leur plan ;
+# 0 désactive. Un même texte de requête n'est expliqué qu'une fois par
+# SLOW_QUERY_EXPLAIN_INTERVAL secondes.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "60"))
+
+# EXPLAIN sans ANALYZE n'exécute pas la requête, y compris pour une écriture
+EXPLAINABLE = {"SELECT", "WITH", "INSERT", "UPDATE", "DELETE"}
+
+# Requêtes non tracées : flux ouverts pendant des heures, collectes Prometheus
+UNTRACED_PATHS = {"/events", "/metrics"}
+
+tracer = trace.get_tracer("backend.app")
+_provider = None
+_explained_at: Dict[str, float] = {}
+
+
+def setup_tracing() -> None:
+    """
+    Install the OpenTelemetry SDK and its exporter, if TRACING_ENABLED.
+
+    Spans are sent in batches from a background thread.
+    """
+    global _provider
+    if not TRACING_ENABLED or _provider is not None:
+        return
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    if TRACING_EXPORTER == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter()
+
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": SERVICE_NAME}),
+        # Un appelant déjà tracé (en-tête traceparent) décide pour nous
+        sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO)),
+    )
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+
+
+def shutdown_tracing() -> None:
+    """Flush the spans still queued for export."""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[None]:
+    """
+    Child span of the current request, or nothing when tracing is off.
+    """
+    if not TRACING_ENABLED:
+        yield
+        return
+    with tracer.start_as_current_span(name, attributes=attributes):
+        yield
+
+
+class TracingMiddleware:
+    """
+    Open a server span for each HTTP request, continuing the trace of the
+    caller when it sends a traceparent header.
+
+    The span ends once the response is fully sent; it is named after the
+    route template, like the HTTP metrics.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not TRACING_ENABLED or scope["type"] != "http" or scope["path"] in UNTRACED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with tracer.start_as_current_span(
+            method,
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as request_span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                template = getattr(scope.get("route"), "path_format", None)
+                if template is not None:
+                    request_span.update_name(f"{method} {template}")
+                    request_span.set_attribute("http.route", template)
+                request_span.set_attribute("http.response.status_code", status)
+                if status >= 500:
+                    request_span.set_status(StatusCode.ERROR)
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    # Sur la même connexion (mêmes paramètres, même transaction), dans un
+    # SAVEPOINT : un EXPLAIN en échec n'interrompt pas la transaction
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute("EXPLAIN " + statement, parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            raise
+        cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    finally:
+        cursor.close()
+
+
+def log_slow_query(conn, statement: str, parameters, elapsed: float) -> None:
+    """
+    Log a statement slower than SLOW_QUERY_MS, with its plan unless the
+    same statement was explained less than SLOW_QUERY_EXPLAIN_INTERVAL
+    seconds ago. Parameter values are not logged.
+    """
+    plan = None
+    now = time.monotonic()
+    explainable = statement.lstrip()[:6].upper() in EXPLAINABLE
+    if explainable and now - _explained_at.get(statement, float("-inf")) >= SLOW_QUERY_EXPLAIN_INTERVAL:
+        if len(_explained_at) >= 1000:
+            _explained_at.clear()
+        _explained_at[statement] = now
+        try:
+            plan = _explain(conn, statement, parameters)
+        except Exception as e:
+            plan = f"(EXPLAIN failed: {e})"
+    logger.warning(
+        "Slow query (%.0f ms): %s%s",
+        elapsed * 1000, " ".join(statement.split()), f"\n{plan}" if plan else "",
+    )
+
+
+def observe_queries(engine, label: str) -> None:
+    """
+    Trace each SQL statement sent through an engine and log the slow ones.
+
+    Args:
+        engine: Sync engine (the sync_engine of an AsyncEngine for asyncpg)
+        label: Engine name recorded on the spans
+    """
+    if not TRACING_ENABLED and not SLOW_QUERY_MS:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        query_span = None
+        if TRACING_ENABLED:
+            query_span = tracer.start_span("db.query", kind=SpanKind.CLIENT, attributes={
+                "db.system": "postgresql", "db.statement": statement, "db.engine": label,
+            })
+        conn.info.setdefault("traced_queries", []).append((time.perf_counter(), query_span))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        start, query_span = conn.info["traced_queries"].pop()
+        elapsed = time.perf_counter() - start
+        if query_span is not None:
+            query_span.end()
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS and not executemany:
+            log_slow_query(conn, statement, parameters, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(context) -> None:
+        traced = context.connection.info.get("traced_queries") if context.connection is not None else None
+        if not traced:
+            return
+        _, query_span = traced.pop()
+        if query_span is not None:
+            query_span.record_exception(context.original_exception)
+            query_span.set_status(StatusCode.ERROR)
+            query_span.end()
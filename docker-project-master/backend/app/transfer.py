@@ -0,0 +1,384 @@
+import csv
+import io
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from . import database, identity, metrics, models, notifications, schemas, serializers, tracing
+from .schemas import TransferFormat
+from .utils import APIResponse, ErrorDetail
+
+logger = logging.getLogger(__name__)
+
+# Export et import en flux (/export, /import) : la mémoire utilisée ne
+# dépend pas du nombre de tâches, seulement de la taille des lots.
+
+# Lignes lues par aller-retour du curseur serveur
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+# Lignes par COPY ; chaque lot est validé (COMMIT) séparément
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "5000"))
+# Erreurs détaillées dans la réponse ; les suivantes sont seulement comptées
+IMPORT_MAX_ERRORS = 1000
+# Une tâche valide tient largement dans cette taille
+IMPORT_MAX_RECORD_BYTES = 64 * 1024
+
+MEDIA_TYPES = {
+    TransferFormat.NDJSON: "application/x-ndjson",
+    TransferFormat.CSV: "text/csv; charset=utf-8",
+}
+
+# owner_id, created_at et updated_at sont fixés à l'import, l'id par la séquence
+IMPORT_COLUMNS = (
+    "owner_id", "title", "description", "priority", "tags", "due_date", "estimated_time",
+    "starred", "archived", "completed", "created_at", "updated_at",
+)
+COPY_SQL = f"COPY {models.Task.__tablename__} ({', '.join(IMPORT_COLUMNS)}) FROM STDIN"
+
+# COPY est refusé sur une table soumise aux politiques RLS : avec
+# DB_ROW_SECURITY, le lot passe par une table temporaire, puis un INSERT
+# vérifié par la politique
+STAGING_TABLE = "task_import"
+STAGING_SQL = (
+    f"CREATE TEMP TABLE {STAGING_TABLE} ON COMMIT DROP AS "
+    f"SELECT {', '.join(IMPORT_COLUMNS)} FROM {models.Task.__tablename__} WITH NO DATA"
+)
+STAGED_COPY_SQL = f"COPY {STAGING_TABLE} FROM STDIN"
+STAGED_INSERT_SQL = (
+    f"INSERT INTO {models.Task.__tablename__} ({', '.join(IMPORT_COLUMNS)}) "
+    f"SELECT {', '.join(IMPORT_COLUMNS)} FROM {STAGING_TABLE}"
+)
+
+_EXPORT_SECONDS = metrics.SERIALIZATION_SECONDS.labels("export")
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def export_query(owner_id: int, archived: Optional[bool]):
+    """
+    Select the tasks of owner_id to export, in id order.
+
+    Args:
+        owner_id: Owner of the tasks
+        archived: Only archived (True) or active (False) tasks, None for all
+    """
+    query = select(*serializers.TASK_COLUMNS).where(models.Task.owner_id == owner_id).order_by(models.Task.id)
+    if archived is not None:
+        query = query.where(models.Task.archived == archived)
+    return query
+
+
+def _csv_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return orjson.dumps(value).decode()
+    return value
+
+
+def _csv_bytes(records: List[List[Any]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(records)
+    return buffer.getvalue().encode()
+
+
+async def export_stream(query, file_format: TransferFormat, setup: Sequence[Any] = ()) -> AsyncIterator[bytes]:
+    """
+    Body of an /export response.
+
+    NDJSON lines are the objects /get_task returns. CSV has a header row
+    with the same field names; tags are a JSON array in their cell and
+    null values are empty cells.
+
+    Args:
+        query: Query selecting TASK_COLUMNS
+        file_format: Output format
+        setup: Statements run before the query (see database.stream_partitions)
+
+    Yields:
+        One chunk per EXPORT_BATCH_SIZE tasks
+    """
+    if file_format == TransferFormat.CSV:
+        yield _csv_bytes([list(serializers.TASK_FIELDS)])
+
+    async for rows in database.stream_partitions(query, EXPORT_BATCH_SIZE, setup):
+        with _EXPORT_SECONDS.time(), tracing.span("serialize", kind="export"):
+            tasks = [serializers.task_dict(row) for row in rows]
+            if file_format == TransferFormat.NDJSON:
+                chunk = b"".join(orjson.dumps(task, option=orjson.OPT_APPEND_NEWLINE) for task in tasks)
+            else:
+                chunk = _csv_bytes([[_csv_cell(value) for value in task.values()] for task in tasks])
+        metrics.EXPORT_ROWS.inc(len(tasks))
+        yield chunk
+
+
+class ImportReport:
+    """Outcome of an /import call, filled in while the upload is read"""
+
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[ErrorDetail] = []
+
+    def reject(self, line: int, error_code: str, detail: str, **details) -> None:
+        self.failed += 1
+        metrics.IMPORT_ROWS.labels("rejected").inc()
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append(ErrorDetail(
+                error_code=error_code, detail=detail, error_details={"line": line, **details},
+            ))
+
+    def response(self) -> APIResponse:
+        requested = self.imported + self.failed
+        return APIResponse(
+            success=not self.failed,
+            message=f"{self.imported}/{requested} tasks imported",
+            data={"imported": self.imported, "errors": self.errors},
+            meta={
+                "requested": requested,
+                "succeeded": self.imported,
+                "failed": self.failed,
+                "errors_truncated": self.failed > len(self.errors),
+            },
+        )
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Split an uploaded byte stream into numbered lines, without line ends.
+
+    A line longer than IMPORT_MAX_RECORD_BYTES is yielded as None and its
+    content dropped as it arrives.
+    """
+    number = 0
+    buffer = bytearray()
+    too_long = False
+    async for chunk in chunks:
+        start = 0
+        while (end := chunk.find(b"\n", start)) >= 0:
+            number += 1
+            if too_long or len(buffer) + end - start > IMPORT_MAX_RECORD_BYTES:
+                yield number, None
+            else:
+                buffer += chunk[start:end]
+                yield number, bytes(buffer).rstrip(b"\r")
+            buffer.clear()
+            too_long = False
+            start = end + 1
+        if not too_long:
+            buffer += chunk[start:]
+            if len(buffer) > IMPORT_MAX_RECORD_BYTES:
+                too_long = True
+                buffer.clear()
+    if too_long:
+        yield number + 1, None
+    elif buffer.strip():
+        yield number + 1, bytes(buffer).rstrip(b"\r")
+
+
+async def _ndjson_items(lines, report: ImportReport) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    async for number, line in lines:
+        if line is None:
+            report.reject(number, "line_too_long", f"Line exceeds {IMPORT_MAX_RECORD_BYTES} bytes")
+            continue
+        if not line.strip():
+            continue
+        try:
+            item = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            report.reject(number, "invalid_json", str(e))
+            continue
+        if not isinstance(item, dict):
+            report.reject(number, "invalid_json", "Expected a JSON object")
+            continue
+        yield number, item
+
+
+def _csv_item(header: List[str], values: List[str]) -> Dict[str, Any]:
+    # Cellule vide : champ absent, la valeur par défaut s'applique
+    item: Dict[str, Any] = {}
+    for name, value in zip(header, values):
+        if value == "":
+            continue
+        if name == "tags":
+            try:
+                value = orjson.loads(value)
+            except orjson.JSONDecodeError:
+                pass  # Rejeté par la validation (liste attendue)
+        item[name] = value
+    return item
+
+
+async def _csv_items(lines, report: ImportReport) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    header: Optional[List[str]] = None
+    # Un champ entre guillemets peut contenir des retours à la ligne : un
+    # enregistrement se termine sur une ligne où le nombre de guillemets
+    # cumulé est pair ("" échappe un guillemet, la parité est conservée)
+    pending: List[bytes] = []
+    quotes = 0
+    start = 0
+    async for number, line in lines:
+        if line is None:
+            report.reject(start if pending else number, "line_too_long", f"Record exceeds {IMPORT_MAX_RECORD_BYTES} bytes")
+            pending, quotes = [], 0
+            continue
+        if not pending:
+            start = number
+        pending.append(line)
+        quotes += line.count(b'"')
+        if quotes % 2:
+            if sum(len(part) for part in pending) > IMPORT_MAX_RECORD_BYTES:
+                report.reject(start, "line_too_long", f"Record exceeds {IMPORT_MAX_RECORD_BYTES} bytes")
+                pending, quotes = [], 0
+            continue
+
+        record, pending, quotes = b"\n".join(pending), [], 0
+        if not record.strip():
+            continue
+        try:
+            text = record.decode("utf-8")
+        except UnicodeDecodeError:
+            report.reject(start, "invalid_encoding", "Rows must be UTF-8 encoded")
+            continue
+        try:
+            values = next(csv.reader([text]))
+        except csv.Error as e:
+            report.reject(start, "invalid_csv", str(e))
+            continue
+
+        if header is None:
+            # Éventuel BOM ajouté par les tableurs
+            header = [name.strip().lstrip("\ufeff") for name in values]
+            continue
+        if len(values) != len(header):
+            report.reject(start, "invalid_csv", f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        yield start, _csv_item(header, values)
+
+    if pending:
+        report.reject(start, "invalid_csv", "Unterminated quoted field")
+
+
+def _copy_text(value: Optional[str]) -> str:
+    if value is None:
+        return "\\N"
+    return value.translate(_COPY_ESCAPES)
+
+
+def _copy_timestamp(value: Optional[datetime]) -> str:
+    if value is None:
+        return "\\N"
+    # Les colonnes sont des timestamps UTC sans fuseau
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+def _copy_array(items: List[str]) -> str:
+    elements = ('"' + item.replace("\\", "\\\\").replace('"', '\\"') + '"' for item in items)
+    return _copy_text("{" + ",".join(elements) + "}")
+
+
+def copy_line(task: schemas.TaskImport, now: datetime, owner_id: int) -> str:
+    """
+    Format a validated task of owner_id as a line of COPY text format, in
+    IMPORT_COLUMNS order.
+    """
+    # Colonne par colonne plutôt que par type : appelé pour chaque ligne importée
+    return "\t".join((
+        str(owner_id),
+        _copy_text(task.title),
+        _copy_text(task.description),
+        task.priority.value,
+        _copy_array(task.tags),
+        _copy_timestamp(task.due_date),
+        "\\N" if task.estimated_time is None else str(task.estimated_time),
+        "t" if task.starred else "f",
+        "t" if task.archived else "f",
+        "t" if task.completed else "f",
+        _copy_timestamp(now),
+        _copy_timestamp(now),
+    )) + "\n"
+
+
+def _copy_chunk(data: str, owner_id: int) -> None:
+    # psycopg2 directement : COPY n'est pas exposé par SQLAlchemy
+    connection = database.engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            if identity.DB_ROW_SECURITY:
+                cursor.execute("SELECT set_config(%s, %s, true)", (identity.OWNER_SETTING, str(owner_id)))
+                cursor.execute(STAGING_SQL)
+                cursor.copy_expert(STAGED_COPY_SQL, io.StringIO(data))
+                cursor.execute(STAGED_INSERT_SQL)
+            else:
+                cursor.copy_expert(COPY_SQL, io.StringIO(data))
+            if notifications.NOTIFY_ENABLED:
+                # Une notification pour le lot (pas de RETURNING avec COPY)
+                payload = notifications.notify_payload("import", models.Task.__tablename__, owner_id=owner_id)
+                cursor.execute("SELECT pg_notify(%s, %s)", (notifications.CHANNEL, payload))
+        connection.commit()
+    finally:
+        connection.close()
+
+
+async def import_tasks(
+    chunks: AsyncIterator[bytes], file_format: TransferFormat, report: ImportReport, owner_id: int
+) -> None:
+    """
+    Validate uploaded tasks one by one and load the valid ones with COPY,
+    as tasks of owner_id.
+
+    Rows are validated against schemas.TaskImport (TaskCreate plus
+    "completed"); ids, created_at and updated_at are not imported. The
+    upload is read as it arrives and loaded IMPORT_CHUNK_ROWS rows at a
+    time, each chunk in its own transaction: if the import stops midway,
+    the chunks already loaded stay, and report.imported counts them.
+
+    Args:
+        chunks: Request body
+        file_format: Format of the body (CSV needs a header row)
+        report: Filled with the number of imported rows and the rejected ones
+        owner_id: Owner of the imported tasks
+    """
+    lines = _lines(chunks)
+    items = _ndjson_items(lines, report) if file_format == TransferFormat.NDJSON else _csv_items(lines, report)
+
+    buffer: List[str] = []
+
+    async def flush() -> None:
+        await database.run_blocking(_copy_chunk, "".join(buffer), owner_id)
+        report.imported += len(buffer)
+        metrics.IMPORT_ROWS.labels("imported").inc(len(buffer))
+        logger.info("Import: %d tasks loaded, %d rows rejected so far", report.imported, report.failed)
+        buffer.clear()
+
+    now = datetime.utcnow()
+    async for number, item in items:
+        try:
+            task = schemas.TaskImport.model_validate(item)
+        except ValidationError as e:
+            report.reject(
+                number, "validation_error", "Invalid task",
+                errors=e.errors(include_url=False, include_context=False),
+            )
+            continue
+        line = copy_line(task, now, owner_id)
+        if "\x00" in line:
+            # Refusé par PostgreSQL : ferait échouer tout le lot
+            report.reject(number, "validation_error", "Tasks cannot contain NUL characters")
+            continue
+        buffer.append(line)
+        if len(buffer) >= IMPORT_CHUNK_ROWS:
+            await flush()
+
+    if buffer:
+        await flush()
@@ -0,0 +1,75 @@
+"""
+Throughput of the single-item and bulk write endpoints.
+
+    DATABASE_URL=postgresql://... python -m backend.benchmarks.bulk_writes [--count 2000] [--batch 500]
+
+Requests go through the ASGI app in-process, so the numbers compare the
+endpoints themselves without network overhead. The tasks table is
+truncated first: never point this at a real database.
+"""
+import argparse
+import random
+import time
+from typing import Callable
+
+from fastapi.testclient import TestClient
+
+from backend.app.database import engine
+from backend.app.main import app
+
+from .common import PRIORITIES, TAGS, auth_headers, seed_tasks
+
+
+def payload(rng: random.Random) -> dict:
+    return {
+        "title": f"Task {rng.randrange(10**6)}",
+        "priority": rng.choice(PRIORITIES),
+        "tags": rng.sample(TAGS, rng.randint(0, 3)),
+    }
+
+
+def timed(label: str, count: int, fn: Callable[[], None]) -> None:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {count:>7} {elapsed:>8.2f}s {count / elapsed:>9.0f} tasks/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    items = [payload(rng) for _ in range(args.count)]
+    batches = [items[i:i + args.batch] for i in range(0, args.count, args.batch)]
+
+    with TestClient(app, headers=auth_headers()) as client:
+        def check(response) -> None:
+            response.raise_for_status()
+
+        seed_tasks(engine, 0)
+        print(f"{'scenario':<28} {'tasks':>7} {'time':>9} {'throughput':>15}")
+
+        timed("create /create_task", args.count,
+              lambda: [check(client.post("/create_task", json=item)) for item in items])
+        ids = list(range(1, args.count + 1))
+        timed("update /task/{id}", args.count,
+              lambda: [check(client.put(f"/task/{i}", json={"completed": True})) for i in ids])
+        timed("delete /task/{id}", args.count,
+              lambda: [check(client.delete(f"/task/{i}")) for i in ids])
+
+        seed_tasks(engine, 0)
+        timed(f"create /bulk (x{args.batch})", args.count,
+              lambda: [check(client.post("/bulk/create_task", json=batch)) for batch in batches])
+        id_batches = [ids[i:i + args.batch] for i in range(0, args.count, args.batch)]
+        timed(f"update /bulk (x{args.batch})", args.count,
+              lambda: [check(client.put("/bulk/update_task", json={"ids": b, "changes": {"completed": True}}))
+                       for b in id_batches])
+        timed(f"delete /bulk (x{args.batch})", args.count,
+              lambda: [check(client.post("/bulk/delete_task", json={"ids": b})) for b in id_batches])
+
+
+if __name__ == "__main__":
+    main()
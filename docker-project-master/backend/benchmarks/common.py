@@ -0,0 +1,181 @@
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import httpx
+from sqlalchemy import Engine, insert, text
+
+from backend.app import identity, migrations, models
+
+PRIORITIES = ["urgent", "high", "medium", "low"]
+TAGS = ["ui/ux", "mobile", "backend", "infra", "docs", "bug", "perf"]
+
+
+def fake_task(rng: random.Random) -> Dict:
+    """
+    Build a random tasks row, shaped like what /create_task stores for
+    the owner of auth_headers.
+
+    Args:
+        rng: Random generator, seeded by the caller for reproducible data
+
+    Returns:
+        Column values for one row
+    """
+    now = datetime.utcnow()
+    return {
+        "owner_id": models.LEGACY_OWNER_ID,
+        "title": f"Task {rng.randrange(10**6)}",
+        "description": rng.choice([None, "Lorem ipsum dolor sit amet " * rng.randint(1, 6)]),
+        "priority": rng.choice(PRIORITIES),
+        "tags": rng.sample(TAGS, rng.randint(0, 3)),
+        "created_at": now - timedelta(minutes=rng.randrange(10**6)),
+        "updated_at": now - timedelta(minutes=rng.randrange(10**4)),
+        "due_date": rng.choice([None, now + timedelta(hours=rng.randrange(-500, 2000))]),
+        "estimated_time": rng.choice([None, rng.randrange(0, 1440)]),
+        "starred": rng.random() < 0.1,
+        "archived": rng.random() < 0.2,
+        "completed": rng.random() < 0.3,
+    }
+
+
+def seed_tasks(engine: Engine, count: int, batch_size: int = 5000, seed: int = 42) -> None:
+    """
+    Replace the content of the tasks table with count random tasks.
+
+    Args:
+        engine: Engine of the database to seed
+        count: Number of tasks to insert
+        batch_size: Rows per INSERT batch
+        seed: Random seed
+    """
+    rng = random.Random(seed)
+    migrations.migrate(engine)
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE tasks RESTART IDENTITY"))
+        for start in range(0, count, batch_size):
+            rows = [fake_task(rng) for _ in range(min(batch_size, count - start))]
+            conn.execute(insert(models.Task), rows)
+        conn.execute(text("ANALYZE tasks"))
+
+
+def auth_headers() -> Dict[str, str]:
+    """
+    Authorization header of the owner of the seeded tasks, signed with
+    AUTH_SECRET: set it for the benchmark and the servers it starts.
+    """
+    return identity.auth_headers(models.LEGACY_OWNER_ID, ttl=24 * 3600)
+
+
+def measure(fn: Callable[[], object], repeat: int = 5) -> List[float]:
+    """
+    Run fn repeat times after one warm-up call.
+
+    Args:
+        fn: Function to time
+        repeat: Number of timed runs
+
+    Returns:
+        Durations in seconds
+    """
+    fn()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def median_ms(durations: List[float]) -> float:
+    return statistics.median(durations) * 1000
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of values.
+
+    Args:
+        values: Samples, in any order
+        pct: Percentile between 0 and 100
+
+    Returns:
+        The percentile, or 0.0 if there are no samples
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{base_url} did not become ready in {timeout}s")
+
+
+def server_command(server: str, port: int, workers: int) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Command line and environment starting the API.
+
+    Args:
+        server: "production" (python -m backend.app.server, as in the
+            Docker image) or "uvicorn" (a single uvicorn process with the
+            asyncio loop and the h11 parser, the former image command)
+        port: Port to listen on, on 127.0.0.1
+        workers: Worker processes of the production server
+
+    Returns:
+        Arguments and extra environment variables
+    """
+    if server == "production":
+        return [sys.executable, "-m", "backend.app.server"], {
+            "SERVER_HOST": "127.0.0.1", "SERVER_PORT": str(port), "WEB_CONCURRENCY": str(workers),
+        }
+    return [
+        sys.executable, "-m", "uvicorn", "backend.app.main:app", "--port", str(port), "--log-level", "warning",
+        "--loop", "asyncio", "--http", "h11",
+        # Au-delà de 5 s (défaut) sans requête, uvicorn ferme la connexion
+        # pendant que le client peut la réutiliser : erreurs parasites
+        "--timeout-keep-alive", "60",
+    ], {}
+
+
+@contextmanager
+def serve(port: int, server: str = "uvicorn", workers: int = 1, **env: str) -> Iterator[str]:
+    """
+    Run the API in a subprocess until the block exits.
+
+    Args:
+        port: Port to listen on, on 127.0.0.1
+        server: "uvicorn" or "production", see server_command
+        workers: Worker processes of the production server
+        **env: Environment variables set for the server, e.g. DATABASE_MODE
+
+    Yields:
+        Base URL of the server, once /health answers
+    """
+    base_url = f"http://127.0.0.1:{port}"
+    command, server_env = server_command(server, port, workers)
+    process = subprocess.Popen(command, env={**os.environ, **server_env, **env})
+    try:
+        asyncio.run(wait_until_ready(base_url))
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait()
@@ -0,0 +1,153 @@
+"""
+Check that a write on one replica invalidates the caches of another,
+including after the LISTEN connections were dropped.
+
+    DATABASE_URL=postgresql://... python -m backend.benchmarks.cross_replica
+
+Two uvicorn processes are started on --port and --port + 1, against the
+same database. The tasks table is truncated first: never point this at
+a real database. Exits with status 1 if a replica serves stale data.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable
+
+import httpx
+from sqlalchemy import text
+
+from backend.app.database import engine
+
+from .common import auth_headers, seed_tasks, wait_until_ready
+
+
+def listener_count() -> int:
+    with engine.connect() as conn:
+        return conn.scalar(text(
+            "SELECT count(*) FROM pg_stat_activity WHERE application_name = 'task-change-listener'"
+        ))
+
+
+async def listeners_ready() -> bool:
+    return listener_count() >= 2
+
+
+def drop_listeners() -> None:
+    with engine.connect() as conn:
+        conn.execute(text(
+            "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+            "WHERE application_name = 'task-change-listener'"
+        ))
+
+
+async def wait_for(condition: Callable, timeout: float) -> float:
+    """
+    Poll condition until it returns True.
+
+    Returns:
+        Seconds waited
+
+    Raises:
+        TimeoutError: If condition stayed False for timeout seconds
+    """
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        if await condition():
+            return time.monotonic() - start
+        await asyncio.sleep(0.01)
+    raise TimeoutError
+
+
+async def check(a: str, b: str, timeout: float) -> int:
+    failures = 0
+    async with httpx.AsyncClient(timeout=10.0, headers=auth_headers()) as client:
+        task = (await client.post(f"{a}/create_task", json={"title": "v0"})).json()
+
+        async def b_sees(title: str):
+            async def condition():
+                tasks = (await client.get(f"{b}/get_task")).json()
+                return any(t["id"] == task["id"] and t["title"] == title for t in tasks)
+            return condition
+
+        async def step(name: str, title: str) -> None:
+            nonlocal failures
+            # Met la page en cache sur B avant l'écriture faite sur A
+            await client.get(f"{b}/get_task")
+            await client.put(f"{a}/task/{task['id']}", json={"title": title})
+            try:
+                waited = await wait_for(await b_sees(title), timeout)
+                print(f"{name:<32} ok, visible on B after {waited * 1000:.0f}ms")
+            except TimeoutError:
+                failures += 1
+                print(f"{name:<32} FAILED, B still stale after {timeout}s")
+
+        await wait_for(await b_sees("v0"), timeout)
+        await step("update on A", "v1")
+
+        drop_listeners()
+        # Les deux replicas rouvrent leur connexion d'écoute
+        await wait_for(listeners_ready, timeout)
+        await step("update on A after reconnect", "v2")
+
+        await client.get(f"{b}/get_task")
+        await client.post(f"{a}/bulk/delete_task", json={"ids": [task["id"]]})
+        async def b_forgets():
+            return all(t["id"] != task["id"] for t in (await client.get(f"{b}/get_task")).json())
+        try:
+            waited = await wait_for(b_forgets, timeout)
+            print(f"{'bulk delete on A':<32} ok, visible on B after {waited * 1000:.0f}ms")
+        except TimeoutError:
+            failures += 1
+            print(f"{'bulk delete on A':<32} FAILED, B still stale after {timeout}s")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    seed_tasks(engine, 0)
+    urls = [f"http://127.0.0.1:{args.port + i}" for i in range(2)]
+    # Sorties des serveurs, affichées s'ils ne démarrent pas
+    outputs = [tempfile.TemporaryFile() for _ in range(2)]
+    servers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.app.main:app", "--port", str(args.port + i), "--log-level", "warning"],
+            # Un TTL long : seule l'invalidation peut rendre B à jour ; les
+            # journaux sur la sortie d'erreur, recueillie dans output
+            env={**os.environ, "TASK_CACHE_TTL": "3600", "LOG_FILE": ""},
+            stdout=output,
+            stderr=subprocess.STDOUT,
+        )
+        for i, output in enumerate(outputs)
+    ]
+    try:
+        try:
+            for url in urls:
+                asyncio.run(wait_until_ready(url))
+            asyncio.run(wait_for(listeners_ready, 10.0))
+        except (RuntimeError, TimeoutError):
+            print("replicas did not start or did not listen:")
+            for url, server, output in zip(urls, servers, outputs):
+                output.seek(0)
+                print(f"--- {url} (exit code {server.poll()})")
+                print(output.read().decode(errors="replace"))
+            return 1
+        failures = asyncio.run(check(*urls, args.timeout))
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+        for output in outputs:
+            output.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Closed-loop load test of the task API in each DATABASE_MODE.
+
+    DATABASE_URL=postgresql://... python -m backend.benchmarks.load_test \
+        --modes sync async --concurrency 10 50 100 200
+
+For each mode an uvicorn process is started on --port, then every
+concurrency level runs for --duration seconds. The seeded table is
+truncated first: never point this at a real database.
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+import httpx
+
+from backend.app.database import engine
+
+from .common import auth_headers, percentile, seed_tasks, serve
+
+
+async def run_level(base_url: str, path: str, concurrency: int, duration: float) -> Dict:
+    """
+    Keep concurrency requests in flight on path for duration seconds.
+
+    Returns:
+        Throughput, latency percentiles (ms) and error count
+    """
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0, headers=auth_headers()) as client:
+        async def worker() -> None:
+            nonlocal errors
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 400:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50) * 1000,
+        "p95": percentile(latencies, 95) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--path", default="/get_task?limit=50")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    seed_tasks(engine, args.rows)
+
+    print(f"{'mode':>6} {'conc':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+    for mode in args.modes:
+        with serve(args.port, DATABASE_MODE=mode) as base_url:
+            for concurrency in args.concurrency:
+                r = asyncio.run(run_level(base_url, args.path, concurrency, args.duration))
+                print(f"{mode:>6} {concurrency:>5} {r['rps']:>8.0f} {r['p50']:>7.1f}ms {r['p95']:>7.1f}ms "
+                      f"{r['p99']:>7.1f}ms {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
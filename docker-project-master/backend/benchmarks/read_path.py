@@ -0,0 +1,54 @@
+"""
+Compare the two /get_task read paths on a seeded table.
+
+    DATABASE_URL=postgresql://... python -m backend.benchmarks.read_path [--sizes 1000 10000 100000]
+
+The seeded table is truncated first: never point this at a real database.
+"""
+import argparse
+import json
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+from backend.app import models, schemas, serializers
+from backend.app.database import SessionLocal, engine
+
+from .common import measure, median_ms, seed_tasks
+
+TASKS_ADAPTER = TypeAdapter(list[schemas.Task])
+
+
+def orm_path(db) -> bytes:
+    # Ce que fait FastAPI avec response_model=list[schemas.Task] :
+    # hydratation ORM, validation, sérialisation "json" puis json.dumps
+    tasks = db.scalars(select(models.Task).order_by(models.Task.id)).all()
+    validated = TASKS_ADAPTER.validate_python(tasks, from_attributes=True)
+    content = TASKS_ADAPTER.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def core_path(db) -> bytes:
+    rows = db.execute(select(*serializers.TASK_COLUMNS).order_by(models.Task.id))
+    return serializers.dump_tasks(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'orm (ms)':>10} {'core (ms)':>10} {'speedup':>8}")
+    for size in args.sizes:
+        seed_tasks(engine, size)
+        with SessionLocal() as db:
+            assert orm_path(db) == core_path(db), "core path output differs from schemas.Task"
+            orm = median_ms(measure(lambda: orm_path(db), args.repeat))
+            db.expunge_all()
+            core = median_ms(measure(lambda: core_path(db), args.repeat))
+        print(f"{size:>8} {orm:>10.1f} {core:>10.1f} {orm / core:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
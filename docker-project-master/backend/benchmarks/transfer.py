@@ -0,0 +1,106 @@
+"""
+Throughput and peak memory of /export and /import.
+
+    DATABASE_URL=postgresql://... python -m backend.benchmarks.transfer [--tasks 1000000] [--max-rss-mb 400]
+
+A uvicorn process is started on --port. The tasks are exported to a
+temporary file, then imported back, both streamed; the peak resident
+memory of the server (VmHWM, Linux only) is read at the end. Exits with
+status 1 if it went over --max-rss-mb, which should stay well under the
+512Mi pod limit. The tasks table is truncated first: never point this at
+a real database.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from backend.app.database import engine
+
+from .common import auth_headers, seed_tasks, wait_until_ready
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmHWM not available")
+
+
+async def export_to(client: httpx.AsyncClient, url: str, path: str) -> int:
+    size = 0
+    with open(path, "wb") as output:
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                output.write(chunk)
+                size += len(chunk)
+    return size
+
+
+async def import_from(client: httpx.AsyncClient, url: str, path: str, content_type: str) -> dict:
+    async def body():
+        with open(path, "rb") as source:
+            while chunk := source.read(64 * 1024):
+                yield chunk
+
+    response = await client.post(url, content=body(), headers={"Content-Type": content_type})
+    response.raise_for_status()
+    return response.json()
+
+
+async def run(base_url: str, tasks: int, pid: int) -> None:
+    async with httpx.AsyncClient(timeout=None, headers=auth_headers()) as client:
+        for file_format, content_type in (("ndjson", "application/x-ndjson"), ("csv", "text/csv")):
+            with tempfile.NamedTemporaryFile(suffix=f".{file_format}") as dump:
+                start = time.perf_counter()
+                size = await export_to(client, f"{base_url}/export?format={file_format}", dump.name)
+                elapsed = time.perf_counter() - start
+                print(f"export {file_format:<7} {tasks / elapsed:>10,.0f} tasks/s  {size / 2**20:>8.1f} MiB  "
+                      f"peak RSS {peak_rss_mb(pid):.0f} MiB")
+
+                start = time.perf_counter()
+                result = await import_from(client, f"{base_url}/import?format={file_format}", dump.name, content_type)
+                elapsed = time.perf_counter() - start
+                imported = result["data"]["imported"]
+                print(f"import {file_format:<7} {imported / elapsed:>10,.0f} tasks/s  "
+                      f"{result['meta']['failed']} rejected  peak RSS {peak_rss_mb(pid):.0f} MiB")
+            # L'import a doublé la table : on repart du même volume
+            seed_tasks(engine, tasks)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--max-rss-mb", type=float, default=400)
+    args = parser.parse_args()
+
+    seed_tasks(engine, args.tasks)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=os.environ,
+    )
+    try:
+        url = f"http://127.0.0.1:{args.port}"
+        asyncio.run(wait_until_ready(url))
+        asyncio.run(run(url, args.tasks, server.pid))
+        peak = peak_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+    if peak > args.max_rss_mb:
+        print(f"FAILED: peak RSS {peak:.0f} MiB > {args.max_rss_mb:.0f} MiB")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Payload size and encoding time of the /get_task representations.
+
+    DATABASE_URL=postgresql://... python -m backend.benchmarks.wire_format [--rows 10000]
+
+Encodes the same rows with each format and sparse fieldset, then
+compresses the result with the gzip level and brotli quality the API
+uses (GZIP_LEVEL, BROTLI_QUALITY). Times are medians over --repeat runs.
+
+The seeded table is truncated first: never point this at a real database.
+"""
+import argparse
+import gzip
+from typing import Callable, Dict
+
+import brotli
+import msgpack
+import orjson
+from sqlalchemy import select
+
+from backend.app import compression, models, schemas, serializers
+from backend.app.database import engine
+
+from .common import measure, median_ms, seed_tasks
+
+# Vue liste : tout sauf la description
+LIST_FIELDS = tuple(field for field in serializers.TASK_FIELDS if field != "description")
+
+VARIANTS = {
+    "json": (serializers.TASK_FIELDS, schemas.TaskFormat.JSON),
+    "json list fields": (LIST_FIELDS, schemas.TaskFormat.JSON),
+    "columnar": (serializers.TASK_FIELDS, schemas.TaskFormat.COLUMNAR),
+    "columnar list fields": (LIST_FIELDS, schemas.TaskFormat.COLUMNAR),
+    "msgpack": (serializers.TASK_FIELDS, schemas.TaskFormat.MSGPACK),
+    "msgpack list fields": (LIST_FIELDS, schemas.TaskFormat.MSGPACK),
+}
+
+CODECS: Dict[str, Callable[[bytes], bytes]] = {
+    "gzip": lambda body: gzip.compress(body, compression.GZIP_LEVEL),
+    "br": lambda body: brotli.compress(body, quality=compression.BROTLI_QUALITY),
+}
+
+
+def decoder(format: schemas.TaskFormat) -> Callable[[bytes], object]:
+    return msgpack.unpackb if format == schemas.TaskFormat.MSGPACK else orjson.loads
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    seed_tasks(engine, args.rows)
+    with engine.connect() as conn:
+        rows = conn.execute(select(*serializers.TASK_COLUMNS).order_by(models.Task.id)).all()
+
+    print(f"{args.rows} tasks, gzip level {compression.GZIP_LEVEL}, brotli quality {compression.BROTLI_QUALITY}")
+    print(f"{'variant':<22} {'KiB':>6} {'encode':>9} {'decode':>9} "
+          + " ".join(f"{codec + ' KiB':>9} {codec + ' ms':>8}" for codec in CODECS))
+    for name, (fields, format) in VARIANTS.items():
+        body = serializers.dump_tasks(rows, fields, format)
+        encode = median_ms(measure(lambda: serializers.dump_tasks(rows, fields, format), args.repeat))
+        decode = median_ms(measure(lambda: decoder(format)(body), args.repeat))
+        cells = []
+        for codec in CODECS.values():
+            compressed = median_ms(measure(lambda: codec(body), args.repeat))
+            cells.append(f"{len(codec(body)) / 1024:>9.0f} {compressed:>6.1f}ms")
+        print(f"{name:<22} {len(body) / 1024:>6.0f} {encode:>7.1f}ms {decode:>7.1f}ms " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
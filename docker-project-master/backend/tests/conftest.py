@@ -0,0 +1,124 @@
+"""
+Tests of the API, some against a throwaway PostgreSQL database.
+
+    TEST_DATABASE_URL=postgresql://... python -m pytest backend/tests
+
+Tests using the database are skipped without TEST_DATABASE_URL. They
+truncate the tables: never point it at a real database.
+"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator, List
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# Avant tout import de l'application : database.py, identity.py et logs.py
+# lisent leur configuration à l'import
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ.setdefault("AUTH_SECRET", "test-secret")
+os.environ.setdefault("LOG_FILE", "")
+
+# Propriétaire des tâches créées par le client des tests
+OWNER_ID = 1
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """Sync engine of the test database, migrated once per session."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from backend.app import database, migrations
+
+    migrations.migrate(database.engine)
+    return database.engine
+
+
+@pytest.fixture
+def empty_tables(engine):
+    """Empty task tables, and no response cached from a previous test."""
+    from backend.app import main
+
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE tasks, task_tombstones, task_change_horizons RESTART IDENTITY"))
+    main.invalidate_caches()
+    return engine
+
+
+@pytest.fixture
+def client(empty_tables):
+    """Client of the app, authenticated as OWNER_ID, with its lifespan running."""
+    from fastapi.testclient import TestClient
+
+    from backend.app import identity, main
+
+    with TestClient(main.app, headers=identity.auth_headers(OWNER_ID)) as client:
+        yield client
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def run_server(command: List[str], ready_url: str, timeout: float = 20, **popen) -> Iterator[None]:
+    """
+    Run a server process until the block exits.
+
+    Args:
+        command: Command line of the server
+        ready_url: URL answering, whatever the status, once the server is up
+        timeout: Seconds to wait for it
+        **popen: Other arguments of subprocess.Popen (env, cwd)
+    """
+    # Sortie du serveur, affichée s'il ne démarre pas ; groupe de processus
+    # à lui, arrêté en entier (next dev lance ses propres workers)
+    output = tempfile.TemporaryFile()
+    process = subprocess.Popen(command, stdout=output, stderr=subprocess.STDOUT, start_new_session=True, **popen)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                httpx.get(ready_url, timeout=timeout)
+                break
+            except httpx.TransportError:
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                output.seek(0)
+                pytest.fail(f"{command[0]} did not start:\n{output.read().decode(errors='replace')}")
+            time.sleep(0.05)
+        yield
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+        output.close()
+
+
+@contextmanager
+def app_server(**env: str) -> Iterator[str]:
+    """
+    Run another instance of the app, in a uvicorn process on the test database.
+
+    Args:
+        **env: Environment variables of the instance
+
+    Yields:
+        Its base URL
+    """
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    command = [sys.executable, "-m", "uvicorn", "backend.app.main:app", "--port", str(port), "--log-level", "warning"]
+    with run_server(command, f"{url}/health", env={**os.environ, "LOG_FILE": "", **env}):
+        yield url
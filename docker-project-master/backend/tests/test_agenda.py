@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+
+from backend.app import agenda, pagination
+from backend.app.schemas import AgendaBucket
+
+from .conftest import OWNER_ID
+
+PARIS = ZoneInfo("Europe/Paris")
+# 23h30 à Paris le vendredi 29 mars 2024 ; passage à l'heure d'été le 31
+NOW = datetime(2024, 3, 29, 22, 30, tzinfo=timezone.utc)
+BOUNDS = agenda.bucket_bounds(PARIS, NOW, 2)
+
+# Échéances en UTC sans fuseau, et leur période attendue
+DUE_DATES = [
+    ("2024-03-29T22:29:59", AgendaBucket.OVERDUE),
+    ("2024-03-29T22:30:00", AgendaBucket.TODAY),
+    ("2024-03-29T22:59:59", AgendaBucket.TODAY),
+    # Minuit à Paris : le jour suivant
+    ("2024-03-29T23:00:00", AgendaBucket.UPCOMING),
+    # Minuit le 31, encore en heure d'hiver
+    ("2024-03-30T23:00:00", AgendaBucket.UPCOMING),
+    # Juste avant minuit le 31, en heure d'été ; minuit est exclu
+    ("2024-03-31T21:59:59", AgendaBucket.UPCOMING),
+    ("2024-03-31T22:00:00", None),
+]
+
+
+def test_bucket_bounds_follow_local_midnights():
+    assert BOUNDS == {
+        AgendaBucket.OVERDUE: (None, datetime(2024, 3, 29, 22, 30)),
+        AgendaBucket.TODAY: (datetime(2024, 3, 29, 22, 30), datetime(2024, 3, 29, 23, 0)),
+        # Deux jours, dont un de 23 heures
+        AgendaBucket.UPCOMING: (datetime(2024, 3, 29, 23, 0), datetime(2024, 3, 31, 22, 0)),
+    }
+
+
+def seed(client, engine) -> dict:
+    expected = {bucket: [] for bucket in AgendaBucket}
+    for due, bucket in DUE_DATES:
+        task = client.post("/create_task", json={"title": due, "due_date": due, "priority": "high"}).json()
+        if bucket is not None:
+            expected[bucket].append(task["id"])
+    # Hors de l'agenda : terminée, archivée, sans échéance
+    for flag in ("completed", "archived"):
+        task = client.post("/create_task", json={"title": flag, "due_date": DUE_DATES[1][0]}).json()
+        with engine.begin() as conn:
+            conn.execute(text(f"UPDATE tasks SET {flag} = true WHERE id = :id"), {"id": task["id"]})
+    client.post("/create_task", json={"title": "no due date"})
+    return expected
+
+
+def test_counts_by_bucket(client, empty_tables):
+    seed(client, empty_tables)
+    with empty_tables.connect() as conn:
+        summary = agenda.counts_dict(conn.execute(agenda.counts_query(OWNER_ID, BOUNDS)).all())
+    assert {bucket: counts["total"] for bucket, counts in summary.items()} == {
+        "overdue": 1, "today": 2, "upcoming": 3,
+    }
+    assert summary["upcoming"]["by_priority"] == {"urgent": 0, "high": 3, "medium": 0, "low": 0}
+
+
+def test_tasks_by_bucket_in_due_date_order(client, empty_tables):
+    expected = seed(client, empty_tables)
+    for bucket, (start, end) in BOUNDS.items():
+        ids = []
+        cursor = None
+        while True:
+            # Une tâche par page : les bornes valent aussi pour les curseurs
+            with empty_tables.connect() as conn:
+                rows = conn.execute(agenda.tasks_query(OWNER_ID, start, end, None, cursor, 1)).all()
+            ids += [row.id for row in rows[:1]]
+            cursor = pagination.keyset_cursor(rows, agenda.KEYS, 1)
+            if not cursor:
+                break
+        assert ids == sorted(expected[bucket], key=lambda task_id: DUE_DATES[task_id - 1][0]), bucket
+
+
+def test_agenda_endpoints(client, empty_tables):
+    client.post("/create_task", json={"title": "late", "due_date": "2000-01-01T00:00:00", "priority": "urgent"})
+    client.post("/create_task", json={"title": "far", "due_date": "2999-01-01T00:00:00"})
+
+    summary = client.get("/agenda", params={"tz": "Europe/Paris", "days": 31}).json()
+    assert summary["overdue"]["by_priority"]["urgent"] == 1
+    # Au-delà de l'horizon : dans aucune période
+    assert sum(counts["total"] for counts in summary.values()) == 1
+
+    assert [task["title"] for task in client.get("/agenda/overdue").json()] == ["late"]
+    assert client.get("/agenda/upcoming").json() == []
+    assert client.get("/agenda/overdue", params={"priority": "low"}).json() == []
+    assert client.get("/agenda", params={"days": 32}).status_code == 422
+    assert client.get("/agenda", params={"tz": "Mars/Olympus"}).status_code == 400
@@ -0,0 +1,47 @@
+from backend.app.cache import ResponseCache, TTLCache
+
+
+def response_cache() -> ResponseCache:
+    return ResponseCache("test", ttl=60, max_bytes=1024)
+
+
+def test_invalidate_keeps_other_owners():
+    cache = response_cache()
+    cache.set((1, "page"), b"one", {}, cache.generation)
+    cache.set((2, "page"), b"two", {}, cache.generation)
+
+    cache.invalidate(1)
+    assert cache.get((1, "page")) is None
+    assert cache.get((2, "page")) == (b"two", {})
+    assert cache.size == 3
+
+    cache.invalidate()
+    assert cache.get((2, "page")) is None
+    assert cache.size == 0
+
+
+def test_response_read_before_write_not_stored():
+    cache = response_cache()
+    generation = cache.generation
+    cache.invalidate(2)
+    cache.set((1, "page"), b"one", {}, generation)
+    assert cache.get((1, "page")) == (b"one", {})
+
+    generation = cache.generation
+    cache.invalidate(1)
+    cache.set((1, "page"), b"stale", {}, generation)
+    assert cache.get((1, "page")) is None
+
+    generation = cache.generation
+    cache.invalidate()
+    cache.set((2, "page"), b"stale", {}, generation)
+    assert cache.get((2, "page")) is None
+
+
+def test_ttl_cache_clear_by_owner():
+    cache = TTLCache(ttl=60)
+    cache.set((1, "stats"), "one")
+    cache.set((2, "stats"), "two")
+    cache.clear(1)
+    assert cache.get((1, "stats")) is None
+    assert cache.get((2, "stats")) == "two"
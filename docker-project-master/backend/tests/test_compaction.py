@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from backend.app import compaction, identity
+
+from .conftest import OWNER_ID
+
+
+def test_archive_completed(client, engine):
+    for title in ("old done", "old todo", "new done"):
+        client.post("/create_task", json={"title": title})
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE tasks SET completed = title LIKE '%done'"))
+        conn.execute(
+            text("UPDATE tasks SET updated_at = :at WHERE title LIKE 'old%'"),
+            {"at": datetime.utcnow() - timedelta(days=40)},
+        )
+
+    assert compaction.archive_completed(engine, 30, batch_size=1, dry_run=True) == 1
+    assert compaction.archive_completed(engine, 30, batch_size=1) == 1
+    with engine.connect() as conn:
+        archived = conn.execute(text("SELECT title FROM tasks WHERE archived")).scalars().all()
+    assert archived == ["old done"]
+
+
+def test_pruned_tombstones_expire_older_cursors(client, engine):
+    other = identity.auth_headers(OWNER_ID + 1)
+    first, second = (client.post("/create_task", json={"title": title}).json() for title in ("a", "b"))
+    client.post("/create_task", json={"title": "theirs"}, headers=other)
+    before = client.get("/changes").json()["cursor"]
+    their_cursor = client.get("/changes", headers=other).json()["cursor"]
+
+    client.delete(f"/task/{first['id']}")
+    client.put(f"/task/{second['id']}", json={"starred": True})
+    after = client.get("/changes").json()["cursor"]
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE task_tombstones SET deleted_at = :at"), {"at": datetime.utcnow() - timedelta(days=40)})
+    assert compaction.prune_tombstones(engine, 30, batch_size=1) == 1
+
+    # La suppression de first est perdue pour ce curseur : resynchronisation
+    assert client.get("/changes", params={"since": before}).status_code == 410
+    resync = client.get("/changes").json()
+    assert [task["id"] for task in resync["tasks"]] == [second["id"]]
+    assert client.get("/changes", params={"since": after}).json()["deleted"] == []
+    # Les traces d'un autre utilisateur ne sont pas concernées
+    assert client.get("/changes", params={"since": their_cursor}, headers=other).status_code == 200
@@ -0,0 +1,115 @@
+import gzip
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from backend.app.compression import COMPRESSION_MIN_BYTES, CompressionMiddleware, negotiate
+
+BODY = b'{"title": "' + b"x" * COMPRESSION_MIN_BYTES + b'"}'
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("br;q=0, gzip;q=0.1", "gzip"),
+    ("br;q=0, gzip;q=0", None),
+    ("GZIP;Q=1", "gzip"),
+    ("*", "br"),
+    ("*;q=0.2, br;q=0", "gzip"),
+    ("gzip;q=abc, br;q=0", None),
+])
+def test_negotiate(header, expected):
+    assert negotiate(header) == expected
+
+
+async def json_page(request):
+    return Response(BODY, media_type="application/json", headers={"ETag": '"v1"'})
+
+
+async def small(request):
+    return Response(BODY[:COMPRESSION_MIN_BYTES - 1], media_type="application/json")
+
+
+async def events(request):
+    return Response(BODY, media_type="text/event-stream")
+
+
+async def encoded(request):
+    return Response(gzip.compress(BODY), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+
+async def not_modified(request):
+    return Response(status_code=304, headers={"ETag": '"v1"'})
+
+
+async def export(request):
+    async def lines():
+        for number in range(3):
+            yield b'{"line": %d}\n' % number
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@pytest.fixture
+def client():
+    app = Starlette(routes=[
+        Route("/json", json_page),
+        Route("/small", small),
+        Route("/events", events),
+        Route("/encoded", encoded),
+        Route("/not_modified", not_modified),
+        Route("/export", export),
+    ])
+    app.add_middleware(CompressionMiddleware)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("encoding", ["br", "gzip"])
+def test_compressed_with_weak_etag(client, encoding):
+    response = client.get("/json", headers={"Accept-Encoding": encoding})
+    assert response.headers["Content-Encoding"] == encoding
+    assert response.headers["Vary"] == "Accept-Encoding"
+    # Plus la même représentation octet par octet : ETag faible
+    assert response.headers["ETag"] == 'W/"v1"'
+    assert "Content-Length" not in response.headers
+    assert response.num_bytes_downloaded < len(BODY)
+    assert response.content == BODY
+
+
+def test_uncompressed_keeps_strong_etag(client):
+    response = client.get("/json", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["ETag"] == '"v1"'
+    assert response.content == BODY
+
+
+def test_small_body_not_compressed(client):
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.content == BODY[:COMPRESSION_MIN_BYTES - 1]
+
+
+@pytest.mark.parametrize("path", ["/events", "/not_modified"])
+def test_excluded_responses_untouched(client, path):
+    response = client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert "Vary" not in response.headers
+
+
+def test_already_encoded_not_compressed_twice(client):
+    response = client.get("/encoded", headers={"Accept-Encoding": "br, gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.content == BODY
+
+
+def test_stream_compressed_whatever_its_size(client):
+    # Taille inconnue au premier morceau : compressée même si petite
+    response = client.get("/export", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.text.splitlines() == ['{"line": 0}', '{"line": 1}', '{"line": 2}']
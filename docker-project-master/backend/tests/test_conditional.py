@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+
+from backend.app import conditional
+
+CHANGED_AT = datetime(2024, 1, 22, 15, 0, 0, 900000)
+HEADERS = conditional.list_validators(("page",), 3, CHANGED_AT)
+ETAG = HEADERS["ETag"]
+
+
+def test_last_modified_truncated_to_seconds():
+    assert HEADERS["Last-Modified"] == "Mon, 22 Jan 2024 15:00:00 GMT"
+
+
+@pytest.mark.parametrize("if_none_match,expected", [
+    (ETAG, True),
+    # Comparaison faible : réponse compressée (ETag faible) revalidée
+    (f"W/{ETAG}", True),
+    (f'"other", W/{ETAG}', True),
+    (f'"other",{ETAG} ', True),
+    ('"other", W/"another"', False),
+    ("*", True),
+    (" * ", True),
+    (ETAG.strip('"'), False),
+])
+def test_if_none_match(if_none_match, expected):
+    assert conditional.not_modified(if_none_match, None, HEADERS) is expected
+
+
+def test_if_none_match_takes_precedence():
+    # If-Modified-Since ignoré, même invalide ou plus récent
+    assert conditional.not_modified(ETAG, "not a date", HEADERS)
+    assert not conditional.not_modified('"other"', "Tue, 23 Jan 2024 00:00:00 GMT", HEADERS)
+
+
+@pytest.mark.parametrize("if_modified_since,expected", [
+    # Date renvoyée telle quelle : une écriture plus tard dans la même seconde
+    # aurait la même, la copie n'est pas sûrement à jour
+    ("Mon, 22 Jan 2024 15:00:00 GMT", False),
+    ("Mon, 22 Jan 2024 15:00:01 GMT", True),
+    ("Mon, 22 Jan 2024 16:00:00 +0100", False),
+    ("Mon, 22 Jan 2024 14:59:59 GMT", False),
+    ("Tue, 23 Jan 2024 00:00:00 GMT", True),
+    # Sans fuseau ou invalide : ignoré
+    ("Tue, 23 Jan 2024 00:00:00 -0000", False),
+    ("yesterday", False),
+    ("", False),
+])
+def test_if_modified_since(if_modified_since, expected):
+    assert conditional.not_modified(None, if_modified_since, HEADERS) is expected
+
+
+def test_if_modified_since_without_last_modified():
+    headers = conditional.list_validators(("page",), 0, None)
+    assert "Last-Modified" not in headers
+    assert not conditional.not_modified(None, "Tue, 23 Jan 2024 00:00:00 GMT", headers)
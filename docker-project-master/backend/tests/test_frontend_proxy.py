@@ -0,0 +1,64 @@
+"""
+End-to-end tests through the Next.js API routes, which forward the
+session cookie to the backend as a bearer token.
+
+Skipped unless the frontend dependencies are installed (npm ci in
+frontend/): a Next.js development server is started in front of a
+uvicorn instance of the app.
+"""
+import os
+
+import httpx
+import pytest
+
+from backend.app import identity
+
+from .conftest import OWNER_ID, app_server, free_port, run_server
+
+FRONTEND_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "frontend")
+NEXT = os.path.join(FRONTEND_DIR, "node_modules", ".bin", "next")
+
+
+@pytest.fixture
+def frontend(empty_tables):
+    """
+    Next.js server proxying to a backend where requests without a token
+    act as OWNER_ID (AUTH_DEV_OWNER_ID).
+
+    Yields:
+        Base URL of the frontend
+    """
+    if not os.path.exists(NEXT):
+        pytest.skip("frontend dependencies are not installed (npm ci in frontend/)")
+    with app_server(AUTH_DEV_OWNER_ID=str(OWNER_ID)) as backend_url:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        # Compilation des routes à la première requête : démarrage lent
+        with run_server(
+            [NEXT, "dev", "-H", "127.0.0.1", "-p", str(port)], url, timeout=180,
+            cwd=FRONTEND_DIR, env={**os.environ, "NEXT_PUBLIC_API_URL": backend_url, "NEXT_TELEMETRY_DISABLED": "1"},
+        ):
+            yield url
+
+
+def test_session_cookie_through_proxy(frontend, client):
+    client.post("/create_task", json={"title": "mine"})
+    client.post("/create_task", json={"title": "theirs"}, headers=identity.auth_headers(OWNER_ID + 1))
+
+    with httpx.Client(base_url=frontend, timeout=120) as browser:
+        # Sans cookie : l'utilisateur de développement
+        response = browser.get("/api/get_task")
+        assert response.status_code == 200
+        assert [task["title"] for task in response.json()] == ["mine"]
+
+        # Cookie de session : transmis au backend en Authorization
+        browser.cookies.set("session", identity.issue_token(OWNER_ID + 1))
+        assert [task["title"] for task in browser.get("/api/get_task").json()] == ["theirs"]
+        created = browser.post("/api/create_task", json={"title": "theirs too"})
+        assert created.status_code == 200
+        assert created.json()["title"] == "theirs too"
+        assert [task["title"] for task in browser.get("/api/get_task").json()] == ["theirs", "theirs too"]
+
+        # Jeton invalide : jamais remplacé par l'utilisateur de développement
+        browser.cookies.set("session", "not-a-token")
+        assert browser.get("/api/get_task").status_code == 401
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.testclient import TestClient
+
+from backend.app import identity
+from backend.app.main import app
+
+SECRET = "test-secret"
+NOW = 1_700_000_000
+
+
+def test_token_round_trip():
+    token = identity.issue_token(42, ttl=60, secret=SECRET, now=NOW)
+    assert identity.verify_token(token, secret=SECRET, now=NOW + 30) == 42
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "not-a-token",
+    "a.b.c",
+    # Signé avec une autre clé
+    identity.issue_token(42, ttl=60, secret="other-secret", now=NOW),
+    # Expiré depuis plus que AUTH_LEEWAY
+    identity.issue_token(42, ttl=60, secret=SECRET, now=NOW - 60 - identity.AUTH_LEEWAY - 1),
+])
+def test_rejected_tokens(token):
+    with pytest.raises(ValueError):
+        identity.verify_token(token, secret=SECRET, now=NOW)
+
+
+def test_unsigned_token_rejected():
+    token = identity.issue_token(42, ttl=60, secret=SECRET, now=NOW)
+    _, claims, _ = token.split(".")
+    # En-tête {"alg":"none"}, sans signature
+    with pytest.raises(ValueError):
+        identity.verify_token(f"eyJhbGciOiJub25lIn0.{claims}.", secret=SECRET, now=NOW)
+
+
+def test_no_secret_rejects_everything():
+    token = identity.issue_token(42, ttl=60, secret=SECRET, now=NOW)
+    with pytest.raises(ValueError):
+        identity.verify_token(token, secret="", now=NOW)
+
+
+@pytest.mark.parametrize("headers", [
+    {},
+    # L'ancien en-tête d'identité n'est plus lu
+    {"X-User-Id": "1"},
+    {"Authorization": "Bearer not-a-token"},
+    {"Authorization": f"Basic {identity.issue_token(1)}"},
+])
+def test_requests_without_valid_token_are_unauthorized(headers):
+    # Sans lifespan ni base : la dépendance refuse la requête avant d'ouvrir une session
+    client = TestClient(app)
+    for path in ("/get_task", "/changes", "/stats", "/export"):
+        response = client.get(path, headers=headers)
+        assert response.status_code == 401, path
+        assert response.headers["www-authenticate"].startswith("Bearer")
+
+
+def owner_of(headers: dict) -> int:
+    request = Request({"type": "http", "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]})
+    return asyncio.run(identity.current_owner(request))
+
+
+def test_dev_owner_only_without_authorization(monkeypatch):
+    # Désactivé par défaut
+    assert identity.AUTH_DEV_OWNER_ID is None
+    with pytest.raises(HTTPException):
+        owner_of({})
+
+    monkeypatch.setattr(identity, "AUTH_DEV_OWNER_ID", 7)
+    assert owner_of({}) == 7
+    assert owner_of(identity.auth_headers(42)) == 42
+    # Un jeton invalide n'est jamais remplacé par l'utilisateur de développement
+    for headers in ({"Authorization": "Bearer not-a-token"}, {"Authorization": "Basic abc"}):
+        with pytest.raises(HTTPException) as error:
+            owner_of(headers)
+        assert error.value.status_code == 401
+
+
+@pytest.mark.parametrize("secret", ["change-me-to-a-random-secret", "CHANGE-ME", " changeme"])
+def test_placeholder_secret_refused(secret, monkeypatch):
+    with pytest.raises(RuntimeError):
+        identity.check_secret(secret)
+    identity.check_secret("3f1c0e9a7b")
+
+    # L'API ne démarre pas
+    monkeypatch.setattr(identity, "AUTH_SECRET", secret)
+    with pytest.raises(RuntimeError):
+        with TestClient(app):
+            pass
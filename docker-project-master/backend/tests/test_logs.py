@@ -0,0 +1,52 @@
+import logging
+import time
+
+from backend.app import logs
+
+
+def record(message: str) -> logging.LogRecord:
+    return logging.makeLogRecord({"msg": message, "levelno": logging.INFO, "levelname": "INFO"})
+
+
+def test_workers_share_file_rotated_by_supervisor(tmp_path, monkeypatch):
+    log_file = tmp_path / "logs" / "backend.log"
+    monkeypatch.setattr(logs, "LOG_FILE", str(log_file))
+    monkeypatch.setattr(logs, "LOG_ROTATE_WHEN", "")
+    monkeypatch.setattr(logs, "LOG_ROTATE_MB", 100 / (1024 * 1024))
+    monkeypatch.delenv(logs.SHARED_FILE_ENV, raising=False)
+
+    rotator = logs.share_log_file()
+    # Deux workers, deux gestionnaires sur le même fichier
+    workers = [logs._output_handler() for _ in range(2)]
+    try:
+        assert all(isinstance(handler, logging.handlers.WatchedFileHandler) for handler in workers)
+        workers[0].emit(record("a" * 60))
+        workers[1].emit(record("b" * 60))
+
+        deadline = time.monotonic() + 5
+        while not (tmp_path / "logs" / "backend.log.1").exists():
+            assert time.monotonic() < deadline, "log file not rotated"
+            time.sleep(0.05)
+        # Chacun rouvre le nouveau fichier, rien n'est écrasé
+        workers[0].emit(record("c"))
+        workers[1].emit(record("d"))
+    finally:
+        rotator.stop()
+        for handler in workers:
+            handler.close()
+
+    assert (tmp_path / "logs" / "backend.log.1").read_text().split() == ["a" * 60, "b" * 60]
+    assert log_file.read_text().split() == ["c", "d"]
+
+
+def test_single_process_rotates_itself(tmp_path, monkeypatch):
+    monkeypatch.setattr(logs, "LOG_FILE", str(tmp_path / "backend.log"))
+    monkeypatch.setattr(logs, "LOG_ROTATE_WHEN", "")
+    monkeypatch.delenv(logs.SHARED_FILE_ENV, raising=False)
+    handler = logs._output_handler()
+    assert isinstance(handler, logging.handlers.RotatingFileHandler)
+    handler.close()
+
+    monkeypatch.setattr(logs, "LOG_FILE", "")
+    assert logs.share_log_file() is None
+    assert type(logs._output_handler()) is logging.StreamHandler
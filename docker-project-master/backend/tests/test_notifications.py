@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from backend.app import events, main, notifications
+
+from .conftest import OWNER_ID, TEST_DATABASE_URL, app_server
+
+
+def send(engine, payload: str) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                     {"channel": notifications.CHANNEL, "payload": payload})
+
+
+def drop_listeners(engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(
+            "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+            "WHERE application_name = 'task-change-listener'"
+        ))
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition still false"
+        await asyncio.sleep(0.01)
+
+
+def test_listener_delivers_and_reconnects(engine):
+    changes = []
+    reconnects = []
+
+    async def run():
+        listener = notifications.ChangeListener(
+            notifications.listen_dsn(TEST_DATABASE_URL),
+            on_change=changes.append,
+            on_reconnect=lambda: reconnects.append(time.monotonic()),
+        )
+        listener.start()
+        try:
+            await asyncio.wait_for(listener.connected.wait(), 5)
+            assert len(reconnects) == 1
+
+            send(engine, notifications.notify_payload("update", "tasks", 7, OWNER_ID))
+            await wait_for(lambda: len(changes) == 1)
+            assert changes[0]["id"] == 7
+            assert changes[0]["owner"] == OWNER_ID
+
+            # Connexion coupée : on_reconnect signale les notifications perdues
+            drop_listeners(engine)
+            await wait_for(lambda: len(reconnects) == 2)
+            send(engine, notifications.notify_payload("delete", "tasks", 8, OWNER_ID))
+            await wait_for(lambda: len(changes) == 2)
+            assert changes[1]["op"] == "delete"
+        finally:
+            await listener.stop()
+
+    asyncio.run(run())
+
+
+@pytest.fixture
+def replica(empty_tables):
+    """Second instance of the app, on the same database."""
+    # Un TTL long : seule l'invalidation peut rendre une page à jour
+    with app_server(TASK_CACHE_TTL="3600") as url:
+        yield url
+
+
+def listener_count(engine) -> int:
+    with engine.connect() as conn:
+        return conn.scalar(text(
+            "SELECT count(*) FROM pg_stat_activity WHERE application_name = 'task-change-listener'"
+        ))
+
+
+def eventually(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition still false"
+        time.sleep(0.01)
+
+
+def test_write_on_one_replica_invalidates_the_other(client, replica, engine, monkeypatch):
+    monkeypatch.setattr(main.task_cache, "ttl", 3600)
+    with httpx.Client(base_url=replica, headers=dict(client.headers), timeout=10) as other:
+        # Les deux instances écoutent
+        eventually(lambda: main.app.state.change_listener.connected.is_set() and listener_count(engine) >= 2, 20)
+
+        def titles(instance) -> list:
+            return [task["title"] for task in instance.get("/get_task").json()]
+
+        task = client.post("/create_task", json={"title": "v0"}).json()
+        eventually(lambda: titles(other) == ["v0"])
+        assert titles(client) == ["v0"]
+
+        # Écriture sur l'autre instance : la page en cache ici est invalidée
+        other.put(f"/task/{task['id']}", json={"title": "v1"})
+        eventually(lambda: titles(client) == ["v1"])
+
+        # Et dans l'autre sens
+        assert titles(other) == ["v1"]
+        client.put(f"/task/{task['id']}", json={"title": "v2"})
+        eventually(lambda: titles(other) == ["v2"])
+
+
+def test_lifespan_closes_broadcaster(engine):
+    with TestClient(main.app):
+        subscriber = main.broadcaster.subscribe(OWNER_ID)
+        assert subscriber is not None
+    assert main.broadcaster.closed
+    # Le flux ouvert reçoit la fin de diffusion
+    assert subscriber.queue.get_nowait() is events.CLOSE
+    main.broadcaster.unsubscribe(subscriber)
+    assert main.broadcaster.subscribe(OWNER_ID) is None
+
+    # Nouveau démarrage dans le même processus
+    with TestClient(main.app):
+        assert not main.broadcaster.closed
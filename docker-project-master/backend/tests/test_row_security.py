@@ -0,0 +1,86 @@
+"""
+Row level security as seen by the API's role (identity.API_ROLE), which
+neither owns the tables nor is a superuser, unlike the role of the tests.
+"""
+import httpx
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import ProgrammingError
+
+from backend.app import identity
+
+from .conftest import OWNER_ID, TEST_DATABASE_URL, app_server
+
+OTHER_OWNER_ID = OWNER_ID + 1
+
+
+@pytest.fixture
+def tasks(client):
+    """One task of OWNER_ID and one of OTHER_OWNER_ID."""
+    client.post("/create_task", json={"title": "mine"})
+    client.post("/create_task", json={"title": "theirs"}, headers=identity.auth_headers(OTHER_OWNER_ID))
+
+
+@pytest.fixture
+def as_api(engine):
+    """Connection acting as API_ROLE inside a transaction rolled back at the end."""
+    with engine.connect() as conn:
+        with conn.begin() as transaction:
+            conn.execute(text(f"SET LOCAL ROLE {identity.API_ROLE}"))
+            yield conn
+            transaction.rollback()
+
+
+def titles(conn, where: str = "true") -> list:
+    return list(conn.scalars(text(f"SELECT title FROM tasks WHERE {where} ORDER BY id")))
+
+
+def test_other_owner_rows_invisible(tasks, as_api):
+    as_api.execute(identity.owner_statement(OTHER_OWNER_ID))
+    # Filtre explicite sur l'autre propriétaire : seules les politiques jouent
+    assert titles(as_api, f"owner_id = {OWNER_ID}") == []
+    assert titles(as_api) == ["theirs"]
+    assert as_api.execute(text(f"UPDATE tasks SET title = 'taken' WHERE owner_id = {OWNER_ID}")).rowcount == 0
+    assert as_api.execute(text(f"DELETE FROM tasks WHERE owner_id = {OWNER_ID}")).rowcount == 0
+
+
+def test_no_owner_set_sees_nothing(tasks, as_api):
+    assert titles(as_api) == []
+
+
+def test_insert_for_other_owner_refused(tasks, as_api):
+    as_api.execute(identity.owner_statement(OTHER_OWNER_ID))
+    with pytest.raises(ProgrammingError, match="row-level security"):
+        as_api.execute(text(f"INSERT INTO tasks (owner_id, title) VALUES ({OWNER_ID}, 'planted')"))
+
+
+def test_no_privilege_on_schema(engine, as_api):
+    with pytest.raises(ProgrammingError, match="permission denied"):
+        as_api.execute(text("SELECT version FROM schema_migrations"))
+
+
+@pytest.fixture
+def api_url(engine):
+    """Base URL of an instance of the app connected as API_ROLE."""
+    with engine.begin() as conn:
+        identity.set_api_password(conn, "test-api-password")
+    url = make_url(TEST_DATABASE_URL).set(username=identity.API_ROLE, password="test-api-password")
+    with app_server(DATABASE_URL=url.render_as_string(hide_password=False), DB_ROW_SECURITY="true") as url:
+        yield url
+
+
+def test_api_connected_as_api_role(tasks, api_url):
+    # Écritures, triggers (traces, versions) et import par la table de
+    # transit, tous soumis aux politiques
+    with httpx.Client(base_url=api_url, headers=identity.auth_headers(OTHER_OWNER_ID)) as api:
+        assert [task["title"] for task in api.get("/get_task").json()] == ["theirs"]
+        created = api.post("/create_task", json={"title": "new"}).json()
+        assert api.delete(f"/task/{created['id']}").status_code == 200
+        imported = api.post("/import", content=b'{"title": "imported"}\n', headers={"Content-Type": "application/x-ndjson"})
+        assert imported.json()["meta"]["succeeded"] == 1
+
+        assert [task["title"] for task in api.get("/get_task").json()] == ["theirs", "imported"]
+        feed = api.get("/changes").json()
+        assert created["id"] in feed["deleted"]
+        assert api.get("/stats").json()["active"] == 2
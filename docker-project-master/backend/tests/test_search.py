@@ -0,0 +1,73 @@
+from backend.app import identity
+
+from .conftest import OWNER_ID
+
+
+def titles(response) -> list:
+    assert response.status_code == 200
+    return [task["title"] for task in response.json()]
+
+
+def create(client, *tasks) -> None:
+    for title, description in tasks:
+        assert client.post("/create_task", json={"title": title, "description": description}).status_code == 200
+
+
+def test_search_ranks_matches(client):
+    create(
+        client,
+        ("Deploy once", None),
+        ("Deploy deploy", "deploy the app"),
+        ("Unrelated", "nothing to see"),
+        ("Write docs", "before the deployment"),
+    )
+    client.post("/create_task", json={"title": "Deploy deploy deploy"}, headers=identity.auth_headers(OWNER_ID + 1))
+
+    # Préfixes, insensible à la casse, tâches du propriétaire seulement, les
+    # plus pertinentes d'abord ; à rang égal, la plus récente (id décroissant)
+    assert titles(client.get("/get_task", params={"q": "DEPLOY"})) == ["Deploy deploy", "Write docs", "Deploy once"]
+    # Un tri explicite remplace la pertinence
+    assert titles(client.get("/get_task", params={"q": "deploy", "sort": "created"})) == [
+        "Write docs", "Deploy deploy", "Deploy once",
+    ]
+
+
+def test_search_requires_every_word(client):
+    create(client, ("Refactor UI", "mobile app"), ("Refactor API", None), ("Mobile release", None))
+    assert titles(client.get("/get_task", params={"q": "refac mobile"})) == ["Refactor UI"]
+    # Mots seulement : la syntaxe de tsquery est ignorée
+    assert titles(client.get("/get_task", params={"q": "refac & !mobile |"})) == ["Refactor UI"]
+    assert titles(client.get("/get_task", params={"q": "&!"})) == ["Refactor UI", "Refactor API", "Mobile release"]
+
+
+def test_relevance_requires_query(client):
+    assert client.get("/get_task", params={"sort": "relevance"}).status_code == 400
+
+
+def test_relevance_cursor_pages_ties(client):
+    # Rangs égaux deux à deux : départagés par id décroissant
+    create(
+        client,
+        ("plan", None), ("plan", None),
+        ("plan plan", None), ("plan plan", None),
+        ("plan plan plan", None),
+        ("other", None),
+    )
+    expected = client.get("/get_task", params={"q": "plan"}).json()
+    assert [(task["title"], task["id"]) for task in expected] == [
+        ("plan plan plan", 5), ("plan plan", 4), ("plan plan", 3), ("plan", 2), ("plan", 1),
+    ]
+
+    pages = []
+    cursor = None
+    while True:
+        params = {"q": "plan", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/get_task", params=params)
+        assert response.status_code == 200
+        pages.append([task["id"] for task in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert pages == [[5, 4], [3, 2], [1]]
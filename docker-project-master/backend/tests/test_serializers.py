@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import msgpack
+import orjson
+import pytest
+
+from backend.app import schemas, serializers
+
+CREATED_AT = datetime(2024, 1, 22, 15, 0, 0, 123456)
+
+
+def row(task_id: int, title: str, tags=None) -> tuple:
+    values = {
+        "title": title, "description": None, "priority": "high", "tags": tags,
+        "due_date": None, "estimated_time": 30, "starred": False, "archived": False,
+        "id": task_id, "created_at": CREATED_AT, "updated_at": CREATED_AT, "completed": False,
+    }
+    # Colonne supplémentaire (rang de recherche...) ignorée
+    return (*(values[field] for field in serializers.TASK_FIELDS), 0.5)
+
+
+ROWS = [row(1, "a", ["UI", "Mobile"]), row(2, "b", [])]
+
+
+def test_parse_fields_order_and_repetitions():
+    assert serializers.parse_fields(None) == serializers.TASK_FIELDS
+    assert serializers.parse_fields(" , ") == serializers.TASK_FIELDS
+    assert serializers.parse_fields("due_date, id,title,id") == ("title", "due_date", "id")
+
+
+def test_parse_fields_rejects_unknown():
+    with pytest.raises(ValueError, match="Unknown fields: owner_id, secret"):
+        serializers.parse_fields("id,secret,owner_id")
+
+
+def test_dump_tasks_matches_schema():
+    expected = [
+        schemas.Task.model_validate(dict(zip(serializers.TASK_FIELDS, values))).model_dump(mode="json")
+        for values in ROWS
+    ]
+    assert orjson.loads(serializers.dump_tasks(ROWS)) == expected
+    assert expected[0]["tags"] == ["ui", "mobile"]
+    # NULL en base : liste vide
+    assert serializers.task_dict(row(3, "c"))["tags"] == []
+
+
+def test_dump_tasks_sparse_fields():
+    body = serializers.dump_tasks(ROWS, serializers.parse_fields("id,title"))
+    assert orjson.loads(body) == [{"title": "a", "id": 1}, {"title": "b", "id": 2}]
+
+
+def test_dump_tasks_columnar():
+    body = serializers.dump_tasks(ROWS, ("title", "tags", "id"), schemas.TaskFormat.COLUMNAR)
+    assert orjson.loads(body) == {"title": ["a", "b"], "tags": [["ui", "mobile"], []], "id": [1, 2]}
+    assert orjson.loads(serializers.dump_tasks([], ("id",), schemas.TaskFormat.COLUMNAR)) == {"id": []}
+
+
+def test_dump_tasks_msgpack():
+    body = serializers.dump_tasks(ROWS, serializers.parse_fields("id,created_at,tags"), schemas.TaskFormat.MSGPACK)
+    # Dates en ISO 8601, comme en JSON
+    assert msgpack.unpackb(body) == [
+        {"tags": ["ui", "mobile"], "id": 1, "created_at": "2024-01-22T15:00:00.123456"},
+        {"tags": [], "id": 2, "created_at": "2024-01-22T15:00:00.123456"},
+    ]
+    full = msgpack.unpackb(serializers.dump_tasks(ROWS, format=schemas.TaskFormat.MSGPACK))
+    assert full == orjson.loads(serializers.dump_tasks(ROWS))
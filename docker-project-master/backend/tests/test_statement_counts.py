@@ -0,0 +1,70 @@
+"""
+SQL statements sent by each endpoint, read from the query metrics of
+database.observe_queries.
+
+Transaction control (BEGIN, COMMIT, ROLLBACK) is not counted. With
+DB_ROW_SECURITY, every budget allows the statement setting the owner of
+the transaction.
+"""
+import pytest
+
+from backend.app import database, identity, main, metrics, pagination
+
+# (méthode, chemin, corps) : au plus une requête SQL chacun
+ENDPOINTS = [
+    ("POST", "/create_task", {"title": "count me"}),
+    ("GET", "/get_task", None),
+    ("GET", "/task/1", None),
+    ("GET", "/changes", None),
+    # Avec la ligne marqueur des traces purgées
+    ("GET", f"/changes?since={pagination.encode_cursor([1, 1])}", None),
+    ("PUT", "/task/1", {"completed": True}),
+    ("PUT", "/task/999999", {"completed": True}),
+    ("DELETE", "/task/1", None),
+    ("DELETE", "/task/999999", None),
+    ("POST", "/bulk/create_task", [{"title": "a"}, {"title": "b"}]),
+    ("PUT", "/bulk/update_task", {"ids": [2, 3], "changes": {"starred": True}}),
+    ("POST", "/bulk/delete_task", {"ids": [2, 3]}),
+    ("GET", "/stats?tz=Europe/Paris", None),
+    ("GET", "/agenda?tz=Europe/Paris", None),
+    ("GET", "/agenda/upcoming?priority=high", None),
+]
+
+
+def executed_statements() -> float:
+    label = "async" if database.async_engine is not None else "sync"
+    return sum(
+        sample.value
+        for family in metrics.DB_QUERIES.collect()
+        for sample in family.samples
+        if sample.name.endswith("_total") and sample.labels["engine"] == label
+    )
+
+
+@pytest.mark.parametrize("method,path,body", ENDPOINTS, ids=[f"{m} {p}" for m, p, _ in ENDPOINTS])
+def test_single_statement(client, method, path, body):
+    client.post("/bulk/create_task", json=[{"title": "one"}, {"title": "two"}, {"title": "three"}])
+    # set_config du propriétaire en tête de chaque transaction
+    budget = 1 + (1 if identity.DB_ROW_SECURITY else 0)
+
+    before = executed_statements()
+    response = client.request(method, path, json=body)
+    assert response.status_code < 500
+    assert executed_statements() - before <= budget
+
+
+def test_empty_update_skips_commit_and_invalidation(client):
+    task = client.post("/create_task", json={"title": "unchanged"}).json()
+    client.get("/get_task")
+    generation = main.task_cache.generation
+    budget = 1 + (1 if identity.DB_ROW_SECURITY else 0)
+
+    before = executed_statements()
+    response = client.put(f"/task/{task['id']}", json={})
+    assert response.status_code == 200
+    assert response.json() == task
+    assert executed_statements() - before <= budget
+    # La page en cache du propriétaire est toujours valide
+    assert main.task_cache.generation == generation
+
+    assert client.put("/task/999999", json={}).status_code == 404
@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+
+from backend.app import identity, stats
+
+from .conftest import OWNER_ID
+
+PARIS = ZoneInfo("Europe/Paris")
+
+
+def create(client, title: str, **fields) -> int:
+    response = client.post("/create_task", json={"title": title, **fields})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def set_flags(engine, ids, **flags) -> None:
+    with engine.begin() as conn:
+        for name, value in flags.items():
+            conn.execute(text(f"UPDATE tasks SET {name} = :value WHERE id = ANY(:ids)"), {"value": value, "ids": list(ids)})
+
+
+def test_today_bounds_follow_time_zone():
+    # 23h30 à Paris le 30 mars : le jour local va de 23h à 22h UTC (passage à l'heure d'été)
+    now = datetime(2024, 3, 30, 23, 30, tzinfo=timezone.utc)
+    assert stats.today_bounds(PARIS, now) == (datetime(2024, 3, 30, 23, 0), datetime(2024, 3, 31, 22, 0))
+    assert stats.today_bounds(ZoneInfo("UTC"), now) == (datetime(2024, 3, 30), datetime(2024, 3, 31))
+
+
+def test_stats_counts(client, empty_tables):
+    create(client, "overdue", priority="high", tags=["Work"], due_date="2000-01-01T00:00:00")
+    create(client, "later", priority="high", tags=["work", "home"], due_date="2999-01-01T00:00:00")
+    create(client, "someday", priority="low")
+    done = create(client, "done", priority="urgent", tags=["work"], due_date="2000-01-01T00:00:00")
+    archived = create(client, "archived", priority="low", tags=["old"])
+    set_flags(empty_tables, [done], completed=True)
+    set_flags(empty_tables, [archived], archived=True)
+    client.post("/create_task", json={"title": "theirs", "tags": ["work"]}, headers=identity.auth_headers(OWNER_ID + 1))
+
+    response = client.get("/stats")
+    assert response.status_code == 200
+    # Les tâches terminées ne sont ni en retard ni comptées par priorité ou tag
+    assert response.json() == {
+        "active": 3,
+        "completed": 1,
+        "due_today": 0,
+        "overdue": 1,
+        "by_priority": {"urgent": 0, "high": 2, "medium": 0, "low": 1},
+        "by_tag": {"work": 2, "home": 1},
+    }
+
+    assert client.get("/stats", params={"archived": True}).json() == {
+        "active": 1,
+        "completed": 0,
+        "due_today": 0,
+        "overdue": 0,
+        "by_priority": {"urgent": 0, "high": 0, "medium": 0, "low": 1},
+        "by_tag": {"old": 1},
+    }
+
+    # Le cache est vidé par les écritures du propriétaire
+    create(client, "new", tags=["home"])
+    assert client.get("/stats").json()["by_tag"] == {"work": 2, "home": 2}
+
+
+def test_stats_due_today_bounds(client, empty_tables):
+    # Aujourd'hui à Paris, le 30 mars 2024 : de 23h UTC la veille à 23h UTC
+    now = datetime(2024, 3, 30, 12, 0)
+    for due in ("2024-03-29T22:59:59", "2024-03-29T23:00:00", "2024-03-30T11:59:59",
+                "2024-03-30T22:59:59", "2024-03-30T23:00:00"):
+        create(client, due, due_date=due)
+    start, end = stats.today_bounds(PARIS, now.replace(tzinfo=timezone.utc))
+
+    with empty_tables.connect() as conn:
+        row = conn.execute(stats.stats_query(OWNER_ID, False, now, start, end)).one()
+    result = stats.stats_dict(row)
+    # Minuit local compris, minuit suivant exclu ; en retard : avant maintenant
+    assert result["due_today"] == 3
+    assert result["overdue"] == 3
+    assert result["active"] == 5
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+from backend.app import identity, main, pagination
+from backend.app.schemas import TaskSort
+
+from .conftest import OWNER_ID
+
+AWARE_DUE_DATE = "2024-01-22T17:00:00.123456+02:00"
+UTC_DUE_DATE = "2024-01-22T15:00:00.123456"
+
+
+def test_aware_due_date_stored_as_utc(client):
+    response = client.post("/create_task", json={"title": "Rendu", "due_date": AWARE_DUE_DATE})
+    assert response.status_code == 200
+    task = response.json()
+    assert task["due_date"] == UTC_DUE_DATE
+
+    response = client.put(f"/task/{task['id']}", json={"due_date": "2024-01-23T09:30:00Z"})
+    assert response.status_code == 200
+    assert response.json()["due_date"] == "2024-01-23T09:30:00"
+
+
+def test_aware_cursor_decoded_as_utc():
+    _, keys = pagination.sort_keys(TaskSort.DUE_DATE)
+    cursor = pagination.encode_cursor([datetime.fromisoformat(AWARE_DUE_DATE), 7])
+    assert pagination.decode_cursor(cursor, keys) == [datetime.fromisoformat(UTC_DUE_DATE), 7]
+
+
+def test_aware_cursor_pages_tasks(client):
+    for day in (21, 22, 23):
+        client.post("/create_task", json={"title": f"Tâche {day}", "due_date": f"2024-01-{day}T12:00:00"})
+
+    cursor = pagination.encode_cursor([datetime.fromisoformat("2024-01-22T14:00:00+02:00"), 2])
+    response = client.get("/get_task", params={"sort": "due_date", "cursor": cursor})
+    assert response.status_code == 200
+    assert [task["title"] for task in response.json()] == ["Tâche 23"]
+
+
+def test_list_etag_changes_only_with_own_writes(client):
+    other = identity.auth_headers(OWNER_ID + 1)
+    client.post("/create_task", json={"title": "mine"})
+    etag = client.get("/get_task").headers["ETag"]
+
+    # Écriture d'un autre utilisateur : ni le cache ni la version de OWNER_ID ne changent
+    client.post("/create_task", json={"title": "theirs"}, headers=other)
+    assert client.get("/get_task", headers={"If-None-Match": etag}).status_code == 304
+    main.invalidate_caches()
+    assert client.get("/get_task", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/create_task", json={"title": "mine too"})
+    response = client.get("/get_task", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [task["title"] for task in response.json()] == ["mine", "mine too"]
+
+
+def test_if_modified_since_after_write_in_same_second(client):
+    client.post("/create_task", json={"title": "first"})
+    last_modified = client.get("/get_task").headers["Last-Modified"]
+
+    # Deuxième écriture, le plus souvent dans la même seconde
+    client.post("/create_task", json={"title": "second"})
+    response = client.get("/get_task", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 200
+    assert [task["title"] for task in response.json()] == ["first", "second"]
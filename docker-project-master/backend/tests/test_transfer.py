@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime
+
+from backend.app import schemas, transfer
+
+NOW = datetime(2024, 1, 22, 15, 0, 0, 123456)
+
+
+async def stream(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def lines(chunks):
+    async def collect():
+        return [line async for line in transfer._lines(stream(chunks))]
+    return asyncio.run(collect())
+
+
+def csv_items(chunks):
+    report = transfer.ImportReport()
+
+    async def collect():
+        return [item async for item in transfer._csv_items(transfer._lines(stream(chunks)), report)]
+    return asyncio.run(collect()), report
+
+
+def test_lines_split_across_chunks():
+    assert lines([b"ab", b"c\nde", b"f\n", b"", b"g"]) == [(1, b"abc"), (2, b"def"), (3, b"g")]
+    assert lines([b"a\n\n", b"b\n"]) == [(1, b"a"), (2, b""), (3, b"b")]
+
+
+def test_lines_strip_crlf():
+    # \r et \n dans deux morceaux différents
+    assert lines([b"a\r\nb\r", b"\nc\r\n"]) == [(1, b"a"), (2, b"b"), (3, b"c")]
+
+
+def test_too_long_lines_dropped(monkeypatch):
+    monkeypatch.setattr(transfer, "IMPORT_MAX_RECORD_BYTES", 8)
+    # Dans un seul morceau, réparti sur plusieurs, puis sans fin de ligne
+    assert lines([b"0123456789\nok\n"]) == [(1, None), (2, b"ok")]
+    assert lines([b"01234", b"56789", b"0\nok"]) == [(1, None), (2, b"ok")]
+    assert lines([b"ok\n", b"0123456789"]) == [(1, b"ok"), (2, None)]
+    assert lines([b"12345678\n"]) == [(1, b"12345678")]
+
+
+def test_csv_quoted_field_spans_lines():
+    items, report = csv_items([
+        b'title,description,tags\r\n',
+        b'"Rendu","ligne 1\r\nligne ',
+        # "é" coupé entre deux morceaux
+        b'2 ""cit\xc3',
+        b'\xa9e""",\r\n',
+        b'Suivante,,"[""a""]"\n',
+    ])
+    assert items == [
+        (2, {"title": "Rendu", "description": 'ligne 1\nligne 2 "citée"'}),
+        (4, {"title": "Suivante", "tags": ["a"]}),
+    ]
+    assert report.failed == 0
+
+
+def test_csv_unterminated_quote():
+    items, report = csv_items([b'title,description\n', b'ok,\n', b'"open,desc\n', b'more\n'])
+    assert items == [(2, {"title": "ok"})]
+    assert report.failed == 1
+    assert report.errors[0].error_code == "invalid_csv"
+    assert report.errors[0].error_details == {"line": 3}
+
+
+def test_csv_rejects_column_count_and_long_record(monkeypatch):
+    monkeypatch.setattr(transfer, "IMPORT_MAX_RECORD_BYTES", 16)
+    items, report = csv_items([b'title,priority\n', b'a,low,extra\n', b'"very long\nquoted title",low\n', b'b,high\n'])
+    assert items == [(5, {"title": "b", "priority": "high"})]
+    assert [(error.error_code, error.error_details["line"]) for error in report.errors] == [
+        ("invalid_csv", 2), ("line_too_long", 3),
+    ]
+
+
+def test_copy_line_escapes_text():
+    task = schemas.TaskImport(
+        title="a\\b\tc",
+        description="x\ny\rz",
+        tags=['q"t', "b\\s", "t\tab"],
+        completed=True,
+    )
+    line = transfer.copy_line(task, NOW, 7)
+    assert line.endswith("\n") and line.count("\n") == 1
+    columns = line[:-1].split("\t")
+    assert dict(zip(transfer.IMPORT_COLUMNS, columns)) == {
+        "owner_id": "7",
+        "title": "a\\\\b\\tc",
+        "description": "x\\ny\\rz",
+        "priority": "medium",
+        # Échappement du littéral de tableau, puis du format texte de COPY
+        "tags": '{"q\\\\"t","b\\\\\\\\s","t\\tab"}',
+        "due_date": "\\N",
+        "estimated_time": "\\N",
+        "starred": "f",
+        "archived": "f",
+        "completed": "t",
+        "created_at": "2024-01-22T15:00:00.123456",
+        "updated_at": "2024-01-22T15:00:00.123456",
+    }
+
+
+def test_copy_line_null_description():
+    line = transfer.copy_line(schemas.TaskImport(title="t", due_date="2024-01-22T17:00:00+02:00"), NOW, 1)
+    columns = line[:-1].split("\t")
+    assert columns[2] == "\\N"
+    assert columns[4] == "{}"
+    assert columns[5] == "2024-01-22T15:00:00"
+
+
+def test_import_report_truncates_errors(monkeypatch):
+    monkeypatch.setattr(transfer, "IMPORT_MAX_ERRORS", 2)
+    report = transfer.ImportReport()
+    report.imported = 5
+    for line in (1, 2, 3):
+        report.reject(line, "invalid_json", "bad")
+
+    response = report.response()
+    assert not response.success
+    assert response.message == "5/8 tasks imported"
+    assert [error.error_details["line"] for error in response.data["errors"]] == [1, 2]
+    assert response.meta == {"requested": 8, "succeeded": 5, "failed": 3, "errors_truncated": True}
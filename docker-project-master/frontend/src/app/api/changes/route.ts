@@ -0,0 +1,22 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { withIdentity } from '@/lib/identity';
+
+export async function GET(req: NextRequest) {
+  const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://backend-service:8000';
+  const params = new URLSearchParams(req.nextUrl.searchParams);
+
+  try {
+    const response = await fetch(`${apiUrl}/changes?${params}`, {
+      headers: withIdentity(req),
+      next: { revalidate: 0 },  // Désactive le cache
+    });
+    // Transmis sans décoder ni réencoder le JSON
+    return new NextResponse(response.body, {
+      status: response.status,
+      headers: { 'Content-Type': response.headers.get('Content-Type') ?? 'application/json' },
+    });
+  } catch (error) {
+    console.error("Échec de la requête:", error);
+    return NextResponse.json({ error: 'Could not load changes' }, { status: 500 });
+  }
+}
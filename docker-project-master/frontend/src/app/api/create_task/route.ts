@@ -1,4 +1,5 @@
 import { NextRequest, NextResponse } from 'next/server';
+import { withIdentity } from '@/lib/identity';
 
 export async function POST(req: NextRequest) {
   const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://backend:8000';
@@ -6,7 +7,7 @@ export async function POST(req: NextRequest) {
   try {
     const response = await fetch(`${apiUrl}/create_task`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: withIdentity(req, { 'Content-Type': 'application/json' }),
       body: JSON.stringify(body),
     });
     const data = await response.json(); 
@@ -0,0 +1,31 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { withIdentity } from '@/lib/identity';
+
+// Flux ouvert en continu : jamais mis en cache ni rendu statiquement
+export const dynamic = 'force-dynamic';
+
+export async function GET(req: NextRequest) {
+  const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://backend-service:8000';
+
+  try {
+    const response = await fetch(`${apiUrl}/events`, {
+      cache: 'no-store',
+      headers: withIdentity(req, { accept: 'text/event-stream' }),
+      signal: req.signal,  // Ferme le flux du backend quand le navigateur se déconnecte
+    });
+    if (!response.ok || !response.body) {
+      return NextResponse.json({ error: 'Events unavailable' }, { status: response.status });
+    }
+    // Le corps est relayé tel quel, sans être mis en mémoire tampon
+    return new Response(response.body, {
+      headers: {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+      },
+    });
+  } catch (error) {
+    console.error("Échec de la requête:", error);
+    return NextResponse.json({ error: 'Could not open events' }, { status: 500 });
+  }
+}
@@ -1,25 +1,55 @@
 // src/app/api/get_task/route.ts
-import { NextResponse } from 'next/server';
+import { NextRequest, NextResponse } from 'next/server';
+import { withIdentity } from '@/lib/identity';
 
-export async function GET() {
+export async function GET(req: NextRequest) {
   const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://backend-service:8000';
-  console.log(`Tentative de connexion à : ${apiUrl}/get_task`);
+
+  // Transmet les filtres, le tri et le curseur de pagination au backend
+  const params = new URLSearchParams(req.nextUrl.searchParams);
+  if (!params.has('archived')) {
+    params.set('archived', 'false');
+  }
+  console.log(`Tentative de connexion à : ${apiUrl}/get_task?${params}`);
+
+  // Revalidation du cache du navigateur : le backend répond 304 sans relire les tâches
+  const conditional = withIdentity(req);
+  for (const name of ['if-none-match', 'if-modified-since']) {
+    const value = req.headers.get(name);
+    if (value) {
+      conditional.set(name, value);
+    }
+  }
 
   try {
-    const response = await fetch(`${apiUrl}/get_task?archived=false`, {
+    const response = await fetch(`${apiUrl}/get_task?${params}`, {
+      headers: conditional,
       next: { revalidate: 0 },  // Désactive le cache
     });
     console.log("Statut de la réponse:", response.status);
 
+    const headers = new Headers();
+    for (const name of ['Content-Type', 'X-Next-Cursor', 'ETag', 'Last-Modified', 'Cache-Control']) {
+      const value = response.headers.get(name);
+      if (value) {
+        headers.set(name, value);
+      }
+    }
+
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers });
+    }
+
     if (!response.ok) {
       const errorText = await response.text();
       console.error("Erreur du backend:", errorText);
-      return NextResponse.json([], { status: 500 });
+      return NextResponse.json([], { status: response.status === 401 ? 401 : 500 });
     }
 
-    const data = await response.json();
-    console.log("Données reçues:", data);  // Affiche les données brutes
-    return NextResponse.json(data);
+    // Corps transmis tel quel (JSON, colonnes ou MessagePack selon ?format=),
+    // sans le décoder puis le réencoder : fetch l'a déjà décompressé, Next
+    // le recompresse pour le navigateur
+    return new NextResponse(response.body, { headers });
   } catch (error) {
     console.error("Échec de la requête:", error);
     return NextResponse.json([], { status: 500 });
@@ -1,5 +1,36 @@
 // src/app/api/task/[id]/route.ts
 import { NextRequest, NextResponse } from 'next/server';
+import { withIdentity } from '@/lib/identity';
+
+export async function GET(req: NextRequest, { params }: { params: { id: string } }) {
+  const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://backend:8000';
+  const conditional = withIdentity(req);
+  for (const name of ['if-none-match', 'if-modified-since']) {
+    const value = req.headers.get(name);
+    if (value) {
+      conditional.set(name, value);
+    }
+  }
+  try {
+    const response = await fetch(`${apiUrl}/task/${params.id}`, {
+      headers: conditional,
+      next: { revalidate: 0 },
+    });
+    const headers = new Headers();
+    for (const name of ['Content-Type', 'ETag', 'Last-Modified', 'Cache-Control']) {
+      const value = response.headers.get(name);
+      if (value) {
+        headers.set(name, value);
+      }
+    }
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers });
+    }
+    return new NextResponse(response.body, { status: response.status, headers });
+  } catch {
+    return NextResponse.json({ error: 'Could not load task' }, { status: 500 });
+  }
+}
 
 export async function PUT(req: NextRequest, { params }: { params: { id: string } }) {
   const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://backend:8000';
@@ -27,10 +58,7 @@ export async function PUT(req: NextRequest, { params }: { params: { id: string }
     // 3. Appel au backend
     const response = await fetch(`${apiUrl}/task/${params.id}`, {
       method: 'PUT',
-      headers: { 
-        'Content-Type': 'application/json',
-        // Ajoutez d'autres headers si nécessaire (auth, etc.)
-      },
+      headers: withIdentity(req, { 'Content-Type': 'application/json' }),
       body: JSON.stringify(body),
     });
 
@@ -65,6 +93,7 @@ export async function DELETE(req: NextRequest, { params }: { params: { id: strin
   try {
     const response = await fetch(`${apiUrl}/task/${params.id}`, {
       method: 'DELETE',
+      headers: withIdentity(req),
     });
     if (!response.ok) {
       return NextResponse.json({ error: 'Could not delete task' }, { status: response.status });
@@ -1,21 +1,53 @@
-import { useState, useEffect, useMemo } from "react";
+import { useState, useEffect, useCallback, useRef } from "react";
 import { Todo } from "@/components/todos/types";
-import { fetchTasks, createTask, updateTask, deleteTask } from "@/lib/api";
+import { fetchChanges, fetchStats, createTask, updateTask, deleteTask, ChangePage } from "@/lib/api";
+
+// Applique une page de /changes : la liste ne garde que les tâches non archivées
+const applyChanges = (todos: Todo[], page: ChangePage): Todo[] => {
+  const touched = new Set([...page.deleted, ...page.tasks.map((task) => task.id)]);
+  return [
+    ...todos.filter((todo) => !touched.has(todo.id)),
+    ...page.tasks.filter((task) => !task.archived),
+  ];
+};
 
 export function useTodos() {
   const [todos, setTodos] = useState<Todo[]>([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [refreshKey, setRefreshKey] = useState(0);
+  // Position dans le flux /changes : un rafraîchissement ne récupère que les modifications
+  const cursorRef = useRef<string | null>(null);
+  const [stats, setStats] = useState({ active: 0, completed: 0, overdue: 0, dueToday: 0 });
 
   const refresh = () => setRefreshKey((prev) => prev + 1);
 
+  // Les compteurs sont calculés par le backend (/stats), sans télécharger les tâches
+  const loadStats = useCallback(async () => {
+    try {
+      const data = await fetchStats();
+      setStats({
+        active: data.active,
+        completed: data.completed,
+        overdue: data.overdue,
+        dueToday: data.due_today,
+      });
+    } catch (err) {
+      console.error("Error loading stats:", err);
+    }
+  }, []);
+
+  useEffect(() => {
+    loadStats();
+  }, [refreshKey, loadStats]);
+
   useEffect(() => {
     const loadTodos = async () => {
       try {
-        setIsLoading(true);
-        const data = await fetchTasks();
-        setTodos(data);
+        setIsLoading(cursorRef.current === null);
+        const { pages, cursor, reset } = await fetchChanges(cursorRef.current);
+        setTodos((prev) => pages.reduce(applyChanges, reset ? [] : prev));
+        cursorRef.current = cursor;
         setError(null);
       } catch (err) {
         setError("Failed to load todos");
@@ -28,6 +60,31 @@ export function useTodos() {
     loadTodos();
   }, [refreshKey]);
 
+  // Les écritures des autres onglets et utilisateurs arrivent par /events :
+  // un lot de notifications ne déclenche qu'une lecture de /changes
+  useEffect(() => {
+    let timer: ReturnType<typeof setTimeout> | undefined;
+    const scheduleRefresh = () => {
+      clearTimeout(timer);
+      timer = setTimeout(() => setRefreshKey((prev) => prev + 1), 100);
+    };
+
+    const source = new EventSource("/api/events");
+    let opened = false;
+    source.onopen = () => {
+      // Après une reconnexion, des événements ont pu être perdus
+      if (opened) scheduleRefresh();
+      opened = true;
+    };
+    source.addEventListener("change", scheduleRefresh);
+    source.addEventListener("resync", scheduleRefresh);
+
+    return () => {
+      clearTimeout(timer);
+      source.close();
+    };
+  }, []);
+
   const handleAddTodo = async (todo: Omit<Todo, "id" | "created_at" | "updated_at">) => {
     try {
       setIsLoading(true);
@@ -52,6 +109,7 @@ export function useTodos() {
       ));
   
       const updatedTodo = await updateTask(id, updates);
+      loadStats();
       return updatedTodo;
     } catch (err) {
       // Revert en cas d'erreur
@@ -64,25 +122,9 @@ export function useTodos() {
   const handleDeleteTodo = async (id: string) => {
     await deleteTask(id);
     setTodos((prev) => prev.filter((todo) => todo.id !== id));
+    loadStats();
   };
 
-  const stats = useMemo(() => {
-    const active = todos.filter((t) => !t.completed && !t.archived);
-    const completed = todos.filter((t) => t.completed && !t.archived);
-    const overdue = active.filter((t) => t.due_date && new Date() > t.due_date);
-    const dueToday = active.filter((t) => {
-      if (!t.due_date) return false;
-      return new Date().toDateString() === t.due_date.toDateString();
-    });
-
-    return {
-      active: active.length,
-      completed: completed.length,
-      overdue: overdue.length,
-      dueToday: dueToday.length,
-    };
-  }, [todos]);
-
   return {
     todos,
     isLoading,
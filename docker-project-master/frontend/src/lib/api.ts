@@ -1,18 +1,63 @@
-import { Todo } from "../types/todo";
+import { Todo, TodoStatsData } from "../types/todo";
 
-export const fetchTasks = async (): Promise<Todo[]> => {
-  const response = await fetch('/api/get_task');
+type RawTask = { id: number | string, due_date?: string, created_at: string, updated_at: string } & Omit<Todo, 'id' | 'due_date' | 'created_at' | 'updated_at'>;
+
+const toTodo = (task: RawTask): Todo => ({
+  ...task,
+  id: String(task.id),
+  due_date: task.due_date ? new Date(task.due_date) : undefined,
+  created_at: new Date(task.created_at),
+  updated_at: new Date(task.updated_at),
+});
+
+export interface ChangePage {
+  tasks: Todo[];
+  deleted: string[];
+}
+
+export const fetchChanges = async (since: string | null): Promise<{ pages: ChangePage[], cursor: string, reset: boolean }> => {
+  // Modifications postérieures au curseur, page par page : chaque page
+  // s'applique dans l'ordre (suppressions puis tâches écrites)
+  const pages: ChangePage[] = [];
+  let cursor = since;
+  let reset = false;
+  let hasMore = true;
+  while (hasMore) {
+    const query = new URLSearchParams({ limit: '1000' });
+    if (cursor) {
+      query.set('since', cursor);
+    }
+    const response = await fetch(`/api/changes?${query}`);
+    if (response.status === 410 && !reset) {
+      // Curseur plus ancien que les suppressions conservées : la liste
+      // locale est remplacée par une lecture depuis le début
+      pages.length = 0;
+      cursor = null;
+      reset = true;
+      continue;
+    }
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const data = await response.json();
+    pages.push({
+      tasks: data.tasks.map(toTodo),
+      deleted: data.deleted.map(String),
+    });
+    cursor = data.cursor;
+    hasMore = data.has_more;
+  }
+  return { pages, cursor: cursor as string, reset };
+};
+
+export const fetchStats = async (): Promise<TodoStatsData> => {
+  // "Aujourd'hui" est calculé par le backend dans le fuseau du navigateur
+  const tz = Intl.DateTimeFormat().resolvedOptions().timeZone;
+  const response = await fetch(`/api/stats?${new URLSearchParams({ tz })}`);
   if (!response.ok) {
     throw new Error(`HTTP error! status: ${response.status}`);
   }
-  const data = await response.json();
-  console.log("Fetched tasks:", data); // <--- Add this line
-  return data.map((task: { due_date?: string, created_at: string, updated_at: string } & Omit<Todo, 'due_date' | 'created_at' | 'updated_at'>) => ({
-    ...task,
-    due_date: task.due_date ? new Date(task.due_date) : undefined,
-    created_at: new Date(task.created_at),
-    updated_at: new Date(task.updated_at),
-  }));
+  return response.json();
 };
 
 export const createTask = async (taskData: Omit<Todo, 'id' | 'created_at' | 'updated_at'>): Promise<Todo> => {
@@ -0,0 +1,21 @@
+import type { NextRequest } from 'next/server';
+
+// Jeton de session de l'utilisateur (JWT signé par le service
+// d'authentification placé devant l'application, vérifié par le backend),
+// reçu dans un cookie HttpOnly ou l'en-tête Authorization. Le frontend ne
+// l'interprète pas : il le transmet au backend, qui ne sert que les tâches
+// de cet utilisateur. Sans jeton, rien n'est transmis : le backend répond
+// 401, ou sert l'utilisateur de développement (AUTH_DEV_OWNER_ID).
+export const AUTH_COOKIE = process.env.AUTH_COOKIE || 'session';
+
+export function withIdentity(req: NextRequest, init?: HeadersInit): Headers {
+  const headers = new Headers(init);
+  const authorization = req.headers.get('authorization');
+  const token = req.cookies.get(AUTH_COOKIE)?.value;
+  if (authorization) {
+    headers.set('authorization', authorization);
+  } else if (token) {
+    headers.set('authorization', `Bearer ${token}`);
+  }
+  return headers;
+}
@@ -19,4 +19,12 @@ export type NewTodoState = {
     current_tag: string;
     due_date: string;
     estimated_time: string;
-};
\ No newline at end of file
+};
+export interface TodoStatsData {
+    active: number;
+    completed: number;
+    due_today: number;
+    overdue: number;
+    by_priority: Record<string, number>;
+    by_tag: Record<string, number>;
+}